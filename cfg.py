@@ -22,6 +22,8 @@ class Static:
     CFG_JSON = APP_DATA_DIR / "cfg.json"
     DB_FILE = APP_DATA_DIR / "db.db"
     HASHDIR = APP_DATA_DIR / "hashdir"
+    # миниатюры одним файлом вместо HASHDIR, см. ThumbStore
+    THUMBS_PACK_FILE = APP_DATA_DIR / "thumbs.db"
     MF_JSON = APP_DATA_DIR / "mf.json"
     FILTERS_JSON = APP_DATA_DIR / "filters.json"
     SERVERS_JSON = APP_DATA_DIR / "servers.json"
@@ -43,8 +45,13 @@ class Static:
     JPEG_ICONS = ICONS / "jpeg_icons"
 
 
-    # максимально возможный размер миниатюры в HASHDIR
-    THUMB_MAX_SIZE = 210
+    # максимально возможный размер миниатюры в HASHDIR:
+    # самый крупный размер в сетке на экране с devicePixelRatio 2, 135 * 2
+    THUMB_MAX_SIZE = 270
+    # уменьшенные копии миниатюры, создаются сканером вместе с THUMB_MAX_SIZE
+    THUMB_LEVELS = [130]
+    # качество JPEG миниатюр в ThumbStore, 0-100
+    THUMB_QUALITY = 90
     # размеры для QPixmap в виджете Thumb
     THUMB_WID_PIXMAP_SIZE = [65, 80, 135]
     # рамка вокруг QPixmap в виджете Thumb
@@ -86,8 +93,9 @@ class Dynamic:
     date_start: datetime = None
     date_end: datetime = None
     date_index: int = 0
-    loaded_thumbs: int = 0
     search_widget_text: str = None
+    # поле поиска ищет во всех Mf, а не в текущем каталоге
+    search_all_mf: bool = False
     current_pixmap_size_index: int = 1
     current_dir: str = os.sep
     sort_by_mod: bool = True
@@ -104,6 +112,12 @@ class JsonData:
     theme = Themes.dark
     scaner_minutes = 20
     hide_digits_mf_lst = []
+    # количество процессов для создания миниатюр, 0 — автоматически
+    thumb_workers = 0
+    # объем кэша миниатюр в памяти, мегабайты
+    thumb_cache_mb = 256
+    # хранить миниатюры в THUMBS_PACK_FILE вместо HASHDIR
+    thumbs_packed = False
 
     @classmethod
     def get_data(cls):
@@ -113,6 +127,9 @@ class JsonData:
             "theme": cls.theme,
             "scaner_minutes": cls.scaner_minutes,
             "hide_digits_mf_lst": cls.hide_digits_mf_lst,   
+            "thumb_workers": cls.thumb_workers,
+            "thumb_cache_mb": cls.thumb_cache_mb,
+            "thumbs_packed": cls.thumbs_packed,
         }
     
     @classmethod
@@ -14,6 +14,8 @@ from system.main_folder import Mf
 from system.paletes import ThemeChanger
 from system.servers import Servers
 from system.tasks import UThreadPool
+from system.thumb_cache import ThumbCache
+from system.thumb_store import ThumbStore
 from widgets._base_widgets import UMainWindow
 from widgets.win_first_load import FirstLoadWin
 from widgets.win_main import WinMain
@@ -131,8 +133,10 @@ class App(QApplication):
             # инициация приложения
             Dbase.init()
             Dbase.vacuum()
+            ThumbStore.migrate(JsonData.thumbs_packed)
             ThemeChanger.init()
             UThreadPool.init()
+            ThumbCache.set_max_mb(JsonData.thumb_cache_mb)
             self.create_app()
         else:
             self.first_load_win = FirstLoadWin()
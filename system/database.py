@@ -1,8 +1,11 @@
 import os
 import traceback
-from typing import Literal
+from datetime import date, datetime
+from time import monotonic
+from typing import Callable, Literal
 
 import sqlalchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError, OperationalError
 
 from cfg import Static
@@ -23,10 +26,18 @@ _table_thumbs = sqlalchemy.Table(
     sqlalchemy.Column("coll", sqlalchemy.Text),
     sqlalchemy.Column("fav", sqlalchemy.Integer),
     sqlalchemy.Column("brand", sqlalchemy.Text),
+    sqlalchemy.Column("day", sqlalchemy.Integer),
+    sqlalchemy.Column("width", sqlalchemy.Integer),
+    sqlalchemy.Column("height", sqlalchemy.Integer),
 )
 
 
 class Thumbs:
+    """
+    - root: колонка resol хранит директорию изображения
+    - width, height: размер изображения из заголовка файла,
+      NULL — еще не прочитан или формат без заголовка, см. `ImgHeader`
+    """
 
     table = _table_thumbs
     id = _table_thumbs.c.id
@@ -39,6 +50,9 @@ class Thumbs:
     coll = _table_thumbs.c.coll
     fav = _table_thumbs.c.fav
     mf_alias = _table_thumbs.c.brand
+    day = _table_thumbs.c.day
+    width = _table_thumbs.c.width
+    height = _table_thumbs.c.height
 
 
 _table_dirs = sqlalchemy.Table(
@@ -82,6 +96,193 @@ class Properties:
     bytes_hist = _table_properties.c.bytes_hist
 
 
+_table_days = sqlalchemy.Table(
+    "days", METADATA,
+    sqlalchemy.Column("brand", sqlalchemy.Text, primary_key=True),
+    sqlalchemy.Column("day", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("count", sqlalchemy.Integer, nullable=False),
+)
+
+
+class Days:
+    """
+    Количество изображений по дням для каждого Mf.
+
+    День хранится числом YYYYMMDD по локальному времени `mod`,
+    такое же значение пишется в THUMBS.day при сканировании.
+    Таблица ведется триггерами на THUMBS, см. `Migrations.day_buckets`,
+    поэтому календарю не нужно читать THUMBS целиком.
+    """
+    table = _table_days
+    mf_alias = _table_days.c.brand
+    day = _table_days.c.day
+    count = _table_days.c.count
+
+    @staticmethod
+    def from_timestamp(timestamp: int) -> int:
+        return Days.from_date(datetime.fromtimestamp(timestamp))
+
+    @staticmethod
+    def from_date(date_: date) -> int:
+        return date_.year * 10000 + date_.month * 100 + date_.day
+
+    @classmethod
+    def month_stmt(cls, mf_alias: str, year: int, month: int):
+        """
+        Возвращает (day, count) за месяц: поиск по первичному ключу.
+        """
+        start = year * 10000 + month * 100
+        return (
+            sqlalchemy.select(cls.day, cls.count)
+            .where(cls.mf_alias == mf_alias)
+            .where(cls.day.between(start + 1, start + 31))
+            .order_by(cls.day)
+        )
+
+
+_table_failed = sqlalchemy.Table(
+    "failed", METADATA,
+    sqlalchemy.Column("brand", sqlalchemy.Text, primary_key=True),
+    sqlalchemy.Column("short_src", sqlalchemy.Text, primary_key=True),
+    sqlalchemy.Column("size", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("mod", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("attempts", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("last_try", sqlalchemy.Integer, nullable=False),
+    sqlalchemy.Column("next_try", sqlalchemy.Integer, nullable=False),
+)
+
+
+class Failed:
+    """
+    Изображения, для которых не удалось создать миниатюру.
+
+    Запись относится к файлу с конкретными size и mod: если файл
+    изменился, он обрабатывается сразу. Иначе следующая попытка
+    не раньше next_try, интервал растет вдвое с каждой неудачей
+    от `base_delay` до `max_delay`.
+    При успешном создании миниатюры запись удаляется.
+    """
+    table = _table_failed
+    mf_alias = _table_failed.c.brand
+    rel_img_path = _table_failed.c.short_src
+    size = _table_failed.c.size
+    mod = _table_failed.c.mod
+    attempts = _table_failed.c.attempts
+    last_try = _table_failed.c.last_try
+    next_try = _table_failed.c.next_try
+
+    base_delay = 60 * 60
+    max_delay = 30 * 24 * 60 * 60
+
+    @classmethod
+    def get_delay(cls, attempts: int) -> int:
+        return min(cls.base_delay * 2 ** max(0, attempts - 1), cls.max_delay)
+
+    @classmethod
+    def mf_stmt(cls, mf_alias: str):
+        """
+        Возвращает (rel_img_path, size, mod, attempts, next_try) для Mf.
+        """
+        return (
+            sqlalchemy.select(
+                cls.rel_img_path,
+                cls.size,
+                cls.mod,
+                cls.attempts,
+                cls.next_try
+            )
+            .where(cls.mf_alias == mf_alias)
+        )
+
+
+_table_thumbs_fts = sqlalchemy.table(
+    "thumbs_fts",
+    sqlalchemy.column("rowid", sqlalchemy.Integer),
+    sqlalchemy.column("short_src", sqlalchemy.Text),
+)
+
+
+class ThumbsFts:
+    """
+    Полнотекстовый индекс FTS5 (trigram) по путям изображений THUMBS.
+
+    Виртуальная таблица и триггеры создаются в `Migrations.fts_index`,
+    поэтому индекс обновляется при любой записи в THUMBS, в том числе
+    сканером. Если SQLite собран без FTS5 trigram, `enabled` False
+    и поиск остается на ilike.
+    """
+    table = _table_thumbs_fts
+    rowid = _table_thumbs_fts.c.rowid
+    rel_img_path = _table_thumbs_fts.c.short_src
+    # trigram не ищет строки короче 3 символов
+    min_len = 3
+    enabled = False
+
+    @classmethod
+    def check_enabled(cls, engine: sqlalchemy.Engine):
+        with engine.connect() as conn:
+            stmt = sqlalchemy.text(
+                "SELECT 1 FROM sqlite_master "
+                "WHERE type = 'table' AND name = 'thumbs_fts'"
+            )
+            cls.enabled = conn.execute(stmt).first() is not None
+
+    @classmethod
+    def match(cls, texts: list[str]):
+        """
+        Условие для THUMBS: путь содержит хотя бы одну из строк `texts`
+        без учета регистра, как ilike('%text%').
+        Возвращает None, если индекс недоступен или строка слишком короткая.
+        """
+        if not cls.can_match(texts):
+            return None
+        stmt = (
+            sqlalchemy.select(cls.rowid)
+            .where(cls.rel_img_path.op("MATCH")(cls.query(texts)))
+        )
+        return Thumbs.id.in_(stmt)
+
+    @classmethod
+    def can_match(cls, texts: list[str]):
+        if not cls.enabled or not texts:
+            return False
+        return all(len(i) >= cls.min_len for i in texts)
+
+    @staticmethod
+    def query(texts: list[str]):
+        return " OR ".join(
+            '"' + i.replace('"', '""') + '"'
+            for i in texts
+        )
+
+    @classmethod
+    def search_stmt(cls, text: str, mf_aliases: list[str]):
+        """
+        Поиск по путям сразу во всех указанных Mf, см. `MfSearcher`.
+        Возвращает (mf_alias, rel_img_path), последние добавленные первыми.
+
+        Выборка идет от индекса: FTS5 отдает rowid по убыванию
+        и останавливается на LIMIT, не сортируя все совпадения.
+        Без индекса или для короткой строки — ilike по THUMBS.
+        """
+        stmt = (
+            sqlalchemy.select(Thumbs.mf_alias, Thumbs.rel_img_path)
+            .where(Thumbs.mf_alias.in_(mf_aliases))
+        )
+        if not cls.can_match([text]):
+            return (
+                stmt
+                .where(Thumbs.rel_img_path.ilike(f"%{text}%"))
+                .order_by(Thumbs.id.desc())
+            )
+        return (
+            stmt
+            .select_from(cls.table.join(Thumbs.table, Thumbs.id == cls.rowid))
+            .where(cls.rel_img_path.op("MATCH")(cls.query([text])))
+            .order_by(cls.rowid.desc())
+        )
+
+
 class Dbase:
     main_engine: sqlalchemy.Engine = None
     _timeout = 5
@@ -92,6 +293,10 @@ class Dbase:
     @classmethod
     def init(cls) -> sqlalchemy.Engine:
         Dbase.main_engine = cls.create_engine()
+        if Migrations.apply(Dbase.main_engine):
+            # схема изменилась: проверяем, что частые запросы идут по индексам
+            cls.check_query_plans()
+        ThumbsFts.check_enabled(Dbase.main_engine)
         cls.toggle_wal(False)
 
     @classmethod
@@ -110,7 +315,7 @@ class Dbase:
                 )
         METADATA.create_all(engine)
         return engine
-        
+
     @classmethod
     def toggle_wal(cls, value: bool):
         conn = Dbase.main_engine.connect()
@@ -122,6 +327,73 @@ class Dbase:
             cls.WAL_ = False
         conn.close()
 
+    @classmethod
+    def query_plan(cls, stmt: sqlalchemy.Executable, engine: sqlalchemy.Engine = None) -> list[str]:
+        """
+        Возвращает EXPLAIN QUERY PLAN для выражения SQLAlchemy, например:
+        - SEARCH thumbs USING INDEX thumbs_brand_mod (brand=?)
+        """
+        engine = engine or cls.main_engine
+        compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+        with engine.connect() as conn:
+            stmt = sqlalchemy.text(f"EXPLAIN QUERY PLAN {compiled}")
+            return [row[-1] for row in conn.execute(stmt)]
+
+    @classmethod
+    def check_query_plans(cls, engine: sqlalchemy.Engine = None) -> dict[str, list[str]]:
+        """
+        Проверяет, что частые запросы используют индексы из `Migrations`.
+        Печатает запросы, которые читают таблицу целиком.
+        Выполняется в `init` после новых миграций.
+        """
+        stmts = {
+            "thumbs by mod": (
+                sqlalchemy.select(Thumbs.rel_img_path)
+                .where(Thumbs.mf_alias == "")
+                .order_by(Thumbs.mod.desc())
+            ),
+            "thumbs favs": (
+                sqlalchemy.select(Thumbs.rel_img_path)
+                .where(Thumbs.mf_alias == "", Thumbs.fav == 1)
+            ),
+            "thumbs by path": (
+                sqlalchemy.select(Thumbs.id)
+                .where(Thumbs.mf_alias == "", Thumbs.rel_img_path == "")
+            ),
+            "dirs by path": (
+                sqlalchemy.select(Dirs.mod)
+                .where(Dirs.mf_alias == "", Dirs.rel_dir_path == "")
+            ),
+            "thumbs by dir": (
+                sqlalchemy.select(Thumbs.rel_img_path)
+                .where(Thumbs.mf_alias == "", Thumbs.root == "")
+                .order_by(Thumbs.rel_img_path)
+            ),
+            "thumbs in dir tree": (
+                sqlalchemy.select(Thumbs.rel_thumb_path)
+                .where(Thumbs.mf_alias == "")
+                .where(Thumbs.rel_img_path >= "/a/", Thumbs.rel_img_path < "/a0")
+            ),
+            "thumbs by day": (
+                sqlalchemy.select(Thumbs.rel_img_path)
+                .where(Thumbs.mf_alias == "", Thumbs.day.between(0, 1))
+            ),
+            "days by month": Days.month_stmt("", 2000, 1),
+            "properties by thumb": (
+                sqlalchemy.select(Properties.bytes_hist)
+                .where(Properties.thumb_id == 0)
+            ),
+        }
+        plans = {k: cls.query_plan(v, engine) for k, v in stmts.items()}
+        scans = 0
+        for name, plan in plans.items():
+            if any(i.startswith("SCAN") for i in plan):
+                print("query plan: полный обход таблицы", name, plan)
+                scans += 1
+        if not scans:
+            print("query plan: все запросы используют индексы", len(plans))
+        return plans
+
     @classmethod
     def vacuum(cls):
         try:
@@ -131,3 +403,335 @@ class Dbase:
                 conn.execute(stmt)
         except Exception as e:
             print("database vacuum error", e)
+
+
+class Migrations:
+    """
+    Версионные миграции пользовательской БД.
+
+    Номер последней примененной миграции хранится в PRAGMA user_version.
+    Каждая миграция выполняется один раз в своей транзакции.
+    Новые миграции добавляются только в конец `items`.
+    """
+
+    @staticmethod
+    def unique_keys(conn: sqlalchemy.Connection):
+        """
+        Уникальные ключи (brand, short_src) для THUMBS и DIRS нужны
+        для INSERT ... ON CONFLICT в `BulkUpsert`.
+        Перед созданием ключа удаляются дубликаты, остается последняя запись.
+        Избранное и коллекция удаляемых записей THUMBS переносятся
+        в оставшуюся, их строки PROPERTIES удаляются: гистограмма
+        пересчитывается при следующем поиске по изображению.
+        """
+        stmts = (
+            "CREATE TEMP TABLE thumbs_dups "
+            "(id INTEGER PRIMARY KEY, fav INTEGER, coll TEXT)",
+
+            "INSERT INTO thumbs_dups "
+            "SELECT MAX(id), MAX(fav), "
+            "MAX(CASE WHEN coll = 'none' THEN NULL ELSE coll END) "
+            "FROM thumbs GROUP BY brand, short_src HAVING COUNT(*) > 1",
+
+            "UPDATE thumbs SET "
+            "fav = (SELECT d.fav FROM thumbs_dups d WHERE d.id = thumbs.id), "
+            "coll = CASE WHEN coll IS NULL OR coll = 'none' THEN coalesce("
+            "(SELECT d.coll FROM thumbs_dups d WHERE d.id = thumbs.id), coll) "
+            "ELSE coll END "
+            "WHERE id IN (SELECT id FROM thumbs_dups)",
+
+            "DROP TABLE thumbs_dups",
+
+            "DELETE FROM properties WHERE thumb_id NOT IN "
+            "(SELECT MAX(id) FROM thumbs GROUP BY brand, short_src)",
+        )
+        for i in stmts:
+            conn.execute(sqlalchemy.text(i))
+        for table in ("thumbs", "dirs"):
+            conn.execute(sqlalchemy.text(
+                f"DELETE FROM {table} WHERE id NOT IN "
+                f"(SELECT MAX(id) FROM {table} GROUP BY brand, short_src)"
+            ))
+            conn.execute(sqlalchemy.text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_brand_short_src "
+                f"ON {table} (brand, short_src)"
+            ))
+
+    @staticmethod
+    def hot_query_indexes(conn: sqlalchemy.Connection):
+        """
+        Индексы для сортировки по дате, избранного и поиска гистограмм.
+        """
+        stmts = (
+            "CREATE INDEX IF NOT EXISTS thumbs_brand_mod ON thumbs (brand, mod)",
+            "CREATE INDEX IF NOT EXISTS thumbs_brand_fav ON thumbs (brand, fav)",
+            "CREATE INDEX IF NOT EXISTS properties_thumb_id ON properties (thumb_id)",
+        )
+        for i in stmts:
+            conn.execute(sqlalchemy.text(i))
+
+    @staticmethod
+    def fts_index(conn: sqlalchemy.Connection):
+        """
+        FTS5 индекс по THUMBS.short_src для поиска и фильтров по расширению.
+        Синхронизируется триггерами. Если SQLite без FTS5 trigram,
+        миграция пропускается, а поиск работает через ilike.
+        """
+        try:
+            conn.execute(sqlalchemy.text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS thumbs_fts "
+                "USING fts5(short_src, content='thumbs', "
+                "content_rowid='id', tokenize='trigram')"
+            ))
+        except OperationalError as e:
+            print("db migration: FTS5 trigram недоступен", e)
+            return
+        stmts = (
+            "CREATE TRIGGER IF NOT EXISTS thumbs_fts_insert "
+            "AFTER INSERT ON thumbs BEGIN "
+            "INSERT INTO thumbs_fts (rowid, short_src) "
+            "VALUES (new.id, new.short_src); END",
+
+            "CREATE TRIGGER IF NOT EXISTS thumbs_fts_delete "
+            "AFTER DELETE ON thumbs BEGIN "
+            "INSERT INTO thumbs_fts (thumbs_fts, rowid, short_src) "
+            "VALUES ('delete', old.id, old.short_src); END",
+
+            "CREATE TRIGGER IF NOT EXISTS thumbs_fts_update "
+            "AFTER UPDATE OF short_src ON thumbs BEGIN "
+            "INSERT INTO thumbs_fts (thumbs_fts, rowid, short_src) "
+            "VALUES ('delete', old.id, old.short_src); "
+            "INSERT INTO thumbs_fts (rowid, short_src) "
+            "VALUES (new.id, new.short_src); END",
+
+            "INSERT INTO thumbs_fts (thumbs_fts) VALUES ('rebuild')",
+        )
+        for i in stmts:
+            conn.execute(sqlalchemy.text(i))
+
+    @staticmethod
+    def day_buckets(conn: sqlalchemy.Connection):
+        """
+        THUMBS.day (YYYYMMDD) с индексом (brand, day) для фильтра по датам
+        и таблица DAYS с количеством изображений по дням для календаря.
+        DAYS заполняется один раз из THUMBS, дальше обновляется триггерами.
+        """
+        stmt = sqlalchemy.text("PRAGMA table_info(thumbs)")
+        columns = [row[1] for row in conn.execute(stmt)]
+        # для новой БД колонку уже создал METADATA.create_all
+        if "day" not in columns:
+            conn.execute(sqlalchemy.text(
+                "ALTER TABLE thumbs ADD COLUMN day INTEGER"
+            ))
+        stmts = (
+            "UPDATE thumbs SET day = CAST(strftime('%Y%m%d', mod, "
+            "'unixepoch', 'localtime') AS INTEGER) WHERE mod IS NOT NULL",
+
+            "CREATE INDEX IF NOT EXISTS thumbs_brand_day ON thumbs (brand, day)",
+
+            "DELETE FROM days",
+
+            "INSERT INTO days (brand, day, count) "
+            "SELECT brand, day, COUNT(*) FROM thumbs "
+            "WHERE day IS NOT NULL GROUP BY brand, day",
+
+            "CREATE TRIGGER IF NOT EXISTS days_insert "
+            "AFTER INSERT ON thumbs WHEN new.day IS NOT NULL BEGIN "
+            "INSERT INTO days (brand, day, count) VALUES (new.brand, new.day, 1) "
+            "ON CONFLICT (brand, day) DO UPDATE SET count = count + 1; END",
+
+            "CREATE TRIGGER IF NOT EXISTS days_delete "
+            "AFTER DELETE ON thumbs WHEN old.day IS NOT NULL BEGIN "
+            "UPDATE days SET count = count - 1 "
+            "WHERE brand = old.brand AND day = old.day; "
+            "DELETE FROM days "
+            "WHERE brand = old.brand AND day = old.day AND count <= 0; END",
+
+            "CREATE TRIGGER IF NOT EXISTS days_update "
+            "AFTER UPDATE OF day, brand ON thumbs "
+            "WHEN old.day IS NOT new.day OR old.brand IS NOT new.brand BEGIN "
+            "UPDATE days SET count = count - 1 "
+            "WHERE brand = old.brand AND day = old.day; "
+            "DELETE FROM days "
+            "WHERE brand = old.brand AND day = old.day AND count <= 0; "
+            "INSERT INTO days (brand, day, count) "
+            "SELECT new.brand, new.day, 1 WHERE new.day IS NOT NULL "
+            "ON CONFLICT (brand, day) DO UPDATE SET count = count + 1; END",
+        )
+        for i in stmts:
+            conn.execute(sqlalchemy.text(i))
+
+    @staticmethod
+    def img_size(conn: sqlalchemy.Connection):
+        """
+        THUMBS.width и THUMBS.height. Существующие записи остаются NULL
+        и заполняются сканером при следующем обновлении изображения:
+        читать заголовки всех файлов при запуске на SMB слишком долго.
+        """
+        stmt = sqlalchemy.text("PRAGMA table_info(thumbs)")
+        columns = [row[1] for row in conn.execute(stmt)]
+        for column in ("width", "height"):
+            if column not in columns:
+                conn.execute(sqlalchemy.text(
+                    f"ALTER TABLE thumbs ADD COLUMN {column} INTEGER"
+                ))
+
+    @staticmethod
+    def dir_keys(conn: sqlalchemy.Connection):
+        """
+        THUMBS.resol (Thumbs.root) — директория изображения, как
+        os.path.dirname(short_src): "/a/b.jpg" → "/a", "/b.jpg" → "/".
+        Пересчитывается из short_src для старых записей, индекс
+        (brand, resol, short_src) отдает изображения одной директории
+        по порядку без обхода всех записей Mf, см. `ImgLoader.iter_db_images`.
+        """
+        # rtrim по набору символов имени файла (без "/") оставляет "/a/"
+        parent = "rtrim(short_src, replace(short_src, '/', ''))"
+        stmts = (
+            f"UPDATE thumbs SET resol = CASE WHEN {parent} = '/' THEN '/' "
+            f"ELSE substr({parent}, 1, length({parent}) - 1) END "
+            "WHERE short_src IS NOT NULL",
+
+            "CREATE INDEX IF NOT EXISTS thumbs_brand_resol "
+            "ON thumbs (brand, resol, short_src)",
+        )
+        for i in stmts:
+            conn.execute(sqlalchemy.text(i))
+
+    items = (
+        unique_keys,
+        hot_query_indexes,
+        fts_index,
+        day_buckets,
+        img_size,
+        dir_keys,
+    )
+
+    @classmethod
+    def apply(cls, engine: sqlalchemy.Engine) -> int:
+        """
+        Возвращает количество примененных миграций.
+        """
+        with engine.connect() as conn:
+            stmt = sqlalchemy.text("PRAGMA user_version")
+            version: int = conn.execute(stmt).scalar()
+        for number, migration in enumerate(cls.items[version:], start=version + 1):
+            with engine.begin() as conn:
+                migration(conn)
+                conn.execute(sqlalchemy.text(f"PRAGMA user_version = {number}"))
+            print("db migration", number, migration.__name__)
+        return max(0, len(cls.items) - version)
+
+
+class BulkUpsert:
+    """
+    Пакетная запись INSERT ... ON CONFLICT DO UPDATE.
+
+    Строки копятся и пишутся одной транзакцией через executemany
+    одного и того же выражения, когда набралось `max_rows` строк
+    или с первой строки пакета прошло `max_seconds` секунд.
+    Использовать через `with`, чтобы остаток записался при выходе.
+
+    - before_flush: вызывается перед записью пакета, например
+      `ThumbEngine.flush_store`, чтобы миниатюры попали в пакет
+      `ThumbStore` раньше, чем их строки в THUMBS
+    """
+    max_rows = 500
+    max_seconds = 2.0
+
+    def __init__(
+            self,
+            engine: sqlalchemy.Engine,
+            table: sqlalchemy.Table,
+            index_elements: list[sqlalchemy.Column],
+            update_columns: list[sqlalchemy.Column],
+            before_flush: Callable[[], None] | None = None
+        ):
+        super().__init__()
+        self.engine = engine
+        self.before_flush = before_flush
+        stmt = sqlite_insert(table)
+        self.stmt = stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={i.name: stmt.excluded[i.name] for i in update_columns}
+        )
+        self.rows: list[dict] = []
+        self.first_row_time = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    @classmethod
+    def thumbs(cls, engine: sqlalchemy.Engine, before_flush: Callable[[], None] | None = None):
+        """
+        Запись в THUMBS по ключу (mf_alias, rel_img_path).
+        Избранное и коллекция у существующих записей не меняются.
+        """
+        return cls(
+            engine=engine,
+            before_flush=before_flush,
+            table=Thumbs.table,
+            index_elements=[Thumbs.mf_alias, Thumbs.rel_img_path],
+            update_columns=[
+                Thumbs.rel_thumb_path,
+                Thumbs.size,
+                Thumbs.mod,
+                Thumbs.root,
+                Thumbs.day,
+                Thumbs.width,
+                Thumbs.height
+            ]
+        )
+
+    @classmethod
+    def failed(cls, engine: sqlalchemy.Engine):
+        """
+        Запись в FAILED по ключу (mf_alias, rel_img_path).
+        """
+        return cls(
+            engine=engine,
+            table=Failed.table,
+            index_elements=[Failed.mf_alias, Failed.rel_img_path],
+            update_columns=[
+                Failed.size,
+                Failed.mod,
+                Failed.attempts,
+                Failed.last_try,
+                Failed.next_try
+            ]
+        )
+
+    @classmethod
+    def dirs(cls, engine: sqlalchemy.Engine):
+        """
+        Запись в DIRS по ключу (mf_alias, rel_dir_path).
+        """
+        return cls(
+            engine=engine,
+            table=Dirs.table,
+            index_elements=[Dirs.mf_alias, Dirs.rel_dir_path],
+            update_columns=[Dirs.mod]
+        )
+
+    def add(self, values: dict):
+        if not self.rows:
+            self.first_row_time = monotonic()
+        self.rows.append(values)
+        stmt = (
+            len(self.rows) >= self.max_rows,
+            monotonic() - self.first_row_time >= self.max_seconds
+        )
+        if any(stmt):
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.before_flush:
+            self.before_flush()
+        with self.engine.begin() as conn:
+            conn.execute(self.stmt, self.rows)
+        self.rows = []
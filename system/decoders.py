@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+from system.file_reader import MemoryFile
+
+
+@dataclass(slots=True)
+class Decoder:
+    """
+    Параметры:
+    - name: имя формата для статистики
+    - exts: расширения файлов
+    - read: функция (path) -> RGB массив полного размера; при ошибке
+      возвращает None или бросает исключение, см. `ImgUtils.decode_img`
+    - read_reduced: функция (path, size) -> RGB массив, большая сторона
+      которого не меньше size; None — используется read
+    - bgr: read и read_reduced возвращают BGR — порядок cv2; в RGB массив
+      переводит `ImgUtils.decode_img`, а миниатюра остается в BGR до JPEG
+    - magic: сигнатуры (смещение, байты) для файлов без известного расширения
+      и для проверки содержимого в `FileClassifier`
+    - from_memory: read и read_reduced принимают вместо пути `MemoryFile`
+      с содержимым файла, см. `FileReader`
+    - count, errors, total_sec, max_sec: статистика вызовов
+    """
+    name: str
+    exts: tuple[str, ...]
+    read: Callable[[str], np.ndarray]
+    read_reduced: Callable[[str, int], np.ndarray] | None = None
+    magic: tuple[tuple[int, bytes], ...] = ()
+    from_memory: bool = False
+    bgr: bool = False
+    count: int = 0
+    errors: int = 0
+    total_sec: float = 0
+    max_sec: float = 0
+
+
+@dataclass(slots=True)
+class _Signature:
+    offset: int
+    data: bytes
+    decoder: Decoder = field(repr=False)
+
+
+class DecoderRegistry:
+    """
+    Реестр декодеров изображений, заполняется один раз при импорте
+    `system.shared_utils`. Выбор декодера — поиск в словаре по расширению,
+    а для файлов с неизвестным расширением — по сигнатуре первых байт.
+
+    Новый формат подключается через `register` без изменения `ImgUtils`.
+    Выбранный декодер не сохраняется в атрибутах класса, поэтому
+    реестр можно использовать из нескольких потоков одновременно.
+    """
+    head_size = 32
+
+    _decoders: dict[str, Decoder] = {}
+    _by_ext: dict[str, Decoder] = {}
+    _signatures: list[_Signature] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, decoder: Decoder):
+        with cls._lock:
+            cls._decoders[decoder.name] = decoder
+            for ext in decoder.exts:
+                cls._by_ext[ext.lower()] = decoder
+            for offset, data in decoder.magic:
+                cls._signatures.append(_Signature(offset, data, decoder))
+            # длинные сигнатуры точнее: "ftypheic" проверяется раньше "ftyp"
+            cls._signatures.sort(key=lambda i: len(i.data), reverse=True)
+
+    @classmethod
+    def get_by_ext(cls, path: str) -> Decoder | None:
+        _, ext = os.path.splitext(path)
+        return cls._by_ext.get(ext.lower())
+
+    @classmethod
+    def get_by_magic(cls, head: bytes) -> Decoder | None:
+        for sign in cls._signatures:
+            if head[sign.offset:sign.offset + len(sign.data)] == sign.data:
+                return sign.decoder
+        return None
+
+    @classmethod
+    def match(cls, decoder: Decoder, head: bytes) -> bool:
+        return any(
+            head[offset:offset + len(data)] == data
+            for offset, data in decoder.magic
+        )
+
+    @classmethod
+    def read_head(cls, path: str) -> bytes:
+        try:
+            with open(path, "rb") as file:
+                return file.read(cls.head_size)
+        except OSError:
+            return b""
+
+    @classmethod
+    def get(cls, path: str) -> Decoder | None:
+        decoder = cls.get_by_ext(path)
+        if decoder is None:
+            decoder = cls.get_by_magic(cls.read_head(path))
+        return decoder
+
+    @classmethod
+    def decode(
+            cls,
+            decoder: Decoder,
+            path: str,
+            size: int = 0,
+            data: bytes | None = None
+        ) -> np.ndarray | None:
+        """
+        size > 0 — используется `read_reduced`, если он есть у декодера.
+        data — содержимое файла, уже прочитанное в память; декодер
+        получает его как `MemoryFile`, если поддерживает `from_memory`.
+        """
+        src = path
+        if data is not None and decoder.from_memory:
+            src = MemoryFile(path, data)
+        if size > 0 and decoder.read_reduced:
+            fn, args = decoder.read_reduced, (src, size)
+        else:
+            fn, args = decoder.read, (src, )
+        start = time.perf_counter()
+        try:
+            img = fn(*args)
+            if img is None:
+                with cls._lock:
+                    decoder.errors += 1
+            return img
+        except Exception:
+            with cls._lock:
+                decoder.errors += 1
+            raise
+        finally:
+            sec = time.perf_counter() - start
+            with cls._lock:
+                decoder.count += 1
+                decoder.total_sec += sec
+                decoder.max_sec = max(decoder.max_sec, sec)
+
+    @classmethod
+    def get_stats(cls) -> dict[str, dict]:
+        with cls._lock:
+            return {
+                name: {
+                    "count": i.count,
+                    "errors": i.errors,
+                    "avg_ms": round(i.total_sec / i.count * 1000, 1) if i.count else 0,
+                    "max_ms": round(i.max_sec * 1000, 1),
+                }
+                for name, i in cls._decoders.items()
+                if i.count
+            }
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            for i in cls._decoders.values():
+                i.count, i.errors, i.total_sec, i.max_sec = 0, 0, 0, 0
@@ -0,0 +1,84 @@
+import threading
+from collections import Counter
+
+from system.decoders import DecoderRegistry
+from system.fs_meta import FsMeta
+
+
+class FileClassifier:
+    """
+    Отсев файлов до декодирования.
+
+    По имени и размеру, без обращения к диску:
+    - apple_double: "._IMG_0001.jpg", resource fork, который macOS
+      пишет на SMB и FAT рядом с каждым файлом
+    - empty: файл нулевого размера, например незавершенная копия
+
+    По первым байтам, только для новых файлов:
+    - unknown_content: содержимое не похоже ни на один известный формат,
+      хотя для расширения сигнатуры заданы, см. `Decoder.magic`
+
+    Файлы, содержимое которых соответствует другому формату
+    (PNG с расширением .jpg), не отсеиваются, а только считаются
+    как mislabeled: cv2 и Pillow определяют формат по содержимому.
+
+    Счетчики `counts` общие для всех потоков сканера одного Mf.
+    """
+    apple_double = "apple_double"
+    empty = "empty"
+    unknown_content = "unknown_content"
+    mislabeled = "mislabeled"
+
+    def __init__(self):
+        super().__init__()
+        self.counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def check_name(self, name: str, size: int) -> str | None:
+        """
+        Возвращает причину отсева или None.
+        """
+        if name.startswith("._"):
+            reason = self.apple_double
+        elif size == 0:
+            reason = self.empty
+        else:
+            return None
+        self._count(reason)
+        return reason
+
+    def check_head(self, path: str, head: bytes) -> str | None:
+        """
+        Возвращает причину отсева или None.
+        """
+        decoder = DecoderRegistry.get_by_ext(path)
+        if decoder is None or not decoder.magic:
+            return None
+        if DecoderRegistry.match(decoder, head):
+            return None
+        if DecoderRegistry.get_by_magic(head) is not None:
+            self._count(self.mislabeled)
+            return None
+        self._count(self.unknown_content)
+        return self.unknown_content
+
+    def filter_heads(self, paths: list[str]) -> list[bool]:
+        """
+        Читает первые байты файлов параллельно через `FsMeta` и возвращает
+        для каждого пути True, если файл можно передавать декодеру.
+        Файлы, которые не удалось прочитать, пропускаются дальше:
+        ошибку зафиксирует декодер.
+        """
+        heads = FsMeta.read_head_many(paths, DecoderRegistry.head_size)
+        return [
+            isinstance(head, OSError) or self.check_head(path, head) is None
+            for path, head in zip(paths, heads)
+        ]
+
+    def get_summary(self) -> str:
+        with self._lock:
+            return ", ".join(f"{k}: {v}" for k, v in self.counts.items())
+
+    def _count(self, reason: str):
+        with self._lock:
+            self.counts[reason] += 1
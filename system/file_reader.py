@@ -0,0 +1,120 @@
+import io
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+
+class MemoryFile(io.BytesIO):
+    """
+    Содержимое файла в памяти, передается декодерам вместо пути.
+    name, str и repr — путь к файлу, поэтому сообщения об ошибках
+    декодеров остаются прежними.
+    """
+
+    def __init__(self, path: str, data: bytes):
+        super().__init__(data)
+        self.name = path
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return self.name
+
+
+class FileReader:
+    """
+    Чтение файла в память несколькими большими последовательными
+    запросами вместо множества мелких, которые делают cv2.imread,
+    Image.open и tifffile. На SMB каждый запрос платит сетевую задержку.
+
+    Где есть `os.posix_fadvise` (Linux), ядро предупреждается
+    о последовательном чтении всего файла, на macOS остаются
+    только большие запросы.
+    """
+    chunk_size = 8 * 1024 * 1024
+    max_bytes = 512 * 1024 * 1024
+
+    @classmethod
+    def read(cls, path: str) -> bytes | None:
+        """
+        Возвращает содержимое файла или None, если файл пустой,
+        больше `max_bytes` или не читается: тогда декодер
+        открывает файл по пути сам.
+        """
+        try:
+            with open(path, "rb", buffering=0) as file:
+                size = os.fstat(file.fileno()).st_size
+                if size == 0 or size > cls.max_bytes:
+                    return None
+                cls.advise(file.fileno())
+                chunks: list[bytes] = []
+                while True:
+                    chunk = file.read(cls.chunk_size)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        except OSError as e:
+            print("FileReader read error", path, e)
+            return None
+
+    @classmethod
+    def advise(cls, fd: int):
+        if not hasattr(os, "posix_fadvise"):
+            return
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+
+    @staticmethod
+    def rewind(src: "str | MemoryFile"):
+        """
+        Возвращает src, перемотанный в начало, если это `MemoryFile`:
+        tifffile, rawpy и pillow_heif читают поток с текущей позиции.
+        """
+        if isinstance(src, MemoryFile):
+            src.seek(0)
+        return src
+
+
+class FilePrefetcher:
+    """
+    Двойная буферизация для последовательной обработки файлов:
+    пока декодируется текущий файл, следующий читается в фоновом потоке.
+
+    - read: функция (path) -> bytes | None, например `ImgUtils.read_file`
+    """
+
+    def __init__(self, read: Callable[[str], bytes | None]):
+        super().__init__()
+        self.read = read
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.path: str = None
+        self.future: Future = None
+
+    def prefetch(self, path: str):
+        """
+        Начинает читать следующий файл. Ранее начатое чтение
+        другого файла не прерывается, его результат отбрасывается.
+        """
+        if path == self.path:
+            return
+        self.path = path
+        self.future = self.executor.submit(self.read, path)
+
+    def take(self, path: str) -> bytes | None:
+        """
+        Содержимое path: из фонового чтения, если оно было начато
+        для этого файла, иначе читается сразу.
+        """
+        if path == self.path:
+            future = self.future
+            self.path, self.future = None, None
+            return future.result()
+        return self.read(path)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,180 @@
+import os
+import re
+import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+
+@dataclass(slots=True)
+class FsEntry:
+    """
+    Параметры:
+    - path: полный путь
+    - name: имя файла или директории
+    - is_dir: директория или нет
+    - size: os.stat.st_size
+    - mod: os.stat.st_mtime
+    """
+    path: str
+    name: str
+    is_dir: bool
+    size: int
+    mod: int
+
+
+class FsMeta:
+    """
+    Параллельный доступ к метаданным файловой системы: os.stat и os.scandir.
+
+    На SMB каждый вызов — отдельный запрос по сети, поэтому вызовы
+    выполняются в общем пуле потоков, а к одной точке монтирования
+    одновременно уходит не больше `per_mount` запросов.
+    Результаты возвращаются в порядке входных путей.
+    """
+    workers = 16
+    per_mount = 8
+
+    _pool: ThreadPoolExecutor = None
+    _lock = threading.Lock()
+    _mounts: list[str] = None
+    _semaphores: dict[str, threading.BoundedSemaphore] = {}
+
+    @classmethod
+    def stat_many(cls, paths: Iterable[str]) -> list[os.stat_result | OSError]:
+        """
+        Возвращает os.stat_result для каждого пути.
+        Если stat не удался, вместо результата возвращается OSError,
+        например FileNotFoundError для удаленных директорий.
+        """
+        return list(cls._imap(cls._stat, paths))
+
+    @classmethod
+    def scandir_many(
+            cls,
+            paths: Iterable[str],
+            stat_exts: tuple[str, ...] = ()
+        ) -> Iterator[tuple[str, list[FsEntry] | None]]:
+        """
+        Читает директории параллельно и возвращает пары (путь, записи).
+        Если директорию прочитать не удалось, вместо записей None.
+
+        - stat_exts: для файлов с этими расширениями заполняются size и mod,
+          остальные файлы пропускаются. Для директорий stat выполняется всегда.
+        """
+        yield from cls._imap(lambda path: cls._scandir(path, stat_exts), paths)
+
+    @classmethod
+    def read_head_many(cls, paths: Iterable[str], size: int) -> list[bytes | OSError]:
+        """
+        Возвращает первые size байт каждого файла.
+        Если файл прочитать не удалось, вместо байт возвращается OSError.
+        """
+        return list(cls._imap(lambda path: cls._read_head(path, size), paths))
+
+    @classmethod
+    def _read_head(cls, path: str, size: int) -> bytes | OSError:
+        try:
+            with open(path, "rb") as file:
+                return file.read(size)
+        except OSError as e:
+            return e
+
+    @classmethod
+    def _imap(cls, fn: callable, paths: Iterable[str]):
+        pool = cls._get_pool()
+        pending: deque[Future] = deque()
+        for path in paths:
+            if len(pending) >= cls.workers * 2:
+                yield pending.popleft().result()
+            pending.append(pool.submit(cls._limited, fn, path))
+        while pending:
+            yield pending.popleft().result()
+
+    @classmethod
+    def _limited(cls, fn: callable, path: str):
+        with cls._get_semaphore(path):
+            return fn(path)
+
+    @classmethod
+    def _stat(cls, path: str) -> os.stat_result | OSError:
+        try:
+            return os.stat(path)
+        except OSError as e:
+            return e
+
+    @classmethod
+    def _scandir(cls, path: str, stat_exts: tuple[str, ...]):
+        try:
+            scandir_iterator = os.scandir(path)
+        except Exception as e:
+            print("FsMeta scandir error", path, e)
+            return path, None
+
+        entries: list[FsEntry] = []
+        with scandir_iterator:
+            for entry in scandir_iterator:
+                try:
+                    is_dir = entry.is_dir()
+                    if not is_dir and not entry.name.endswith(stat_exts):
+                        continue
+                    stat = entry.stat()
+                except Exception as e:
+                    print("FsMeta stat error", entry.path, e)
+                    continue
+                entries.append(
+                    FsEntry(
+                        path=entry.path,
+                        name=entry.name,
+                        is_dir=is_dir,
+                        size=int(stat.st_size),
+                        mod=int(stat.st_mtime)
+                    )
+                )
+        return path, entries
+
+    @classmethod
+    def _get_pool(cls):
+        with cls._lock:
+            if cls._pool is None:
+                cls._pool = ThreadPoolExecutor(max_workers=cls.workers)
+            return cls._pool
+
+    @classmethod
+    def _get_semaphore(cls, path: str):
+        mount = cls.get_mount(path)
+        with cls._lock:
+            if mount not in cls._semaphores:
+                cls._semaphores[mount] = threading.BoundedSemaphore(cls.per_mount)
+            return cls._semaphores[mount]
+
+    @classmethod
+    def get_mount(cls, path: str) -> str:
+        """
+        Возвращает точку монтирования, к которой относится путь.
+        Список точек монтирования читается один раз из вывода `mount`.
+        """
+        with cls._lock:
+            if cls._mounts is None:
+                cls._mounts = cls._read_mounts()
+        for mount in cls._mounts:
+            if path == mount or path.startswith(mount.rstrip(os.sep) + os.sep):
+                return mount
+        return os.sep
+
+    @classmethod
+    def _read_mounts(cls) -> list[str]:
+        try:
+            output = subprocess.check_output(["mount"]).decode(errors="ignore")
+        except Exception as e:
+            print("FsMeta mount error", e)
+            return [os.sep]
+        # macOS: "//user@server/shares on /Volumes/shares (smbfs, ...)"
+        # linux: "server:/data on /mnt/data type nfs (rw, ...)"
+        mounts = re.findall(r" on (.+?) (?:\(|type )", output)
+        mounts.append(os.sep)
+        # самые длинные пути первыми, чтобы вложенные точки монтирования
+        # находились раньше родительских
+        return sorted(set(mounts), key=len, reverse=True)
@@ -0,0 +1,155 @@
+import io
+import struct
+from typing import BinaryIO
+
+
+class ImgHeader:
+    """
+    Ширина и высота изображения из заголовка файла, без декодирования:
+    - JPEG: маркер SOF, ориентация из EXIF (APP1)
+    - PNG: блок IHDR
+    - TIFF: теги ImageWidth, ImageLength и Orientation первого IFD
+    - PSD / PSB: заголовок файла
+
+    Читается несколько небольших кусков в начале файла, для TIFF
+    еще первый IFD. Если EXIF поворачивает изображение на 90°,
+    ширина и высота меняются местами, как при показе.
+    """
+    # C4 (DHT), C8 (JPG) и CC (DAC) — не SOF
+    jpeg_sof = {
+        0xC0, 0xC1, 0xC2, 0xC3,
+        0xC5, 0xC6, 0xC7,
+        0xC9, 0xCA, 0xCB,
+        0xCD, 0xCE, 0xCF,
+    }
+    # маркеры без длины: RST0-RST7, SOI, EOI, TEM
+    jpeg_standalone = {*range(0xD0, 0xDA), 0x01}
+    tiff_width, tiff_height, tiff_orientation = 256, 257, 274
+    max_ifd_entries = 4096
+
+    @classmethod
+    def read_size(cls, path: str, data: bytes | None = None) -> tuple[int, int] | None:
+        """
+        Возвращает (ширина, высота) или None, если формат не из списка
+        или заголовок поврежден.
+        - data: содержимое файла, если оно уже прочитано в память
+        """
+        try:
+            if data is not None:
+                return cls._read(io.BytesIO(data))
+            with open(path, "rb") as file:
+                return cls._read(file)
+        except (OSError, struct.error, ValueError) as e:
+            print("ImgHeader read error", path, e)
+            return None
+
+    @classmethod
+    def _read(cls, file: BinaryIO) -> tuple[int, int] | None:
+        head = file.read(32)
+        if head.startswith(b"\xff\xd8"):
+            size = cls._read_jpeg(file)
+        elif head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            size = struct.unpack(">II", head[16:24])
+        elif head[:4] in (b"II*\x00", b"MM\x00*"):
+            file.seek(0)
+            size = cls._read_tiff(file)
+        elif head.startswith(b"8BPS") and len(head) >= 26:
+            height, width = struct.unpack(">II", head[14:22])
+            size = width, height
+        else:
+            return None
+        if size is None or min(size) <= 0:
+            return None
+        return size
+
+    @classmethod
+    def _read_jpeg(cls, file: BinaryIO) -> tuple[int, int] | None:
+        file.seek(2)
+        orientation = 1
+        while True:
+            byte = file.read(1)
+            if not byte:
+                return None
+            if byte != b"\xff":
+                continue
+            marker = file.read(1)
+            # байты-заполнители 0xFF перед маркером
+            while marker == b"\xff":
+                marker = file.read(1)
+            if not marker:
+                return None
+            marker = marker[0]
+            if marker in cls.jpeg_standalone:
+                continue
+            length = struct.unpack(">H", file.read(2))[0]
+            if length < 2:
+                return None
+            if marker in cls.jpeg_sof:
+                height, width = struct.unpack(">xHH", file.read(5))
+                if orientation in (5, 6, 7, 8):
+                    width, height = height, width
+                return width, height
+            if marker == 0xE1 and orientation == 1:
+                segment = file.read(length - 2)
+                if segment.startswith(b"Exif\x00\x00"):
+                    orientation = cls._read_exif_orientation(segment[6:])
+                continue
+            file.seek(length - 2, io.SEEK_CUR)
+
+    @classmethod
+    def _read_exif_orientation(cls, tiff: bytes) -> int:
+        """
+        EXIF внутри JPEG — это TIFF без изображения, нужен только
+        тег Orientation первого IFD.
+        """
+        try:
+            tags = cls._read_ifd(io.BytesIO(tiff))
+        except (struct.error, ValueError):
+            return 1
+        return tags.get(cls.tiff_orientation, 1)
+
+    @classmethod
+    def _read_tiff(cls, file: BinaryIO) -> tuple[int, int] | None:
+        tags = cls._read_ifd(file)
+        width = tags.get(cls.tiff_width)
+        height = tags.get(cls.tiff_height)
+        if width is None or height is None:
+            return None
+        if tags.get(cls.tiff_orientation, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        return width, height
+
+    @classmethod
+    def _read_ifd(cls, file: BinaryIO) -> dict[int, int]:
+        """
+        Читает числовые теги SHORT и LONG первого IFD классического TIFF.
+        Начало TIFF — текущая позиция file, обычно 0.
+        """
+        start = file.tell()
+        order = file.read(2)
+        if order == b"II":
+            endian = "<"
+        elif order == b"MM":
+            endian = ">"
+        else:
+            raise ValueError("не TIFF")
+        magic, offset = struct.unpack(endian + "HI", file.read(6))
+        if magic != 42:
+            # BigTIFF (43) и прочее не поддерживаются
+            raise ValueError("не классический TIFF")
+        file.seek(start + offset)
+        count = struct.unpack(endian + "H", file.read(2))[0]
+        if count > cls.max_ifd_entries:
+            raise ValueError("поврежденный IFD")
+        entries = file.read(count * 12)
+        tags: dict[int, int] = {}
+        for i in range(0, len(entries) - 11, 12):
+            tag, type_, values = struct.unpack(endian + "HHI", entries[i:i + 8])
+            if values != 1:
+                continue
+            # SHORT выровнен по началу поля значения
+            if type_ == 3:
+                tags[tag] = struct.unpack(endian + "H", entries[i + 8:i + 10])[0]
+            elif type_ == 4:
+                tags[tag] = struct.unpack(endian + "I", entries[i + 8:i + 12])[0]
+        return tags
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Literal
 
 from PyQt6.QtGui import QImage, QPixmap
@@ -12,9 +12,19 @@ class SettingsItem:
 
 @dataclass(slots=True)
 class DataItem:
-    qimages: list[QImage]
+    """
+    Параметры:
+    - qimage: миниатюра в исходном размере из `hashdir`
+    - levels: {размер: QImage}, уменьшенные копии из `Static.THUMB_LEVELS`
+    - scaled_qimages: {размер: QImage}, размеры из `Static.THUMB_WID_PIXMAP_SIZE`
+      создаются при первом показе, см. `Thumb.set_pixmap_with_actual_size`
+    """
+    qimage: QImage
+    levels: dict[int, QImage]
     rel_path: str
+    rel_thumb_path: str
     fav: bool
     month_year: str
     day_month_year: str
     filename: str
+    scaled_qimages: dict[int, QImage] = field(default_factory=dict)
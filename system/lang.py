@@ -114,6 +114,8 @@ class Lng:
     save_to_downloads = ("Сохранить в загрузки", "Save to Downloads")
     save_as = ("Сохранить как", "Save as")
     search = ("Поиск", "Search")
+    search_all_mf = ("Искать во всех папках", "Search all folders")
+    search_results = ("Результаты поиска", "Search results")
     search_dates = (
         "Поиск фотографий по датам",
         "Searching for photos by dates"
@@ -295,6 +297,10 @@ class Lng:
     forward = ("Вперед", "Forward")
     details = ("Подробнее", "Details")
     data_size = ("Размер данных", "Data size")
+    thumb_cache_stats = (
+        "Кэш миниатюр: {} из {}, попаданий {} ({}%), промахов {}",
+        "Thumbnail cache: {} of {}, hits {} ({}%), misses {}"
+    )
     calculating = ("Вычисление", "Calculating")
     repair_mf = (
         "Исправить ошибки в каталоге",
@@ -581,4 +587,7 @@ class Lng:
     image_search_short = (
         "Поиск изобр.",
         "Image search"
-    )
\ No newline at end of file
+    )
+    failed_files = ("Файлы с ошибками чтения", "Files with read errors")
+    attempts = ("Попытки", "Attempts")
+    next_try = ("Следующая попытка", "Next try")
@@ -15,11 +15,13 @@ from watchdog.observers.polling import PollingObserver
 
 from cfg import JsonData, Static
 
-from .database import Dbase, Dirs, Thumbs
+from .database import BulkUpsert, Days, Dbase, Dirs, Failed, Thumbs
 from .lang import Lng
 from .main_folder import Mf
 from .shared_utils import ImgUtils, SharedUtils
 from .tasks import Utils
+from .thumb_engine import ThumbEngine, ThumbTask
+from .thumb_store import ThumbStore
 
 
 class BaseProcessWorker:
@@ -85,9 +87,11 @@ class ReadImgItem:
 class ReadImg:
     @staticmethod
     def start(src: str, size: int, queue: Queue):
-        img_array = ImgUtils.read_img(src)
         if size > 0:
+            img_array = ImgUtils.read_img_reduced(src, size)
             img_array = ImgUtils.resize(img_array, size)
+        else:
+            img_array = ImgUtils.read_img(src)
         shm = shared_memory.SharedMemory(create=True, size=img_array.nbytes)
         buffer = np.ndarray(img_array.shape, dtype=img_array.dtype, buffer=shm.buf)
         buffer[:] = img_array
@@ -112,14 +116,17 @@ class OneFileInfoItem:
 class OneFileInfo:
 
     @staticmethod
-    def start(path: str, process_queue: Queue):
+    def start(path: str, read_res: bool, process_queue: Queue):
         """
         Возвращает в Queue либо dict либо str
         Если str, процесс окончен
+        - read_res: False, если разрешение уже известно из БД
         """
         try:
             info_item = OneFileInfo._gather_info(path)
             process_queue.put(info_item)
+            if not read_res:
+                return
 
             resol = ImgUtils.get_img_res(path)
             if resol:
@@ -323,18 +330,7 @@ class MfRemover:
                 .where(Thumbs.mf_alias==mf_alias)
             )
             res = conn.execute(stmt).scalars().all()
-
-            for rel_thumb_path in res:
-                abs_thumb_path = Utils.get_abs_thumb_path(rel_thumb_path)
-                try:
-                    os.remove(abs_thumb_path)
-                except (Exception, FileNotFoundError) as e:
-                    print(traceback.format_exc())
-                    continue
-                try:
-                    os.rmdir(os.path.dirname(abs_thumb_path))
-                except OSError:
-                    pass
+            ThumbStore.remove(res)
             stmt = (
                 sqlalchemy.delete(Thumbs.table)
                 .where(Thumbs.mf_alias == mf_alias)
@@ -345,6 +341,11 @@ class MfRemover:
                 .where(Dirs.mf_alias == mf_alias)
             )
             conn.execute(stmt)
+            stmt = (
+                sqlalchemy.delete(Failed.table)
+                .where(Failed.mf_alias == mf_alias)
+            )
+            conn.execute(stmt)
 
 
 class WatchDogHandler(FileSystemEventHandler):
@@ -404,19 +405,13 @@ class UpdateThumbItem:
 class UpdateThumb:
 
     @staticmethod
-    def start(mf: Mf, rel_img_paths: list[str], queue: Queue):
-
-        def _write_thumb(abs_img_path: str, abs_thumb_path: str):
-            img_array = ImgUtils.read_img(abs_img_path)
-            img_array = ImgUtils.fit_to_thumb(img_array, Static.THUMB_MAX_SIZE)
-            if ImgUtils.write_thumb(abs_thumb_path, img_array):
-                return img_array
-            return None
-        
+    def start(mf: Mf, rel_img_paths: list[str], thumb_workers: int, queue: Queue):
+
         def _get_values(
                 abs_img_path: str,
                 rel_img_path: str,
-                rel_thumb_path: str
+                rel_thumb_path: str,
+                img_size: tuple[int | None, int | None]
             ):
             try:
                 stats = os.stat(abs_img_path)
@@ -446,18 +441,14 @@ class UpdateThumb:
                 Thumbs.root.name: root,
                 Thumbs.coll.name: "none",
                 Thumbs.fav.name: 0,
-                Thumbs.mf_alias.name: mf.mf_alias
+                Thumbs.mf_alias.name: mf.mf_alias,
+                Thumbs.day.name: Days.from_timestamp(mod),
+                Thumbs.width.name: img_size[0],
+                Thumbs.height.name: img_size[1]
             }
 
-        update_thumb_items: list[UpdateThumbItem] = []
-        step = 10
-        chunked_rel_img_paths = [
-            rel_img_paths[i:i+step]
-            for i in range(0, len(rel_img_paths), step)
-        ]
-        for chunk_rel_img_paths in chunked_rel_img_paths:
-            values_list: list[dict] = []
-            for rel_img_path in chunk_rel_img_paths:
+        def _get_tasks():
+            for rel_img_path in rel_img_paths:
                 abs_img_path = Utils.add_mf_path(
                     mf.mf_current_path,
                     rel_img_path
@@ -466,37 +457,27 @@ class UpdateThumb:
                     rel_img_path,
                     mf.mf_alias
                 )
-                rel_thumb_path = Utils.get_rel_thumb_path(
-                    abs_thumb_path
+                yield ThumbTask(abs_img_path, abs_thumb_path, rel_img_path)
+
+        update_thumb_items: list[UpdateThumbItem] = []
+        with (
+            ThumbEngine(thumb_workers) as engine,
+            BulkUpsert.thumbs(Dbase.create_engine(), engine.flush_store) as writer
+        ):
+            for task, thumb in engine.imap(_get_tasks(), return_array=True):
+                rel_img_path: str = task.data
+                if thumb is None:
+                    continue
+                result = _get_values(
+                    task.abs_img_path,
+                    rel_img_path,
+                    Utils.get_rel_thumb_path(task.abs_thumb_path),
+                    (task.width, task.height)
                 )
-                thumb = _write_thumb(abs_img_path, abs_thumb_path)
-                if thumb is not None:
-                    result = _get_values(
-                        abs_img_path,
-                        rel_img_path,
-                        rel_thumb_path
-                    )
-                    if result:
-                        values_list.append(result)
-                        item = UpdateThumbItem(rel_img_path, thumb)
-                        update_thumb_items.append(item)
-
-            engine = Dbase.create_engine()
-            with engine.begin() as conn:
-                if chunk_rel_img_paths:
-                    stmt = sqlalchemy.delete(Thumbs.table)
-                    stmt = stmt.where(
-                        Thumbs.mf_alias == mf.mf_alias
-                    )
-                    stmt = stmt.where(
-                        Thumbs.rel_img_path.in_(chunk_rel_img_paths)
-                    )
-                    conn.execute(stmt)
-                if values_list:
-                    stmt = sqlalchemy.insert(Thumbs.table).values(
-                        values_list
-                    )
-                    conn.execute(stmt)
+                if result:
+                    writer.add(result)
+                    item = UpdateThumbItem(rel_img_path, thumb)
+                    update_thumb_items.append(item)
 
         queue.put(update_thumb_items)
 
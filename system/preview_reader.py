@@ -0,0 +1,88 @@
+import io
+
+import numpy as np
+import pillow_heif
+import rawpy
+import tifffile
+from PIL import Image, ImageOps
+
+from system.file_reader import FileReader, MemoryFile
+
+
+class PreviewReader:
+    """
+    Чтение уменьшенных копий, которые уже есть внутри файла,
+    вместо полного декодирования изображения ради миниатюры.
+
+    - HEIF / HEIC: thumbnail item из контейнера
+    - TIFF: уменьшенная страница (IFD с reduced) или уровень SubIFD
+    - RAW: встроенный JPEG, декодированный сразу в уменьшенном размере
+
+    Каждый метод возвращает None, если подходящей копии нет,
+    и тогда изображение читается полностью через `ImgUtils.read_img`.
+    - path: путь или `MemoryFile` для декодеров с from_memory
+    - size: нужный размер большей стороны
+    """
+
+    @classmethod
+    def read_heif(cls, path: str | MemoryFile, size: int) -> np.ndarray | None:
+        heif_file = pillow_heif.open_heif(FileReader.rewind(path))
+        # миниатюры привязаны к основному изображению контейнера
+        heif_image = heif_file[heif_file.primary_index]
+        boxes: list[int] = heif_image.info.get("thumbnails", [])
+        # наименьшая миниатюра, которая не меньше size
+        suitable = [(box, index) for index, box in enumerate(boxes) if box >= size]
+        if not suitable:
+            return None
+        _, index = min(suitable)
+        thumb = heif_image.get_thumbnail(index)
+        return np.array(thumb.to_pillow().convert("RGB"))
+
+    @classmethod
+    def read_tiff(cls, path: str, size: int) -> np.ndarray | None:
+        """
+        Возвращает массив как есть: каналы и разрядность приводит
+        `ImgUtils._tiff_to_rgb`.
+        """
+        with tifffile.TiffFile(path, is_ome=False) as tif:
+            pages = [
+                page
+                for page in tif.pages
+                if page.is_reduced
+            ]
+            if tif.series:
+                pages.extend(tif.series[0].levels[1:])
+            suitable = []
+            for page in pages:
+                shape = page.shape
+                if len(shape) == 3 and shape[0] <= 4:
+                    # каналы на первом месте
+                    shape = shape[1:]
+                if max(shape[:2]) >= size:
+                    suitable.append((max(shape[:2]), page))
+            if not suitable:
+                return None
+            _, page = min(suitable, key=lambda i: i[0])
+            return page.asarray()
+
+    @classmethod
+    def read_raw(cls, path: str, size: int) -> np.ndarray | None:
+        try:
+            with rawpy.imread(path) as raw:
+                thumb = raw.extract_thumb()
+        except (rawpy.LibRawNoThumbnailError, rawpy.LibRawUnsupportedThumbnailError):
+            return None
+        # встроенная копия меньше size: растянутая миниатюра хуже
+        # полного декодирования
+        if thumb.format == rawpy.ThumbFormat.BITMAP:
+            if max(thumb.data.shape[:2]) < size:
+                return None
+            return thumb.data
+        with Image.open(io.BytesIO(thumb.data)) as img:
+            if max(img.size) < size:
+                return None
+            # JPEG декодируется сразу в 2, 4 или 8 раз меньше,
+            # но не меньше size по каждой стороне
+            img.draft("RGB", (size, size))
+            img = ImageOps.exif_transpose(img)
+            return np.array(img.convert("RGB"))
@@ -0,0 +1,220 @@
+import io
+import mmap
+import struct
+import zlib
+from dataclasses import dataclass
+
+import numpy as np
+from PIL import Image
+
+
+@dataclass(slots=True)
+class PsdHeader:
+    """
+    Параметры:
+    - version: 1 — PSD, 2 — PSB
+    - channels: число каналов итогового изображения
+    - height, width: размер в пикселях
+    - depth: бит на канал, 1 / 8 / 16 / 32
+    - mode: цветовая модель, 1 — Grayscale, 3 — RGB, 4 — CMYK
+    - resources: (смещение, длина) раздела Image Resources
+    - image_data: смещение раздела Image Data (итоговое изображение)
+    """
+    version: int
+    channels: int
+    height: int
+    width: int
+    depth: int
+    mode: int
+    resources: tuple[int, int]
+    image_data: int
+
+
+class PsdReader:
+    """
+    Чтение PSD / PSB без Photoshop и qlmanage.
+
+    - `read_thumb_resource`: JPEG миниатюра из Image Resources (id 1036),
+      которую Photoshop сохраняет в каждом файле, обычно до 160 px
+    - `read_composite`: итоговое изображение из раздела Image Data,
+      которое Photoshop пишет при включенной "Maximize Compatibility".
+      При size > 0 распаковывается только каждая k-я строка и k-й столбец,
+      так что большие файлы не декодируются целиком.
+
+    Поддерживаются Grayscale, RGB и CMYK, 8 и 16 бит,
+    сжатие raw, RLE (PackBits) и ZIP.
+    """
+    thumb_resource_id = 1036
+    grayscale, rgb, cmyk = 1, 3, 4
+
+    @classmethod
+    def read(cls, path: str, size: int = 0) -> np.ndarray | None:
+        """
+        Возвращает RGB массив или None, если файл прочитать не удалось.
+        - size: нужный размер большей стороны, 0 — полный размер.
+          Если встроенная миниатюра не меньше size, используется она.
+        """
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                header = cls.read_header(data)
+                if header is None:
+                    return None
+                thumb = None
+                if size > 0:
+                    thumb = cls.read_thumb_resource(data, header)
+                    if thumb is not None and max(thumb.shape[:2]) >= size:
+                        return thumb
+                img = cls.read_composite(data, header, size)
+                if img is None and thumb is None:
+                    thumb = cls.read_thumb_resource(data, header)
+                return img if img is not None else thumb
+
+    @classmethod
+    def read_header(cls, data: mmap.mmap) -> PsdHeader | None:
+        if data[:4] != b"8BPS":
+            return None
+        version, = struct.unpack_from(">H", data, 4)
+        channels, height, width, depth, mode = struct.unpack_from(">HIIHH", data, 12)
+        offset = 26
+        # Color Mode Data
+        length, = struct.unpack_from(">I", data, offset)
+        offset += 4 + length
+        # Image Resources
+        length, = struct.unpack_from(">I", data, offset)
+        resources = (offset + 4, length)
+        offset += 4 + length
+        # Layer and Mask Information, в PSB длина 8 байт
+        if version == 2:
+            length, = struct.unpack_from(">Q", data, offset)
+            offset += 8 + length
+        else:
+            length, = struct.unpack_from(">I", data, offset)
+            offset += 4 + length
+        return PsdHeader(
+            version=version,
+            channels=channels,
+            height=height,
+            width=width,
+            depth=depth,
+            mode=mode,
+            resources=resources,
+            image_data=offset
+        )
+
+    @classmethod
+    def read_thumb_resource(cls, data: mmap.mmap, header: PsdHeader) -> np.ndarray | None:
+        start, length = header.resources
+        offset, end = start, start + length
+        while offset + 12 <= end:
+            if data[offset:offset + 4] != b"8BIM":
+                return None
+            resource_id, name_len = struct.unpack_from(">HB", data, offset + 4)
+            # имя — pascal строка, вместе с байтом длины выровнена до четного
+            offset += 6 + name_len + 1 + (name_len + 1) % 2
+            size, = struct.unpack_from(">I", data, offset)
+            offset += 4
+            if resource_id == cls.thumb_resource_id:
+                # 28 байт описания, затем JFIF
+                jpeg = data[offset + 28:offset + size]
+                try:
+                    with Image.open(io.BytesIO(jpeg)) as img:
+                        return np.array(img.convert("RGB"))
+                except Exception as e:
+                    print("PsdReader thumb resource error", e)
+                    return None
+            offset += size + size % 2
+        return None
+
+    @classmethod
+    def read_composite(cls, data: mmap.mmap, header: PsdHeader, size: int = 0) -> np.ndarray | None:
+        channels = {cls.grayscale: 1, cls.rgb: 3, cls.cmyk: 4}.get(header.mode)
+        if not channels or header.depth not in (8, 16) or header.channels < channels:
+            return None
+        step = max(1, max(header.width, header.height) // size) if size > 0 else 1
+        compression, = struct.unpack_from(">H", data, header.image_data)
+        offset = header.image_data + 2
+        if compression == 0:
+            planes = cls._read_raw(data, header, offset, channels, step)
+        elif compression == 1:
+            planes = cls._read_rle(data, header, offset, channels, step)
+        elif compression in (2, 3):
+            planes = cls._read_zip(data, header, offset, channels, step, compression == 3)
+        else:
+            return None
+        if planes is None:
+            return None
+        if header.depth == 16:
+            planes = [(i >> 8).astype(np.uint8) for i in planes]
+        if header.mode == cls.grayscale:
+            return np.dstack([planes[0]] * 3)
+        if header.mode == cls.cmyk:
+            # CMYK в PSD хранится инвертированным: 255 — нет краски
+            c, m, y, k = (i.astype(np.uint16) for i in planes)
+            planes = [(i * k // 255).astype(np.uint8) for i in (c, m, y)]
+        return np.dstack(planes)
+
+    @classmethod
+    def _row_bytes(cls, header: PsdHeader):
+        return header.width * header.depth // 8
+
+    @classmethod
+    def _to_plane(cls, rows: bytes, header: PsdHeader, step: int) -> np.ndarray:
+        dtype = np.dtype(">u2") if header.depth == 16 else np.dtype(np.uint8)
+        plane = np.frombuffer(rows, dtype=dtype).reshape(-1, header.width)
+        return plane[:, ::step].astype(dtype.newbyteorder("="))
+
+    @classmethod
+    def _read_raw(cls, data, header: PsdHeader, offset: int, channels: int, step: int):
+        row_bytes = cls._row_bytes(header)
+        planes = []
+        for channel in range(channels):
+            start = offset + channel * row_bytes * header.height
+            rows = b"".join(
+                data[start + y * row_bytes:start + (y + 1) * row_bytes]
+                for y in range(0, header.height, step)
+            )
+            planes.append(cls._to_plane(rows, header, step))
+        return planes
+
+    @classmethod
+    def _read_rle(cls, data, header: PsdHeader, offset: int, channels: int, step: int):
+        """
+        Перед данными идет таблица длин сжатых строк всех каналов,
+        поэтому ненужные строки пропускаются без распаковки.
+        Строки PackBits распаковывает Pillow.
+        """
+        # в PSB длины строк 4 байта, в PSD 2 байта
+        count_dtype = np.dtype(">u4" if header.version == 2 else ">u2")
+        total_rows = header.channels * header.height
+        table_end = offset + total_rows * count_dtype.itemsize
+        counts = np.frombuffer(data[offset:table_end], dtype=count_dtype).astype(np.int64)
+        starts = table_end + np.concatenate(([0], np.cumsum(counts)[:-1]))
+        row_bytes = cls._row_bytes(header)
+        planes = []
+        for channel in range(channels):
+            indexes = range(channel * header.height, (channel + 1) * header.height, step)
+            packed = b"".join(
+                data[starts[i]:starts[i] + counts[i]]
+                for i in indexes
+            )
+            img = Image.frombytes("L", (row_bytes, len(indexes)), packed, "packbits", "L")
+            planes.append(cls._to_plane(img.tobytes(), header, step))
+        return planes
+
+    @classmethod
+    def _read_zip(cls, data, header: PsdHeader, offset: int, channels: int, step: int, prediction: bool):
+        """
+        ZIP сжимает все каналы одним потоком, поэтому он распаковывается
+        целиком и прореживается уже после распаковки.
+        """
+        dtype = np.dtype(">u2") if header.depth == 16 else np.dtype(np.uint8)
+        raw = zlib.decompress(data[offset:])
+        rows = np.frombuffer(raw, dtype=dtype).astype(dtype.newbyteorder("="))
+        rows = rows.reshape(header.channels * header.height, header.width)
+        if prediction:
+            # значения хранятся разностью с соседом слева
+            rows = np.cumsum(rows, axis=1, dtype=rows.dtype)
+        return [
+            rows[i * header.height:(i + 1) * header.height][::step, ::step]
+            for i in range(channels)
+        ]
@@ -1,20 +1,28 @@
 import os
+import queue
+import threading
 import traceback
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from itertools import groupby
 from multiprocessing import Queue
 from pathlib import Path
 from time import sleep
+from typing import Iterable
 
 import sqlalchemy
 from typing_extensions import Literal
 
 from cfg import Static
-from system.database import Dbase, Dirs, Thumbs
+from system.database import BulkUpsert, Days, Dbase, Dirs, Failed, Thumbs
+from system.file_classifier import FileClassifier
+from system.fs_meta import FsMeta
 from system.lang import Lng
 from system.main_folder import Mf
 from system.multiprocess import BaseProcessWorker
 from system.shared_utils import ImgUtils
+from system.thumb_engine import ThumbEngine, ThumbTask
+from system.thumb_store import ThumbStore
 from system.utils import Utils
 
 
@@ -24,7 +32,31 @@ class Tools:
         filepath = Static.APP_DATA_DIR / "log.txt"
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_entry = f"[{timestamp}] {text}\n"
-        filepath.write_text(log_entry, encoding="utf-8", mode="a")
+        with open(filepath, "a", encoding="utf-8") as file:
+            file.write(log_entry)
+
+    @staticmethod
+    def merge_join(left: Iterable, right: Iterable, key: callable):
+        """
+        Сливает две отсортированные по `key` последовательности за один проход.
+        Возвращает пары (список из left, список из right) с одинаковым ключом.
+        Если ключ есть только с одной стороны, второй список пустой.
+        """
+        left_groups = groupby(left, key)
+        right_groups = groupby(right, key)
+        l_group = next(left_groups, None)
+        r_group = next(right_groups, None)
+        while l_group is not None or r_group is not None:
+            if r_group is None or (l_group is not None and l_group[0] < r_group[0]):
+                yield list(l_group[1]), []
+                l_group = next(left_groups, None)
+            elif l_group is None or r_group[0] < l_group[0]:
+                yield [], list(r_group[1])
+                r_group = next(right_groups, None)
+            else:
+                yield list(l_group[1]), list(r_group[1])
+                l_group = next(left_groups, None)
+                r_group = next(right_groups, None)
 
 
 class ScanerWorker(BaseProcessWorker):
@@ -70,6 +102,7 @@ class ForcedScanerItem:
     mf: Mf
     dirs_to_scan: list[str]
     lng_index: int
+    thumb_workers: int
 
 
 @dataclass(slots=True)
@@ -82,6 +115,8 @@ class BaseScanerItem:
     total_count: int
     current_count: int
     scaner_type: Literal["forced", "base"]
+    thumb_workers: int
+    classifier: FileClassifier = field(default_factory=FileClassifier)
 
 
 class ScanerParent:
@@ -93,14 +128,23 @@ class ScanerParent:
 class DirsChangeWatcher(ScanerParent):
     def __init__(self, scaner_item: BaseScanerItem):
         super().__init__(scaner_item)
+        # rel_path: актуальный mod директории из БД
+        # None, если директории больше нет
+        self.finder_mods: dict[str, int | None] = {}
 
     def is_changed(self) -> tuple[bool, list[DirItem]]:
+        """
+        Проверяет все директории из БД и запоминает их актуальный mod
+        в `finder_mods`, чтобы `DirsLoader.get_finder_dirs_delta`
+        обошел только измененные поддеревья.
+        """
         db_dirs: list[DirItem] = []
         mf_alias = self.scaner_item.mf.mf_alias
         base_path = self.scaner_item.mf.mf_current_path.strip(os.sep)
         q = (
             sqlalchemy.select(Dirs.rel_dir_path, Dirs.mod)
             .where(Dirs.mf_alias == mf_alias)
+            .order_by(Dirs.rel_dir_path)
         )
         with self.scaner_item.engine.connect() as conn:
             for rel_path, mod in conn.execute(q):
@@ -118,18 +162,21 @@ class DirsChangeWatcher(ScanerParent):
                 
         is_changed_flag = False
 
-        for item in db_dirs:
-            if not os.path.exists(item.abs_path):
+        stats = FsMeta.stat_many(i.abs_path for i in db_dirs)
+        for item, stat in zip(db_dirs, stats):
+            if isinstance(stat, (FileNotFoundError, NotADirectoryError)):
+                self.finder_mods[item.rel_path] = None
                 is_changed_flag = True
-                break
-            try:
-                stat = os.stat(item.abs_path)
-            except Exception as e:
-                print("DirsChangeWatcher error", item.abs_path, e)
+                continue
+            elif isinstance(stat, OSError):
+                print("DirsChangeWatcher error", item.abs_path, stat)
+                self.finder_mods[item.rel_path] = item.mod
                 continue
             if int(stat.st_mtime) > item.mod:
+                self.finder_mods[item.rel_path] = int(stat.st_mtime)
                 is_changed_flag = True
-                break
+            else:
+                self.finder_mods[item.rel_path] = item.mod
         if not db_dirs:
             is_changed_flag = True
         return (is_changed_flag, db_dirs)
@@ -158,41 +205,8 @@ class DirsLoader(ScanerParent):
         - не в стоп-листе `Mf.stop_list`
         """
         scaner = self.scaner_item
-        
-        text = (
-            f"{scaner.mf.mf_alias}: "
-            f"{Lng.search_in[scaner.lng_index].lower()}"
-        )
-        scaner.process_queue.put(text)
-
-        dirs: list[DirItem] = []
-        stack = [scaner.mf.mf_current_path]
-        
-        while stack:
-            try:
-                scandir_iterator = os.scandir(stack.pop())
-            except Exception as e:
-                print(traceback.format_exc())
-                continue
-                
-            for entry in scandir_iterator:
-                try:
-                    is_allowed = entry.name not in scaner.mf.mf_stop_list
-                    stmt = (entry.is_dir() and is_allowed)
-                except Exception as e:
-                    print(traceback.format_exc())
-                    continue
-                    
-                if stmt:
-                    stack.append(entry.path)
-                    rel_path = Utils.remove_mf_path(
-                        mf_path=scaner.mf.mf_current_path,
-                        abs_path=entry.path
-                    )
-                    stats = entry.stat()
-                    mod = int(stats.st_mtime)
-                    dir_item = DirItem(entry.path, rel_path, mod)
-                    dirs.append(dir_item)
+        self.send_search_text()
+        dirs = self.walk([scaner.mf.mf_current_path], set())
 
         try:
             stats = os.stat(scaner.mf.mf_current_path)
@@ -208,41 +222,117 @@ class DirsLoader(ScanerParent):
             
         return dirs
 
+    def get_finder_dirs_delta(
+            self,
+            db_dirs: list[DirItem],
+            finder_mods: dict[str, int | None]
+        ) -> list[DirItem]:
+        """
+        Собирает тот же список, что и `get_finder_dirs`, но без полного
+        обхода `Mf.curr_path`. Результат можно сразу передать в `DirsComparator`.
+
+        - finder_mods: актуальные mod директорий из `DirsChangeWatcher`
+
+        Директории из БД, которых нет в Finder или которые попали в стоп-лист,
+        отбрасываются. Неизмененные директории берутся из БД как есть.
+        В измененных директориях читаются подкаталоги: новые подкаталоги
+        обходятся рекурсивно, известные БД пропускаются, так как их mod
+        уже проверен.
+        """
+        scaner = self.scaner_item
+        self.send_search_text()
+        known_rel_paths = {i.rel_path for i in db_dirs}
+        changed_abs_paths: list[str] = []
+        dirs: list[DirItem] = []
+
+        for db_item in db_dirs:
+            mod = finder_mods.get(db_item.rel_path, db_item.mod)
+            if mod is None:
+                continue
+            parts = db_item.rel_path.strip(os.sep).split(os.sep)
+            if any(i in scaner.mf.mf_stop_list for i in parts):
+                continue
+            dirs.append(DirItem(db_item.abs_path, db_item.rel_path, mod))
+            if mod != db_item.mod:
+                changed_abs_paths.append(db_item.abs_path)
+
+        dirs.extend(self.walk(changed_abs_paths, known_rel_paths))
+        return dirs
+
+    def walk(self, abs_paths: list[str], known_rel_paths: set[str]) -> list[DirItem]:
+        """
+        Рекурсивно обходит подкаталоги `abs_paths`.
+        Подкаталоги из `known_rel_paths` не попадают в результат и не обходятся.
+        """
+        scaner = self.scaner_item
+        dirs: list[DirItem] = []
+        # обход по уровням: все директории одного уровня читаются параллельно
+        level = list(abs_paths)
+        
+        while level:
+            next_level: list[str] = []
+            for path, entries in FsMeta.scandir_many(level):
+                if entries is None:
+                    continue
+                for entry in entries:
+                    if not entry.is_dir or entry.name in scaner.mf.mf_stop_list:
+                        continue
+                    rel_path = Utils.remove_mf_path(
+                        mf_path=scaner.mf.mf_current_path,
+                        abs_path=entry.path
+                    )
+                    if rel_path in known_rel_paths:
+                        continue
+                    next_level.append(entry.path)
+                    dir_item = DirItem(entry.path, rel_path, entry.mod)
+                    dirs.append(dir_item)
+            level = next_level
+
+        return dirs
+
+    def send_search_text(self):
+        scaner = self.scaner_item
+        text = (
+            f"{scaner.mf.mf_alias}: "
+            f"{Lng.search_in[scaner.lng_index].lower()}"
+        )
+        scaner.process_queue.put(text)
+
 
 class DirsComparator(ScanerParent):
-    def __init__(self, scaner_item: BaseScanerItem, finder_dirs: list[DirItem], db_dirs: list[DirItem]):
+    def __init__(self, scaner_item: BaseScanerItem, finder_dirs: list[DirItem], db_dirs: Iterable[DirItem]):
+        """
+        - finder_dirs: сортируется по rel_path на месте
+        - db_dirs: уже отсортированы по rel_path, как их отдает
+          `DirsChangeWatcher.is_changed` (ORDER BY rel_dir_path)
+        """
         super().__init__(scaner_item)
         self.finder_dirs = finder_dirs
         self.db_dirs = db_dirs
 
-    def get_dirs_to_remove(self):
-        """
-        Собирает список `DirItem`:
-        - которых больше нет в Finder, но есть в базе данных
-        - которые нужно удалить из базы данных
+    def start(self):
         """
-        rel_paths = [dir_item.rel_path for dir_item in self.finder_dirs]
-        return [
-            dir_item
-            for dir_item in self.db_dirs
-            if dir_item.rel_path not in rel_paths
-        ]
+        Сравнивает Finder и БД по rel_path за один проход слиянием.
 
-    def get_dirs_to_scan(self):
-        """
-        Собирает список `DirItem`:
-        - которые есть в Finder, но нет в базе данных
-        - которые нужно добавить в базу данных
+        Собирает списки `DirItem`:
+        - которых больше нет в Finder, но есть в базе данных
+        - которые есть в Finder, но нет в базе данных или у которых изменился mod
         """
-        rel_paths = [
-            (dir_item.rel_path, dir_item.mod)
-            for dir_item in self.db_dirs
-        ]
-        return [
-            dir_item
-            for dir_item in self.finder_dirs
-            if (dir_item.rel_path, dir_item.mod) not in rel_paths
-        ]
+        dirs_to_remove: list[DirItem] = []
+        dirs_to_scan: list[DirItem] = []
+        key = lambda dir_item: dir_item.rel_path
+        self.finder_dirs.sort(key=key)
+        for finder_items, db_items in Tools.merge_join(self.finder_dirs, self.db_dirs, key):
+            if not finder_items:
+                dirs_to_remove.extend(db_items)
+                continue
+            db_mods = {i.mod for i in db_items}
+            dirs_to_scan.extend(
+                dir_item
+                for dir_item in finder_items
+                if dir_item.mod not in db_mods
+            )
+        return dirs_to_remove, dirs_to_scan
 
 
 class DirsDbUpdater(ScanerParent):
@@ -260,25 +350,13 @@ class DirsDbUpdater(ScanerParent):
         if not os.path.exists(scaner.mf.mf_current_path):
             return
             
-        with scaner.engine.begin() as conn:
-            rel_paths = [dir_item.rel_path for dir_item in self.dirs_to_scan]
-            del_stmt = (
-                sqlalchemy.delete(Dirs.table)
-                .where(Dirs.rel_dir_path.in_(rel_paths))
-                .where(Dirs.mf_alias == scaner.mf.mf_alias)
-            )
-            conn.execute(del_stmt)
-            
-            values_list = [
-                {
+        with BulkUpsert.dirs(scaner.engine) as writer:
+            for dir_item in self.dirs_to_scan:
+                writer.add({
                     Dirs.rel_dir_path.name: dir_item.rel_path,
                     Dirs.mod.name: dir_item.mod,
                     Dirs.mf_alias.name: scaner.mf.mf_alias
-                }
-                for dir_item in self.dirs_to_scan
-            ]
-            if values_list:
-                conn.execute(sqlalchemy.insert(Dirs.table), values_list)
+                })
 
 
 class ImgLoader(ScanerParent):
@@ -295,91 +373,117 @@ class ImgLoader(ScanerParent):
         - finder_images список ImgItem
         """
         finder_images: list[ImgItem] = []
-        
-        # Используем сохраненный в self список директорий
-        for dir_item in self.dirs_to_scan:
-            try:
-                scandir_iterator = os.scandir(dir_item.abs_path)
-            except Exception as e:
-                print(traceback.format_exc())
-                continue
-                
-            for entry in scandir_iterator:
-                if entry.path.endswith(ImgUtils.ext_all):
-                    try:
-                        stat = entry.stat()
-                    except Exception as e:
-                        print(traceback.format_exc())
-                        continue
-                        
-                    size = int(stat.st_size)
-                    mod = int(stat.st_mtime)
-                    
-                    img_item = ImgItem(entry.path, size, mod)
-                    finder_images.append(img_item)
-                    
+        for dir_item, images in self.iter_finder_images():
+            finder_images.extend(images)
         return finder_images
 
-    def get_db_images(self) -> list[ImgItem]:
+    def iter_finder_images(self):
         """
-        Возвращает информацию об изображениях в БД из указанных директорий:
-        - db_images список ImgItem
+        Читает указанные директории параллельно через `FsMeta` и
+        возвращает пары (DirItem, список ImgItem) в исходном порядке.
+        AppleDouble и пустые файлы отсеиваются, см. `FileClassifier`.
+        """
+        classifier = self.scaner_item.classifier
+        abs_paths = (i.abs_path for i in self.dirs_to_scan)
+        scandir_results = FsMeta.scandir_many(abs_paths, ImgUtils.ext_all)
+        for dir_item, (path, entries) in zip(self.dirs_to_scan, scandir_results):
+            if entries is None:
+                yield dir_item, []
+                continue
+            finder_images = [
+                ImgItem(entry.path, entry.size, entry.mod)
+                for entry in entries
+                if not entry.is_dir
+                and not classifier.check_name(entry.name, entry.size)
+            ]
+            yield dir_item, finder_images
+
+    def iter_db_images(self):
+        """
+        Отдает `ImgItem` из БД для указанных директорий по одному,
+        в каждой директории по возрастанию rel_img_path.
+        Записи директории выбираются по ключу (mf_alias, root, rel_img_path)
+        индекса thumbs_brand_resol, см. `Migrations.dir_keys`.
         """
-        # Используем self.scaner_item напрямую
         scaner = self.scaner_item
-        conn = scaner.engine.connect()
-        db_images: list[ImgItem] = []
-        
-        # Используем сохраненный в self список директорий
-        for dir_item in self.dirs_to_scan:
-            stmt = (
-                sqlalchemy.select(
-                    Thumbs.rel_thumb_path,
-                    Thumbs.rel_img_path,
-                    Thumbs.size,
-                    Thumbs.mod
-                )
-                .where(Thumbs.mf_alias == scaner.mf.mf_alias)
-            )
-            
-            if dir_item.rel_path == os.sep:
-                one_slash = "/%"
-                two_slash = "/%/%"
-                stmt = (
-                    stmt
-                    .where(Thumbs.rel_img_path.ilike(one_slash))
-                    .where(Thumbs.rel_img_path.not_ilike(two_slash))
-                )
-            else:
-                one_slash = f"{dir_item.rel_path}/%"
-                two_slash = f"{dir_item.rel_path}/%/%"
+        with scaner.engine.connect() as conn:
+            for dir_item in self.dirs_to_scan:
                 stmt = (
-                    stmt
-                    .where(Thumbs.rel_img_path.ilike(one_slash))
-                    .where(Thumbs.rel_img_path.not_ilike(two_slash))
-                )
-                
-            for rel_thumb_path, rel_path, size, mod in conn.execute(stmt):
-                abs_img_path = Utils.add_mf_path(
-                    mf_path=scaner.mf.mf_current_path,
-                    rel_path=rel_path
-                )
-                img_item = ImgItem(
-                    abs_img_path, size, mod, rel_thumb_path
+                    sqlalchemy.select(
+                        Thumbs.rel_thumb_path,
+                        Thumbs.rel_img_path,
+                        Thumbs.size,
+                        Thumbs.mod
+                    )
+                    .where(Thumbs.mf_alias == scaner.mf.mf_alias)
+                    .where(Thumbs.root == dir_item.rel_path)
+                    .order_by(Thumbs.rel_img_path)
                 )
-                db_images.append(img_item)
-                
-        conn.close()
-        return db_images
+                for rel_thumb_path, rel_path, size, mod in conn.execute(stmt):
+                    abs_img_path = Utils.add_mf_path(
+                        mf_path=scaner.mf.mf_current_path,
+                        rel_path=rel_path
+                    )
+                    yield ImgItem(abs_img_path, size, mod, rel_thumb_path)
+
+
+class ImgLoaderThread(ScanerParent):
+    """
+    Читает директории в отдельном потоке и складывает пары
+    (DirItem, список ImgItem из Finder) в ограниченную очередь.
+    Пока основной поток сравнивает и индексирует одну директорию,
+    следующие уже читаются с диска.
+    """
+    queue_size = 4
+
+    def __init__(self, scaner_item: BaseScanerItem, dirs_to_scan: list[DirItem]):
+        super().__init__(scaner_item)
+        self.dirs_to_scan = dirs_to_scan
+        self.dirs_queue = queue.Queue(maxsize=self.queue_size)
+        self.stop_flag = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def __iter__(self):
+        self.thread.start()
+        while True:
+            item: tuple[DirItem, list[ImgItem]] | None = self.dirs_queue.get()
+            if item is None:
+                return
+            yield item
+
+    def stop(self):
+        self.stop_flag.set()
+
+    def _run(self):
+        img_loader = ImgLoader(self.scaner_item, self.dirs_to_scan)
+        for dir_item, finder_images in img_loader.iter_finder_images():
+            if self.stop_flag.is_set():
+                break
+            if not self._put((dir_item, finder_images)):
+                return
+        self._put(None)
+
+    def _put(self, item):
+        while not self.stop_flag.is_set():
+            try:
+                self.dirs_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
 
 
 class ImgComparator(ScanerParent):
 
-    def __init__(self, scaner_item: BaseScanerItem, finder_images: list[ImgItem], db_images: list[ImgItem]):
-        # Сохраняем списки изображений как свойства экземпляра класса
+    def __init__(self, scaner_item: BaseScanerItem, finder_images: list[ImgItem], db_images: Iterable[ImgItem]):
+        """
+        - finder_images: сортируется по abs_img_path на месте
+        - db_images: уже отсортированы по пути, см. `ImgLoader.iter_db_images`
+        """
         super().__init__(scaner_item)
         self.finder_images = finder_images
         self.db_images = db_images
+        self.changed_images: dict[str, ImgItem] = {}
 
     def start(self):
         """
@@ -388,35 +492,35 @@ class ImgComparator(ScanerParent):
 
         Собирает списки `ImgItem`:
         - изображения, которых больше нет в Finder но есть в БД
-        - изображения, которых нет в БД, но есть в Finder
+        - изображения, которых нет в БД или которые изменились в Finder
+
+        Измененный файл не считается удаленным: его запись в THUMBS
+        перезаписывается при добавлении, и fav / coll сохраняются.
+        Прежние записи измененных файлов остаются в `changed_images`
+        по abs_img_path.
         """
-        # Используем списки из свойств self
-        finder_dict = {
-            (i.abs_img_path, i.size, i.mod): i
-            for i in self.finder_images
-        }
-        db_dict = {
-            (i.abs_img_path, i.size, i.mod): i
-            for i in self.db_images
-        }
-        
-        removed_images = [
-            img_item
-            for data, img_item in db_dict.items()
-            if data not in finder_dict
-        ]
-        new_images = [
-            img_item
-            for data, img_item in finder_dict.items()
-            if data not in db_dict
-        ]        
+        removed_images: list[ImgItem] = []
+        new_images: list[ImgItem] = []
+        key = lambda img_item: img_item.abs_img_path
+        self.finder_images.sort(key=key)
+        for finder_items, db_items in Tools.merge_join(self.finder_images, self.db_images, key):
+            if not finder_items:
+                removed_images.extend(db_items)
+                continue
+            db_data = {(i.size, i.mod) for i in db_items}
+            for finder_item in finder_items:
+                if (finder_item.size, finder_item.mod) in db_data:
+                    continue
+                new_images.append(finder_item)
+                if db_items:
+                    self.changed_images[finder_item.abs_img_path] = db_items[0]
         
         return removed_images, new_images
 
 
 class ThumbsUpdater(ScanerParent):
 
-    def __init__(self, scaner_item: BaseScanerItem, removed_images: list[ImgItem], new_images: list[ImgItem]):
+    def __init__(self, scaner_item: BaseScanerItem, removed_images: list[ImgItem], new_images: Iterable[ImgItem]):
         # Передаем scaner_item в родительский класс
         super().__init__(scaner_item)
         # Сохраняем списки изображений как свойства экземпляра класса
@@ -432,12 +536,12 @@ class ThumbsUpdater(ScanerParent):
         """
         scaner = self.scaner_item
 
-        def _del_records(good_chunk: list[ImgItem]):
+        def _del_records(chunk: list[ImgItem]):
             """
             Удаляет из БД записи о миниатюрах.
             """
             with scaner.engine.begin() as conn:
-                rel_thumb_paths = [i.rel_thumb_path for i in good_chunk]
+                rel_thumb_paths = [i.rel_thumb_path for i in chunk]
                 if not rel_thumb_paths:
                     return
                 stmt = (
@@ -447,24 +551,13 @@ class ThumbsUpdater(ScanerParent):
                 )
                 conn.execute(stmt)
 
-        def _remove_thumb(img_item: ImgItem):
-            scaner.current_count += 1
-            scaner.process_queue.put(
-                self.get_gui_text()
-            )
-            abs_thumb_path = Utils.get_abs_thumb_path(
-                img_item.rel_thumb_path
-            )
-            try:
-                os.remove(abs_thumb_path)
-                try:
-                    os.rmdir(os.path.dirname(abs_thumb_path))
-                except OSError:
-                    pass
-                return True
-            except Exception as e:
-                print(traceback.format_exc())
-                return False
+        def _remove_thumbs(chunk: list[ImgItem]):
+            for img_item in chunk:
+                scaner.current_count += 1
+                scaner.process_queue.put(
+                    self.get_gui_text()
+                )
+            ThumbStore.remove([i.rel_thumb_path for i in chunk])
 
         step = 10
         chunked_del_images = [
@@ -474,110 +567,140 @@ class ThumbsUpdater(ScanerParent):
         for chunk in chunked_del_images:
             if not os.path.exists(scaner.mf.mf_current_path):
                 break
-            good_chunk: list[ImgItem] = []
-            for img_item in chunk:
-                if _remove_thumb(img_item):
-                    good_chunk.append(img_item)
-            if good_chunk:
-                _del_records(good_chunk)
+            _remove_thumbs(chunk)
+            _del_records(chunk)
 
     def add_thumbs(self):
         """
-        Создает миниатюры и соответствующие записи из БД пакетами по 10.
-
-        Перед каждым пакетом проверяет доступность источника (Mf) и
+        Создает миниатюры в пуле процессов и записывает их в БД
+        через `BulkUpsert` пакетами по числу строк или по времени.
+        Изображения, которые не удалось прочитать, записываются в FAILED
+        и пропускаются до истечения интервала повтора, см. `Failed`.
+        Не записываются сбои не из-за файла (`ThumbTask.transient`),
+        исчезнувшие файлы и ошибки при недоступном Mf.
+
+        Каждые 10 изображений проверяет доступность источника (Mf) и
         прерывается при его недоступности.
         """
         scaner = self.scaner_item
-
-        def _upsert_records(good_chunk: list[ImgItem]):
-            """
-            Добавляет записи в БД об миниатюрах.
-            """
-            with scaner.engine.begin() as conn:
-                rel_thumb_paths = [i.rel_thumb_path for i in good_chunk]
-                if not rel_thumb_paths:
-                    return
-                stmt = (
-                    sqlalchemy.delete(Thumbs.table)
-                    .where(Thumbs.rel_thumb_path.in_(rel_thumb_paths))
-                    .where(Thumbs.mf_alias == scaner.mf.mf_alias)
+        now = int(datetime.now().timestamp())
+        with scaner.engine.connect() as conn:
+            stmt = Failed.mf_stmt(scaner.mf.mf_alias)
+            failed = {
+                rel_img_path: (size, mod, attempts, next_try)
+                for rel_img_path, size, mod, attempts, next_try
+                in conn.execute(stmt)
+            }
+        fixed: list[str] = []
+
+        def _get_tasks():
+            for img_item in self.new_images:
+                rel_img_path = Utils.remove_mf_path(
+                    mf_path=scaner.mf.mf_current_path,
+                    abs_path=img_item.abs_img_path
                 )
-                conn.execute(stmt)
+                row = failed.get(rel_img_path)
+                if row:
+                    size, mod, attempts, next_try = row
+                    if (size, mod) == (img_item.size, img_item.mod) and next_try > now:
+                        scaner.current_count += 1
+                        continue
+                thumb_path = Utils.create_abs_thumb_path(
+                    rel_img_path=rel_img_path,
+                    mf_alias=scaner.mf.mf_alias
+                )
+                yield ThumbTask(img_item.abs_img_path, thumb_path, img_item)
 
-                values_list = []
-                for img_item in good_chunk:
-                    rel_img_path = Utils.remove_mf_path(
-                        mf_path=scaner.mf.mf_current_path,
-                        abs_path=img_item.abs_img_path
-                    )
-                    abs_thumb_path = Utils.create_abs_thumb_path(
-                        rel_img_path=rel_img_path,
-                        mf_alias=scaner.mf.mf_alias
-                    )
-                    rel_thumb_path = Utils.get_rel_thumb_path(abs_thumb_path)
-                    root = os.path.dirname(rel_img_path)
-                    properties = (
-                        rel_img_path,
-                        rel_thumb_path,
-                        img_item.size,
-                        img_item.mod,
-                        root,
-                        scaner.mf.mf_alias
+        # миниатюры создаются параллельно в пуле процессов,
+        # а в БД попадают в порядке self.new_images
+        step = 10
+        with (
+            ThumbEngine(scaner.thumb_workers) as engine,
+            BulkUpsert.thumbs(scaner.engine, engine.flush_store) as writer,
+            BulkUpsert.failed(scaner.engine) as failed_writer
+        ):
+            for task, result in engine.imap(_get_tasks()):
+                scaner.current_count += 1
+                scaner.process_queue.put(
+                    self.get_gui_text()
+                )
+                if scaner.current_count % step == 0:
+                    if not os.path.exists(scaner.mf.mf_current_path):
+                        break
+                values = self.get_values(task)
+                rel_img_path = values[Thumbs.rel_img_path.name]
+                if result:
+                    writer.add(values)
+                    if rel_img_path in failed:
+                        fixed.append(rel_img_path)
+                elif task.transient:
+                    continue
+                elif not os.path.exists(scaner.mf.mf_current_path):
+                    # файл не прочитался, потому что Mf отключился
+                    break
+                elif os.path.exists(task.abs_img_path):
+                    failed_writer.add(
+                        self.get_failed_values(task, failed.get(rel_img_path))
                     )
-                    for i in properties:
-                        if i is None:
-                            continue
-                    values_list.append({
-                        Thumbs.rel_img_path.name: rel_img_path,
-                        Thumbs.rel_thumb_path.name: rel_thumb_path,
-                        Thumbs.size.name: img_item.size,
-                        Thumbs.birth.name: 0,
-                        Thumbs.mod.name: img_item.mod,
-                        Thumbs.root.name: root,
-                        Thumbs.coll.name: "none",
-                        Thumbs.fav.name: 0,
-                        Thumbs.mf_alias.name: scaner.mf.mf_alias
-                    })
-                stmt = sqlalchemy.insert(Thumbs.table).values(values_list)
-                conn.execute(stmt)
+        if fixed:
+            self.del_failed(fixed)
 
-        def _create_thumb(img_item: ImgItem):
-            """
-            Создает и записывает в `hashdir` миниатюру.
-            """
-            scaner.current_count += 1
-            scaner.process_queue.put(
-                self.get_gui_text()
-            )
-            img = ImgUtils.read_img(img_item.abs_img_path)
-            img = ImgUtils.fit_to_thumb(img, Static.THUMB_MAX_SIZE)
-            rel_img_path = Utils.remove_mf_path(
+    def get_failed_values(self, task: ThumbTask, row: tuple | None):
+        """
+        row: прежняя запись из FAILED (size, mod, attempts, next_try) или None
+        """
+        scaner = self.scaner_item
+        img_item: ImgItem = task.data
+        attempts = 1
+        if row and (row[0], row[1]) == (img_item.size, img_item.mod):
+            attempts = row[2] + 1
+        now = int(datetime.now().timestamp())
+        return {
+            Failed.mf_alias.name: scaner.mf.mf_alias,
+            Failed.rel_img_path.name: Utils.remove_mf_path(
                 mf_path=scaner.mf.mf_current_path,
                 abs_path=img_item.abs_img_path
-            )
-            thumb_path = Utils.create_abs_thumb_path(
-                rel_img_path=rel_img_path,
-                mf_alias=scaner.mf.mf_alias
-            )
-            if ImgUtils.write_thumb(thumb_path, img):
-                return True
-            return False
+            ),
+            Failed.size.name: img_item.size,
+            Failed.mod.name: img_item.mod,
+            Failed.attempts.name: attempts,
+            Failed.last_try.name: now,
+            Failed.next_try.name: now + Failed.get_delay(attempts)
+        }
 
-        step = 10
-        chunked_new_images = [
-            self.new_images[i:i+step]
-            for i in range(0, len(self.new_images), step)
-        ]
-        for chunk in chunked_new_images:
-            if not os.path.exists(scaner.mf.mf_current_path):
-                break
-            good_chunk: list[ImgItem] = []
-            for img_item in chunk:
-                if _create_thumb(img_item):
-                    good_chunk.append(img_item)
-            if good_chunk:
-                _upsert_records(good_chunk)
+    def del_failed(self, rel_img_paths: list[str]):
+        scaner = self.scaner_item
+        step = 500
+        with scaner.engine.begin() as conn:
+            for i in range(0, len(rel_img_paths), step):
+                stmt = (
+                    sqlalchemy.delete(Failed.table)
+                    .where(Failed.mf_alias == scaner.mf.mf_alias)
+                    .where(Failed.rel_img_path.in_(rel_img_paths[i:i+step]))
+                )
+                conn.execute(stmt)
+
+    def get_values(self, task: ThumbTask):
+        scaner = self.scaner_item
+        img_item: ImgItem = task.data
+        rel_img_path = Utils.remove_mf_path(
+            mf_path=scaner.mf.mf_current_path,
+            abs_path=img_item.abs_img_path
+        )
+        return {
+            Thumbs.rel_img_path.name: rel_img_path,
+            Thumbs.rel_thumb_path.name: Utils.get_rel_thumb_path(task.abs_thumb_path),
+            Thumbs.size.name: img_item.size,
+            Thumbs.birth.name: 0,
+            Thumbs.mod.name: img_item.mod,
+            Thumbs.root.name: os.path.dirname(rel_img_path),
+            Thumbs.coll.name: "none",
+            Thumbs.fav.name: 0,
+            Thumbs.mf_alias.name: scaner.mf.mf_alias,
+            Thumbs.day.name: Days.from_timestamp(img_item.mod),
+            Thumbs.width.name: task.width,
+            Thumbs.height.name: task.height
+        }
     
     def get_gui_text(self):
         # sleep(0.5)
@@ -598,52 +721,104 @@ class DirImagesUpdater(ScanerParent):
         super().__init__(scaner_item)
         # Сохраняем список директорий для сканирования как свойство экземпляра
         self.dirs_to_scan = dirs_to_scan
+        self.removed_images: list[ImgItem] = []
+        self.removed_total = 0
+        self.remove_allowed = False
+        self.canceled = False
 
     def start(self):
         """
-        На основе сохраненного списка добавляются и удаляются миниатюры в "hashdir",
-        а также обновляются базы данных THUMBS и DIRS.
+        Директории обрабатываются потоком: чтение директорий идет в
+        `ImgLoaderThread`, сравнение с БД — по одной директории,
+        создание миниатюр — в пуле процессов `ThumbEngine`, запись в
+        THUMBS — пакетами по мере готовности миниатюр.
+        Исчезнувшие изображения удаляются после прохода, когда известно
+        их общее число, см. `can_remove`. Таблица DIRS обновляется в самом конце.
         """
         # Используем свойства экземпляра self
         scaner = self.scaner_item
-        
-        img_loader = ImgLoader(scaner, self.dirs_to_scan)
-        finder_images = img_loader.get_finder_images()
-        db_images = img_loader.get_db_images()
 
-        img_comparator = ImgComparator(scaner, finder_images, db_images)
-        removed_images, new_images = img_comparator.start()
+        img_reader = ImgLoaderThread(scaner, self.dirs_to_scan)
+        try:
+            new_images = self.iter_new_images(img_reader)
+            thumbs_updater = ThumbsUpdater(scaner, [], new_images)
+            thumbs_updater.add_thumbs()
+        finally:
+            img_reader.stop()
+
+        # удаление подтверждается один раз за весь проход, до него
+        # ни одна миниатюра и ни одна запись THUMBS не удаляется
+        self.removed_total = len(self.removed_images)
+        if not self.can_remove():
+            self.canceled = True
+            return
+
+        if self.removed_images:
+            thumbs_updater = ThumbsUpdater(scaner, self.removed_images, [])
+            thumbs_updater.del_thumbs()
+
+        dirs_updater = DirsDbUpdater(scaner, self.dirs_to_scan)
+        dirs_updater.upsert_records()
+
+        summary = scaner.classifier.get_summary()
+        if summary:
+            print(scaner.mf.mf_alias, "пропущено до декодирования:", summary)
 
+    def iter_new_images(self, img_reader: ImgLoaderThread):
+        """
+        Для каждой прочитанной директории сравнивает Finder и БД,
+        отдает новые изображения и копит исчезнувшие в `removed_images`.
+        Новые файлы, содержимое которых не похоже на изображение,
+        не передаются в `ThumbEngine`, см. `FileClassifier.filter_heads`.
+        """
+        scaner = self.scaner_item
+        for dir_item, finder_images in img_reader:
+            img_loader = ImgLoader(scaner, [dir_item])
+            db_images = img_loader.iter_db_images()
+
+            img_comparator = ImgComparator(scaner, finder_images, db_images)
+            removed_images, new_images = img_comparator.start()
+
+            if new_images:
+                allowed = scaner.classifier.filter_heads(
+                    [i.abs_img_path for i in new_images]
+                )
+                # измененный файл, который больше не похож на изображение,
+                # удаляется из THUMBS вместе с прежней миниатюрой
+                removed_images.extend(
+                    img_comparator.changed_images[i.abs_img_path]
+                    for i, ok in zip(new_images, allowed)
+                    if not ok and i.abs_img_path in img_comparator.changed_images
+                )
+                new_images = [i for i, ok in zip(new_images, allowed) if ok]
+            self.removed_images.extend(removed_images)
+
+            # общий счет для отображения в GUI растет по мере чтения
+            scaner.total_count += len(removed_images) + len(new_images)
+            yield from new_images
+
+    def can_remove(self):
         # мы проверяем на удаление
         # если из каталога удаляется более Х изображений
         # это подозрительно
         # возможно пользователь указал неправильный путь к каталогу
         # из-за чего приложение пытается все удалить из старого каталога
         # чтобы добавить все из нового
+        scaner = self.scaner_item
         stmt = all((
-            len(removed_images) > self.removed_images_count,
+            self.removed_total > self.removed_images_count,
             scaner.scaner_type == "base",
+            not self.remove_allowed
         ))
-        if stmt:
-            data = (scaner.mf.mf_alias, len(removed_images))
-            scaner.process_queue.put(data)
-            while True:
-                if not scaner.response_queue.empty():
-                    can_continue = scaner.response_queue.get()
-                    if can_continue:
-                        break
-                    else:
-                        return
-
-        # общий счет для отображения в GUI
-        scaner.total_count = len(removed_images) + len(new_images)
-        
-        thumbs_updater = ThumbsUpdater(scaner, removed_images, new_images)
-        thumbs_updater.del_thumbs()
-        thumbs_updater.add_thumbs()
-        
-        dirs_updater = DirsDbUpdater(scaner, self.dirs_to_scan)
-        dirs_updater.upsert_records()
+        if not stmt:
+            return True
+        data = (scaner.mf.mf_alias, self.removed_total)
+        scaner.process_queue.put(data)
+        while True:
+            if not scaner.response_queue.empty():
+                self.remove_allowed = scaner.response_queue.get()
+                return self.remove_allowed
+            sleep(0.1)
 
 
 class RemovedDirsCleaner(ScanerParent):
@@ -656,30 +831,21 @@ class RemovedDirsCleaner(ScanerParent):
 
     def remove_thumbs(self):
         """
-        Удаляет миниатюры из 'hashdir' и записи в базе данных Thumbs
+        Удаляет миниатюры из `ThumbStore` и записи в базе данных Thumbs
         """
         scaner = self.scaner_item
 
         def _get_thumbs(conn: sqlalchemy.Connection, dir_item: DirItem):
-            one_slash = f"{dir_item.rel_path}/%"
+            # все пути внутри директории, диапазон по индексу (brand, short_src):
+            # "/dir/" <= rel_img_path < "/dir0", "0" идет сразу после "/"
             stmt_thumbs_to_remove = (
                 sqlalchemy.select(Thumbs.rel_thumb_path)
-                .where(Thumbs.rel_img_path.ilike(one_slash))
                 .where(Thumbs.mf_alias == scaner.mf.mf_alias)
+                .where(Thumbs.rel_img_path >= f"{dir_item.rel_path}/")
+                .where(Thumbs.rel_img_path < f"{dir_item.rel_path}0")
             )
             return conn.execute(stmt_thumbs_to_remove).scalars().all()
         
-        def _remove_thumb(rel_thumb_path: str):
-            abs_thumb_path = Utils.get_abs_thumb_path(rel_thumb_path)
-            try:
-                os.remove(abs_thumb_path)
-            except Exception as e:
-                print(traceback.format_exc())
-            try:
-                os.rmdir(os.path.dirname(abs_thumb_path))
-            except OSError:
-                pass
-
         def _remove_records(conn: sqlalchemy.Connection, thumbs_to_remove):
             del_stmt = (
                 sqlalchemy.delete(Thumbs.table)
@@ -693,8 +859,7 @@ class RemovedDirsCleaner(ScanerParent):
             for dir_item in self.removed_dirs:
                 thumbs_to_remove = _get_thumbs(conn, dir_item)
                 if thumbs_to_remove:
-                    for rel_thumb_path in thumbs_to_remove:
-                        _remove_thumb(rel_thumb_path)
+                    ThumbStore.remove(thumbs_to_remove)
                     _remove_records(conn, thumbs_to_remove)
 
     def remove_dirs(self):
@@ -716,7 +881,7 @@ class RemovedDirsCleaner(ScanerParent):
 
 class BaseScaner:
     @staticmethod
-    def start(mf_list: list[Mf], lng_index: int, queue: Queue, response_queue: Queue):
+    def start(mf_list: list[Mf], lng_index: int, thumb_workers: int, queue: Queue, response_queue: Queue):
         engine = Dbase.create_engine()
         # нельзя обращаться сразу к Mf так как это мультипроцесс
         for mf in mf_list:
@@ -728,7 +893,8 @@ class BaseScaner:
                 lng_index=lng_index,
                 total_count=0,
                 current_count=0,
-                scaner_type="base"
+                scaner_type="base",
+                thumb_workers=thumb_workers
             )
             avaiable_mf_path = scaner_item.mf.get_avaiable_mf_path()
             if avaiable_mf_path:
@@ -758,12 +924,18 @@ class BaseScaner:
             print(scaner_item.mf.mf_alias, "not changed")
             return
         dirs_loader = DirsLoader(scaner_item)
-        finder_dirs = dirs_loader.get_finder_dirs()
+        if db_dirs:
+            # обходим только поддеревья, в которых изменился mod
+            finder_dirs = dirs_loader.get_finder_dirs_delta(
+                db_dirs,
+                watcher.finder_mods
+            )
+        else:
+            finder_dirs = dirs_loader.get_finder_dirs()
         if not finder_dirs:
             return
         dirs_comparator = DirsComparator(scaner_item, finder_dirs, db_dirs)
-        removed_dirs = dirs_comparator.get_dirs_to_remove()
-        dirs_to_scan = dirs_comparator.get_dirs_to_scan()
+        removed_dirs, dirs_to_scan = dirs_comparator.start()
         # это нужно, когда удалена вся папка "имя папки"
         # то есть не когда "имя папки" пуста, но существует,
         # а когда папка "имя папки" не существуетre
@@ -815,6 +987,7 @@ class ForcedScaner:
             mf=item.mf,
             dirs_to_scan=item.dirs_to_scan,
             lng_index=item.lng_index,
+            thumb_workers=item.thumb_workers,
             queue=queue,
             response_queue=response_queue
         )
@@ -822,7 +995,7 @@ class ForcedScaner:
 
 
     @staticmethod
-    def single_mf_scan(mf: Mf, dirs_to_scan: list[str], lng_index: int, queue: Queue, response_queue: Queue):
+    def single_mf_scan(mf: Mf, dirs_to_scan: list[str], lng_index: int, thumb_workers: int, queue: Queue, response_queue: Queue):
         """
         Сканирует заданне директории в пределах Mf на предмет новых или
         удаленных изображений.
@@ -840,7 +1013,8 @@ class ForcedScaner:
             lng_index=lng_index, 
             total_count=0,
             current_count=0,
-            scaner_type="forced"
+            scaner_type="forced",
+            thumb_workers=thumb_workers
         )
         avaiable_mf_path = scaner_item.mf.get_avaiable_mf_path()
         if avaiable_mf_path:
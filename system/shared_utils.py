@@ -1,7 +1,7 @@
 import io
 import os
-import struct
 import subprocess
+import sys
 import tempfile
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -14,6 +14,12 @@ import tifffile
 from PIL import Image
 
 from cfg import Static
+from system.decoders import Decoder, DecoderRegistry
+from system.file_reader import FileReader, MemoryFile
+from system.img_header import ImgHeader
+from system.preview_reader import PreviewReader
+from system.psd_reader import PsdReader
+from system.video_reader import VideoReader
 
 
 class SharedUtils:
@@ -138,10 +144,13 @@ class ImgUtils:
             ".pnm", ".PNM",
             ".gif", ".GIF",
             ".ico", ".ICO",
-            ".heic", ".HEIC",
-            ".heif", "HEIF"
         )
 
+    ext_heif = (
+        ".heic", ".HEIC",
+        ".heif", ".HEIF",
+    )
+
     ext_tiff = (
         ".tif", ".TIF",
         ".tiff", ".TIFF",
@@ -194,6 +203,7 @@ class ImgUtils:
 
     ext_all = (
         *ext_jpeg,
+        *ext_heif,
         *ext_tiff,
         *ext_psd,
         *ext_png,
@@ -203,8 +213,18 @@ class ImgUtils:
         *ext_svg,
     )
 
+    _broken_image: np.ndarray = None
+
     @classmethod
     def _get_broken_image(cls):
+        """
+        Заглушка для просмотра файлов, которые не удалось прочитать,
+        см. `read_img`. Декодеры и миниатюры ее не используют.
+        Читается один раз, всегда возвращается тот же массив (только для чтения).
+        """
+        if cls._broken_image is not None:
+            return cls._broken_image
+
         path = Static.JPEG_ICONS / "broken_image.jpg"
 
         if not path.exists():
@@ -213,25 +233,28 @@ class ImgUtils:
         img = Image.open(path)
         array_img = np.array(img)
         img.close()
+        array_img.setflags(write=False)
+        cls._broken_image = array_img
         return array_img
 
     @classmethod
-    def _read_tiff(cls, path: str):
+    def _tiff_to_rgb(cls, img: np.ndarray) -> np.ndarray:
+        if img.ndim == 3:
+            # Транспонируем, если каналы на первом месте
+            if min(img.shape) == img.shape[0]:
+                img = img.transpose(1, 2, 0)
+            # Ограничиваем количество каналов до 3
+            if img.shape[2] > 3:
+                img = img[:, :, :3]
+            # Преобразуем в uint8
+            if img.dtype != np.uint8:
+                img = (img / 256).astype(np.uint8)
+        elif img.ndim == 2:
+            img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        return img
 
-        def process_image(img: np.ndarray) -> np.ndarray:
-            if img.ndim == 3:
-                # Транспонируем, если каналы на первом месте
-                if min(img.shape) == img.shape[0]:
-                    img = img.transpose(1, 2, 0)
-                # Ограничиваем количество каналов до 3
-                if img.shape[2] > 3:
-                    img = img[:, :, :3]
-                # Преобразуем в uint8
-                if img.dtype != np.uint8:
-                    img = (img / 256).astype(np.uint8)
-            elif img.ndim == 2:
-                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-            return img
+    @classmethod
+    def _read_tiff(cls, path: str):
         readers = (
             lambda path: tifffile.imread(path, is_ome=False),
             lambda path: np.array(Image.open(path).convert("RGB")),
@@ -239,10 +262,38 @@ class ImgUtils:
         )
         for loader in readers:
             try:
-                return process_image(loader(path))
+                return cls._tiff_to_rgb(loader(path))
+            except MemoryError:
+                raise
             except Exception as e:
                 print(f"read tiff error", path, e)
-        return cls._get_broken_image()
+        return None
+
+    @classmethod
+    def _read_tiff_reduced(cls, path: str, size: int):
+        try:
+            img = PreviewReader.read_tiff(path, size)
+            if img is not None:
+                return cls._tiff_to_rgb(img)
+        except Exception as e:
+            print("read tiff preview error", path, e)
+        return cls._read_tiff(path)
+
+    @classmethod
+    def _read_psd(cls, path: str, size: int = 0):
+        """
+        Читает PSD / PSB через `PsdReader`. qlmanage остается запасным
+        вариантом на macOS для файлов, которые PsdReader не поддерживает.
+        """
+        try:
+            img = PsdReader.read(path, size)
+            if img is not None:
+                return img
+        except Exception as e:
+            print("read psd error", path, e)
+        if sys.platform == "darwin":
+            return cls._read_quicklook(path)
+        return None
 
     @classmethod
     def _read_quicklook(cls, path: str, size: int = 5000, timeout: int = 120):
@@ -258,13 +309,12 @@ class ImgUtils:
                     timeout=timeout
                 )
             except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
-                # Возвращаем "пустую" картинку при ошибке или таймауте
-                return np.zeros((100, 100, 3), dtype=np.uint8)
+                return None
 
             # Ищем файл только в нашей изолированной папке
             generated_files = list(tmp_dir.glob("*.png"))
             if not generated_files:
-                return cls._get_broken_image()
+                return None
             
             generated = generated_files[0]
             with Image.open(generated) as img:
@@ -282,136 +332,369 @@ class ImgUtils:
         
     @classmethod
     def _read_svg(cls, path: str):
-        return cls._get_broken_image()
+        return None
+
+    @classmethod
+    def _imread(cls, path: str | MemoryFile, flags: int = cv2.IMREAD_COLOR):
+        """
+        cv2.imread для пути и cv2.imdecode для `MemoryFile`.
+        Возвращает BGR массив или None, как cv2.imread.
+        """
+        if isinstance(path, MemoryFile):
+            buffer = np.frombuffer(path.getbuffer(), np.uint8)
+            return cv2.imdecode(buffer, flags)
+        return cv2.imread(path, flags)
 
     @classmethod
     def _read_png(cls, path: str):
+        img = Image.open(path)
+        if img.mode == "RGBA":
+            background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+            img = Image.alpha_composite(background, img)
+            img = img.convert("RGB")
+        array_img = np.array(img)            
+        img.close()
+        return array_img
+
+    @classmethod
+    def _read_jpg(cls, path: str):
+        """
+        Возвращает BGR как есть, см. `Decoder.bgr`.
+        """
+        return cls._imread(path, cv2.IMREAD_COLOR)
+
+    @classmethod
+    def _read_jpg_reduced(cls, path: str, size: int):
+        """
+        JPEG декодируется сразу в 2, 4 или 8 раз меньше (DCT scaling),
+        с наибольшим шагом, при котором большая сторона не меньше size.
+        Возвращает BGR, как `_read_jpg`.
+        """
         try:
-            img = Image.open(path)
-            if img.mode == "RGBA":
-                background = Image.new("RGBA", img.size, (255, 255, 255, 255))
-                img = Image.alpha_composite(background, img)
-                img = img.convert("RGB")
-            array_img = np.array(img)            
-            img.close()
-            return array_img
+            # Image.open читает только заголовок
+            with Image.open(path) as img:
+                max_side = max(img.size)
+            flags = {
+                8: cv2.IMREAD_REDUCED_COLOR_8,
+                4: cv2.IMREAD_REDUCED_COLOR_4,
+                2: cv2.IMREAD_REDUCED_COLOR_2,
+            }
+            for scale, flag in flags.items():
+                if max_side // scale >= size:
+                    return cls._imread(path, flag)
         except Exception as e:
-            print(f"read png, PIL error: {e}")
-            return cls._get_broken_image()
+            print("read jpg reduced error", path, e)
+        return cls._read_jpg(path)
 
     @classmethod
-    def _read_jpg(cls, path: str):
-        heics = (".heic", ".HEIC")
+    def _read_heif(cls, path: str):
+        with Image.open(path) as img:
+            return np.array(img.convert("RGB"))
+
+    @classmethod
+    def _read_heif_reduced(cls, path: str, size: int):
         try:
-            if path.endswith(heics):
-                img = Image.open(path)
-                img = img.convert("RGB")
-                return np.array(img)
-            else:
-                img = cv2.imread(path, cv2.IMREAD_COLOR)
-                return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img = PreviewReader.read_heif(path, size)
+            if img is not None:
+                return img
         except Exception as e:
-            print("read jpg error", e)
-            return cls._get_broken_image()
+            print("read heif preview error", path, e)
+        return cls._read_heif(path)
 
     @classmethod
     def _read_raw(cls, path: str):
+        # https://github.com/letmaik/rawpy
+        # Извлечение встроенного эскиза/превью из RAW-файла и преобразование в изображение:
+        # Открываем RAW-файл с помощью rawpy
+        with rawpy.imread(path) as raw:
+            # Извлекаем встроенный эскиз (thumbnail)
+            thumb = raw.extract_thumb()
+        # Проверяем формат извлечённого эскиза
+        if thumb.format == rawpy.ThumbFormat.JPEG:
+            # Если это JPEG — открываем как изображение через BytesIO
+            img = Image.open(io.BytesIO(thumb.data))
+            # Конвертируем в RGB (на случай, если изображение не в RGB)
+            img = img.convert("RGB")
+        elif thumb.format == rawpy.ThumbFormat.BITMAP:
+            # Если формат BITMAP — создаём изображение из массива
+            img: Image.Image = Image.fromarray(thumb.data)
         try:
-            # https://github.com/letmaik/rawpy
-            # Извлечение встроенного эскиза/превью из RAW-файла и преобразование в изображение:
-            # Открываем RAW-файл с помощью rawpy
-            with rawpy.imread(path) as raw:
-                # Извлекаем встроенный эскиз (thumbnail)
-                thumb = raw.extract_thumb()
-            # Проверяем формат извлечённого эскиза
-            if thumb.format == rawpy.ThumbFormat.JPEG:
-                # Если это JPEG — открываем как изображение через BytesIO
-                img = Image.open(io.BytesIO(thumb.data))
-                # Конвертируем в RGB (на случай, если изображение не в RGB)
-                img = img.convert("RGB")
-            elif thumb.format == rawpy.ThumbFormat.BITMAP:
-                # Если формат BITMAP — создаём изображение из массива
-                img: Image.Image = Image.fromarray(thumb.data)
-            try:
-                exif = img.getexif()
-                orientation_tag = 274  # Код тега Orientation
-                if orientation_tag in exif:
-                    orientation = exif[orientation_tag]
-                    # Коррекция поворота на основе EXIF-ориентации
-                    if orientation == 3:
-                        img = img.rotate(180, expand=True)
-                    elif orientation == 6:
-                        img = img.rotate(270, expand=True)
-                    elif orientation == 8:
-                        img = img.rotate(90, expand=True)
-            except Exception as e:
-                print("read raw, get exif error", e)
-            array_img = np.array(img)
-            img.close()
-            return array_img
+            exif = img.getexif()
+            orientation_tag = 274  # Код тега Orientation
+            if orientation_tag in exif:
+                orientation = exif[orientation_tag]
+                # Коррекция поворота на основе EXIF-ориентации
+                if orientation == 3:
+                    img = img.rotate(180, expand=True)
+                elif orientation == 6:
+                    img = img.rotate(270, expand=True)
+                elif orientation == 8:
+                    img = img.rotate(90, expand=True)
         except Exception as e:
-            print("read raw error", e)
-            return cls._get_broken_image()
+            print("read raw, get exif error", e)
+        array_img = np.array(img)
+        img.close()
+        return array_img
 
     @classmethod
-    def _read_movie(cls, path: str, time_sec=1):
+    def _read_raw_reduced(cls, path: str, size: int):
         try:
-            cap = cv2.VideoCapture(path)
-            cap.set(cv2.CAP_PROP_POS_MSEC, time_sec * 1000)
-            success, frame = cap.read()
-            cap.release()
-            if success:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                return frame
-            else:
-                return cls._get_broken_image()
+            img = PreviewReader.read_raw(path, size)
+            if img is not None:
+                return img
         except Exception as e:
-            print("read movie error", e)
-            return cls._get_broken_image()
+            print("read raw preview error", path, e)
+        return cls._read_raw(path)
 
     @classmethod
-    def _read_any(cls, path: str) -> np.ndarray:
-        ...
-
-    @classmethod
-    def read_img(cls, path: str):
-        _, ext = os.path.splitext(path)
-        ext = ext.lower()
-        read_any_dict: dict[str, callable] = {}
-
-        for i in cls.ext_psd:
-            read_any_dict[i] = cls._read_quicklook
-        for i in cls.ext_tiff:
-            read_any_dict[i] = cls._read_tiff
-        for i in cls.ext_raw:
-            read_any_dict[i] = cls._read_raw
-        for i in cls.ext_jpeg:
-            read_any_dict[i] = cls._read_jpg
-        for i in cls.ext_png:
-            read_any_dict[i] = cls._read_png
-        for i in cls.ext_video:
-            read_any_dict[i] = cls._read_movie
-        for i in cls.ext_icns:
-            read_any_dict[i] = cls._read_icns
-        for i in cls.ext_svg:
-            read_any_dict[i] = cls._read_svg
-        fn = read_any_dict.get(ext)
-        if fn:
-            cls._read_any = fn
-            return cls._read_any(path)
-        else:
-            return cls._get_broken_image()
+    def _read_movie(cls, path: str, size: int = 0):
+        """
+        Кадр-обложка через `VideoReader` с ограничением чтения по байтам
+        и по времени. size > 0 — кадр уменьшается до size.
+        """
+        return VideoReader.read(path, size)
 
     @classmethod
-    def get_psd_size(cls, path):
-        with open(path, "rb") as f:
-            header = f.read(26)
+    def get_decoders(cls) -> list[Decoder]:
+        """
+        Встроенные декодеры для `DecoderRegistry`.
+        """
+        return [
+            Decoder(
+                name="jpeg",
+                exts=cls.ext_jpeg,
+                read=cls._read_jpg,
+                read_reduced=cls._read_jpg_reduced,
+                magic=(
+                    (0, b"\xff\xd8\xff"),
+                    (0, b"BM"),
+                    (0, b"GIF8"),
+                    (8, b"WEBP"),
+                    (0, b"\x00\x00\x01\x00"),
+                    *((0, f"P{i}".encode()) for i in range(1, 7)),
+                ),
+                from_memory=True,
+                bgr=True,
+            ),
+            Decoder(
+                name="heif",
+                exts=cls.ext_heif,
+                read=cls._read_heif,
+                read_reduced=cls._read_heif_reduced,
+                magic=(
+                    (4, b"ftypheic"),
+                    (4, b"ftypheix"),
+                    (4, b"ftyphevc"),
+                    (4, b"ftypheim"),
+                    (4, b"ftypheis"),
+                    (4, b"ftyphevm"),
+                    (4, b"ftyphevs"),
+                    (4, b"ftyphevx"),
+                    (4, b"ftypmif1"),
+                    (4, b"ftypmsf1"),
+                ),
+                from_memory=True,
+            ),
+            Decoder(
+                name="tiff",
+                exts=cls.ext_tiff,
+                read=cls._read_tiff,
+                read_reduced=cls._read_tiff_reduced,
+                magic=(
+                    (0, b"II*\x00"),
+                    (0, b"MM\x00*"),
+                    (0, b"II+\x00"),
+                    (0, b"MM\x00+"),
+                ),
+            ),
+            Decoder(
+                name="psd",
+                exts=cls.ext_psd,
+                read=cls._read_psd,
+                read_reduced=cls._read_psd,
+                magic=((0, b"8BPS"), ),
+            ),
+            Decoder(
+                name="png",
+                exts=cls.ext_png,
+                read=cls._read_png,
+                magic=((0, b"\x89PNG\r\n\x1a\n"), ),
+                from_memory=True,
+            ),
+            Decoder(
+                name="raw",
+                exts=cls.ext_raw,
+                read=cls._read_raw,
+                read_reduced=cls._read_raw_reduced,
+                # большинство RAW устроено как TIFF
+                magic=(
+                    (0, b"II*\x00"),
+                    (0, b"MM\x00*"),
+                    (0, b"II+\x00"),
+                    (0, b"MM\x00+"),
+                    (4, b"ftypcrx "),
+                    (0, b"FUJIFILMCCD-RAW"),
+                    (0, b"IIRO"),
+                    (0, b"IIRS"),
+                    (0, b"MMOR"),
+                    (0, b"IIU\x00"),
+                    (0, b"FOVb"),
+                    (0, b"\x00MRM"),
+                ),
+            ),
+            Decoder(
+                name="video",
+                exts=cls.ext_video,
+                read=cls._read_movie,
+                read_reduced=cls._read_movie,
+                magic=(
+                    (4, b"ftyp"),
+                    # старые MOV начинаются с других атомов
+                    (4, b"moov"),
+                    (4, b"mdat"),
+                    (4, b"wide"),
+                    (4, b"free"),
+                    (4, b"skip"),
+                    (8, b"AVI "),
+                    (0, b"\x1a\x45\xdf\xa3"),
+                    (0, b"FLV"),
+                    (0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"),
+                ),
+            ),
+            Decoder(
+                name="icns",
+                exts=cls.ext_icns,
+                read=cls._read_icns,
+                magic=((0, b"icns"), ),
+                from_memory=True,
+            ),
+            Decoder(
+                name="svg",
+                exts=cls.ext_svg,
+                read=cls._read_svg,
+            ),
+        ]
 
-        if header[:4] != b"8BPS":
-            raise ValueError("Не PSD")
+    @classmethod
+    def read_file(cls, path: str) -> bytes | None:
+        """
+        Содержимое файла для `DecoderRegistry.decode`, прочитанное через
+        `FileReader` большими запросами. None, если декодер формата
+        читает файл только по пути (PSD, TIFF, RAW и видео читают
+        лишь часть файла) или файл прочитать не удалось.
+        """
+        decoder = DecoderRegistry.get(path)
+        if decoder is None or not decoder.from_memory:
+            return None
+        return FileReader.read(path)
 
-        height, width = struct.unpack(">II", header[14:22])
-        return width, height
+    @classmethod
+    def decode_native(
+            cls,
+            path: str,
+            size: int = 0,
+            data: bytes | None = None
+        ) -> tuple[np.ndarray, bool] | None:
+        """
+        Декодирует изображение через `DecoderRegistry` без перестановки
+        каналов. Возвращает (массив, bgr), где bgr — `Decoder.bgr`,
+        или None, если формат не поддерживается или файл не удалось
+        прочитать. MemoryError не перехватывается: файл может быть
+        исправен, а памяти не хватило процессу.
+        - size: 0 — полный размер, > 0 — как в `read_img_reduced`
+        - data: как в `read_img`
+        """
+        decoder = DecoderRegistry.get(path)
+        if decoder is None:
+            return None
+        if data is None and decoder.from_memory:
+            data = FileReader.read(path)
+        try:
+            img = DecoderRegistry.decode(decoder, path, size, data)
+        except MemoryError:
+            raise
+        except Exception as e:
+            print("decode img error", path, e)
+            return None
+        if img is None or img.size == 0:
+            return None
+        return img, decoder.bgr
+
+    @classmethod
+    def decode_img(cls, path: str, size: int = 0, data: bytes | None = None) -> np.ndarray | None:
+        """
+        Как `decode_native`, но всегда возвращает RGB массив.
+        """
+        decoded = cls.decode_native(path, size, data)
+        if decoded is None:
+            return None
+        img, bgr = decoded
+        if bgr and img.ndim == 3 and img.shape[2] == 3:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+        return img
+
+    @classmethod
+    def read_img(cls, path: str, data: bytes | None = None):
+        """
+        Для просмотра: вместо файла, который не удалось прочитать,
+        возвращает заглушку `_get_broken_image`.
+        - data: содержимое файла, если оно уже прочитано, например
+          `FilePrefetcher`; иначе файл читается через `FileReader`
+        """
+        try:
+            img = cls.decode_img(path, data=data)
+        except MemoryError as e:
+            print("read img error", path, e)
+            img = None
+        if img is None:
+            return cls._get_broken_image()
+        return img
+
+    @classmethod
+    def read_img_reduced(cls, path: str, size: int, data: bytes | None = None):
+        """
+        Читает изображение для миниатюры, которую затем уменьшат до size.
+        - JPEG декодируется сразу в 2, 4 или 8 раз меньше
+        - PSD / PSB читаются через `PsdReader` с прореживанием строк
+        - кадр видео уменьшается сразу после декодирования
+        - HEIC, TIFF и RAW читаются из встроенной уменьшенной копии
+          через `PreviewReader`, если она есть и не меньше size
+
+        Остальные форматы читаются целиком, как в `read_img`.
+        Заглушка вместо нечитаемого файла — как в `read_img`.
+        - data: как в `read_img`
+        """
+        try:
+            img = cls.decode_img(path, size, data)
+        except MemoryError as e:
+            print("read img reduced error", path, e)
+            img = None
+        if img is None:
+            return cls._get_broken_image()
+        return img
+
+    @classmethod
+    def get_img_size(cls, path: str, data: bytes | None = None) -> tuple[int, int] | None:
+        """
+        (ширина, высота) без декодирования: `ImgHeader` для JPEG, PNG,
+        TIFF и PSD, для остальных форматов — заголовок через Image.open.
+        Для RAW и видео None: первый IFD RAW описывает встроенное превью,
+        а не снимок.
+        - data: содержимое файла, если оно уже прочитано в память
+        """
+        if path.endswith((*cls.ext_raw, *cls.ext_video, *cls.ext_svg)):
+            return None
+        size = ImgHeader.read_size(path, data)
+        if size is not None:
+            return size
+        try:
+            src = path if data is None else io.BytesIO(data)
+            # Image.open читает только заголовок
+            with Image.open(src) as img:
+                return img.size
+        except Exception as e:
+            print("get img size error", path, e)
+            return None
 
     @classmethod
     def resize(cls, image: np.ndarray, size: int) -> np.ndarray:
@@ -445,43 +728,49 @@ class ImgUtils:
 
     @classmethod
     def get_img_res(cls, path: str):
-
-        def read(path: str):
-            img_ = ImgUtils.read_img(path)
-            if img_ is not None and len(img_.shape) > 1:
-                h, w = img_.shape[0], img_.shape[1]
-                resol= f"{w}x{h}"
-            else:
-                resol = None
-            return resol
-
-        def psd_read(path: str):
-            try:
-                w, h = ImgUtils.get_psd_size(path)
-                resol= f"{w}x{h}"
-            except Exception as e:
-                print("multiprocess > ImgRes psd error", e)
-                resol = None
-            return resol
-
-        if path.endswith(ImgUtils.ext_psd):
-            resol = psd_read(path)
-        else:
-            resol = read(path)
-        return resol
+        """
+        Строка "ширинаxвысота": из заголовка, а если формат его
+        не поддерживает — из полностью декодированного изображения.
+        """
+        size = cls.get_img_size(path)
+        if size is not None:
+            return f"{size[0]}x{size[1]}"
+        img_ = ImgUtils.read_img(path)
+        if img_ is not None and len(img_.shape) > 1:
+            h, w = img_.shape[0], img_.shape[1]
+            return f"{w}x{h}"
+        return None
     
     @classmethod
-    def fit_to_thumb(cls, image: np.ndarray, size: int) -> np.ndarray:
+    def fit_to_thumb(cls, image: np.ndarray, size: int) -> np.ndarray | None:
+        """
+        Уменьшает изображение так, чтобы большая сторона стала size.
 
-        cv2.INTER_CUBIC
-        cv2.INTER_LANCZOS4
-        cv2.INTER_AREA
+        Lanczos на уменьшении больше чем в 4 раза дает алиасинг, поэтому
+        такое изображение сначала уменьшается INTER_AREA ровно вдвое,
+        пока большая сторона не меньше 4 * size: для шага 2 у OpenCV
+        быстрый путь, а для других целых шагов он в 2-3 раза медленнее.
+        JPEG обычно приходит уже уменьшенным из `_read_jpg_reduced`,
+        и тогда остается один проход INTER_LANCZOS4 до size.
 
+        Порядок каналов не меняется. None, если изображение пустое
+        или его не удалось уменьшить.
+        """
         try:
             h, w = image.shape[:2]
             if h == 0 or w == 0:
                 print("fit_to_thumb: пустое изображение")
-                return cls.fit_to_thumb(cls._get_broken_image(), size)
+                return None
+
+            while max(h, w) >= size * 4:
+                # нечетный край обрезается, чтобы шаг был ровно 2
+                h, w = h - h % 2, w - w % 2
+                image = cv2.resize(
+                    image[:h, :w],
+                    (w // 2, h // 2),
+                    interpolation=cv2.INTER_AREA
+                )
+                h, w = h // 2, w // 2
 
             scale = size / max(h, w)
             new_w = max(1, int(w * scale))
@@ -495,39 +784,53 @@ class ImgUtils:
 
         except Exception as e:
             print(f"fit_to_thumb: ошибка масштабирования: {e}")
-            return cls.fit_to_thumb(cls._get_broken_image(), size)
+            return None
 
     @classmethod
-    def write_thumb(cls, thumb_path: str, thumb: np.ndarray):
+    def to_bgr(cls, thumb: np.ndarray, bgr: bool) -> np.ndarray:
+        """
+        Переводит миниатюру в BGR без альфа-канала для `encode_thumb`.
+        bgr — порядок каналов декодера, см. `decode_native`: BGR массив
+        возвращается как есть. Grayscale не меняется.
+        """
+        if thumb.ndim == 2:
+            return thumb
+        if thumb.shape[2] == 4:
+            code = cv2.COLOR_BGRA2BGR if bgr else cv2.COLOR_RGBA2BGR
+            return cv2.cvtColor(thumb, code)
+        if bgr:
+            return thumb
+        return cv2.cvtColor(thumb, cv2.COLOR_RGB2BGR)
+
+    @classmethod
+    def encode_thumb(cls, thumb: np.ndarray, quality: int = Static.THUMB_QUALITY) -> bytes | None:
+        """
+        Кодирует BGR / grayscale массив миниатюры в JPEG, см. `to_bgr`.
+        """
         try:
-            if len(thumb.shape) == 2:  # grayscale
-                img = thumb
-            elif thumb.shape[2] == 3:  # BGR
-                img = cv2.cvtColor(thumb, cv2.COLOR_BGR2RGB)
-            elif thumb.shape[2] == 4:  # BGRA
-                img = cv2.cvtColor(thumb, cv2.COLOR_BGRA2RGB)
-            else:
-                print(f"write_thumb: неподдерживаемое число каналов {thumb.shape}")
-                return False
-            cv2.imwrite(thumb_path, img)
-            return True
+            if thumb.ndim == 3 and thumb.shape[2] != 3:
+                print(f"encode_thumb: неподдерживаемое число каналов {thumb.shape}")
+                return None
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+            ok, buffer = cv2.imencode(".jpg", thumb, params)
+            return buffer.tobytes() if ok else None
         except Exception as e:
-            print(f"write_thumb: ошибка записи thumb на диск: {e}")
-            return False
+            print(f"encode_thumb: ошибка кодирования thumb: {e}")
+            return None
 
     @classmethod
-    def read_thumb(cls, thumb_path: str) -> np.ndarray | None:
+    def decode_thumb(cls, data: bytes) -> np.ndarray | None:
+        """
+        Декодирует JPEG миниатюры из памяти в RGB массив.
+        """
         try:
-            if os.path.exists(thumb_path):
-                img = cv2.imread(thumb_path, cv2.IMREAD_UNCHANGED)
-                return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            else:
-                print(f"read_thumb: файл не существует {thumb_path}")
-                return None
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            img = cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED)
+            return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         except Exception as e:
-            print(f"read_thumb: ошибка чтения thumb: {e}")
+            print(f"decode_thumb: ошибка чтения thumb: {e}")
             return None
-            
+
     @classmethod
     def desaturate_image(cls, image: np.ndarray, factor=0.2):
         try:
@@ -557,4 +860,8 @@ class ImgUtils:
         hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
         _, s, _ = cv2.split(hsv)
         mean_saturation = np.mean(s)
-        return mean_saturation < saturation_threshold
\ No newline at end of file
+        return mean_saturation < saturation_threshold
+
+
+for decoder in ImgUtils.get_decoders():
+    DecoderRegistry.register(decoder)
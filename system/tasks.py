@@ -8,14 +8,17 @@ import cv2
 import numpy as np
 import sqlalchemy
 from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
-from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtGui import QImage
 
 from cfg import Dynamic, JsonData, Static
 
-from .database import Dbase, Dirs, Properties, Thumbs
+from .database import (Days, Dbase, Dirs, Failed, Properties, Thumbs,
+                       ThumbsFts)
 from .lang import Lng
 from .main_folder import Mf
 from .shared_utils import ImgUtils
+from .thumb_cache import ThumbCache
+from .thumb_store import ThumbStore
 from .utils import Utils
 
 
@@ -81,7 +84,8 @@ class DbImagesLoaderItem:
     rel_img_path: str
     rel_thumb_path: str
     fav: int
-    qimages: list[QImage]
+    qimage: QImage
+    levels: dict[int, QImage]
     day_month_year: str
     month_year: str
 
@@ -90,53 +94,56 @@ class DbImagesLoader(URunnable):
     """
     Загружает изображения из БД и формирует словарь для UI.
 
-    Сигнал finished_ возвращает словарь:
-    - ключ — дата изменения изображения (или 0 при сортировке по добавлению),
-    - значение — список LoadDbImagesItem для соответствующей даты.
+    Постраничная загрузка по ключу (mod, id) последней загруженной строки:
+    - cursor: (mod, id) последней строки предыдущей страницы,
+      None для первой страницы
+
+    Сигнал finished_ возвращает:
+    - список DbImagesLoaderItem
+    - cursor для следующей страницы, None если страница последняя
     """
 
     class Sigs(QObject):
-        finished_ = pyqtSignal(list)
+        finished_ = pyqtSignal(list, object)
 
-    def __init__(self):
+    def __init__(self, cursor: tuple[int, int] | None = None):
         super().__init__()
         self.sigs = DbImagesLoader.Sigs()
+        self.cursor = cursor
 
     def task(self):
         try:
             with Dbase.main_engine.connect() as conn:
                 stmt = self.get_stmt()
                 res = conn.execute(stmt).fetchall()
+            if len(res) == Static.THUMBS_LOAD_LIMIT:
+                next_cursor = (res[-1].mod, res[-1].id)
+            else:
+                next_cursor = None
             if res:
                 image_items = self.create_dict(res)
-                self.sigs.finished_.emit(image_items)
+                self.sigs.finished_.emit(image_items, next_cursor)
             else:
-                self.sigs.finished_.emit([])
+                self.sigs.finished_.emit([], None)
         except Exception as e:
             print(traceback.format_exc())
-            self.sigs.finished_.emit({})
+            self.sigs.finished_.emit([], None)
 
     def create_dict(self, res: list[tuple]):
         # thumbs_dict = defaultdict(list[DbImagesItem])
         thumbs = []
 
-        for rel_img_path, rel_thumb_path, mod, fav in res:
-            abs_thumb_path_ = Utils.get_abs_thumb_path(rel_thumb_path)
+        qimages = self.load_qimages(res)
 
-            if not os.path.exists(abs_thumb_path_):
+        for rel_img_path, rel_thumb_path, mod, fav, id_ in res:
+            qimage = qimages.get(rel_thumb_path)
+            if qimage is None:
                 continue
-
-            qimages = []
-            img_bgr = cv2.imread(abs_thumb_path_)
-            img_rgb = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2RGB)
-            for i in Static.THUMB_WID_PIXMAP_SIZE:
-                resized = ImgUtils.fit_to_thumb(img_rgb, i * 2)
-                qimage = Utils.pyqt_qimage_from_array(resized)
-                pixmap = Utils.pyqt_qiconed_resize(QPixmap.fromImage(qimage), i)
-                qimages.append(QImage(pixmap))
-
-            src_qimage = Utils.pyqt_qimage_from_array(img_rgb)
-            qimages.append(src_qimage)
+            levels = {}
+            for size in Static.THUMB_LEVELS:
+                level = qimages.get(ThumbStore.get_level_path(rel_thumb_path, size))
+                if level is not None:
+                    levels[size] = level
 
             date_ = datetime.fromtimestamp(mod).date()
             month_ = Lng.months[JsonData.lng_index][str(date_.month)]
@@ -148,13 +155,48 @@ class DbImagesLoader(URunnable):
                 rel_img_path=rel_img_path,
                 rel_thumb_path=rel_thumb_path,
                 fav=fav,
-                qimages=qimages,
+                qimage=qimage,
+                levels=levels,
                 day_month_year=day_month_year,
                 month_year=month_year
             )
             thumbs.append(item)
         return thumbs
 
+    def load_qimages(self, res: list[tuple]) -> dict[str, QImage]:
+        """
+        Возвращает {ключ ThumbStore: QImage} для миниатюр страницы
+        и их уровней `Static.THUMB_LEVELS`. Сначала ищет в `ThumbCache`,
+        остальное читает из `ThumbStore` одним вызовом.
+
+        QImage можно создавать вне GUI потока, в отличие от QPixmap.
+        Размеры для сетки выбираются в GUI потоке при первом показе.
+        """
+        qimages: dict[str, QImage] = {}
+        missing: dict[str, int] = {}
+        for _, rel_thumb_path, mod, _, _ in res:
+            keys = [
+                rel_thumb_path,
+                *(ThumbStore.get_level_path(rel_thumb_path, i) for i in Static.THUMB_LEVELS)
+            ]
+            for key in keys:
+                qimage = ThumbCache.get(key, mod)
+                if qimage is None:
+                    missing[key] = mod
+                elif not qimage.isNull():
+                    qimages[key] = qimage
+
+        stored = ThumbStore.read_many(missing)
+        for key, mod in missing.items():
+            data = stored.get(key)
+            qimage = QImage() if data is None else QImage.fromData(data)
+            # пустой QImage тоже кэшируется: у миниатюр, созданных
+            # до появления уровней, их нет, и читать заново не нужно
+            ThumbCache.put(key, mod, qimage)
+            if not qimage.isNull():
+                qimages[key] = qimage
+        return qimages
+
     def get_stmt(self):
         rel_path = Dynamic.current_dir
         if rel_path == os.sep:
@@ -164,15 +206,26 @@ class DbImagesLoader(URunnable):
                 Thumbs.rel_img_path,
                 Thumbs.rel_thumb_path,
                 Thumbs.mod,
-                Thumbs.fav
+                Thumbs.fav,
+                Thumbs.id
             )
             .where(Thumbs.mf_alias == Mf.current_mf.mf_alias)
             .where(Thumbs.rel_img_path.ilike(f"{rel_path}/%"))
-            .order_by(-Thumbs.mod if Dynamic.sort_by_mod else -Thumbs.id)
             .limit(Static.THUMBS_LOAD_LIMIT)
-            .offset(Dynamic.loaded_thumbs)
         )
 
+        if Dynamic.sort_by_mod:
+            stmt = stmt.order_by(Thumbs.mod.desc(), Thumbs.id.desc())
+            if self.cursor:
+                stmt = stmt.where(
+                    sqlalchemy.tuple_(Thumbs.mod, Thumbs.id)
+                    < sqlalchemy.tuple_(*self.cursor)
+                )
+        else:
+            stmt = stmt.order_by(Thumbs.id.desc())
+            if self.cursor:
+                stmt = stmt.where(Thumbs.id < self.cursor[1])
+
         if Dynamic.filter_favs:
             stmt = stmt.where(Thumbs.fav == 1)
 
@@ -184,48 +237,60 @@ class DbImagesLoader(URunnable):
             )
 
         if Dynamic.filters_enabled:
-            filters = [
-                Thumbs.rel_img_path.ilike(f"%{filter}%")
-                for filter in Dynamic.filters_enabled
-            ]
-            stmt = stmt.where(sqlalchemy.or_(*filters))
+            filters = ThumbsFts.match(Dynamic.filters_enabled)
+            if filters is None:
+                filters = sqlalchemy.or_(*[
+                    Thumbs.rel_img_path.ilike(f"%{filter}%")
+                    for filter in Dynamic.filters_enabled
+                ])
+            stmt = stmt.where(filters)
 
         if Dynamic.search_widget_text:
             text = Dynamic.search_widget_text.strip().replace("\n", "")
-            stmt = stmt.where(Thumbs.rel_img_path.ilike(f"%{text}%"))
-
-        if any((Dynamic.date_start, Dynamic.date_end)):
-            start, end = self.combine_dates(
-                Dynamic.date_start,
-                Dynamic.date_end
+            search = ThumbsFts.match([text])
+            if search is None:
+                search = Thumbs.rel_img_path.ilike(f"%{text}%")
+            stmt = stmt.where(search)
+
+        if Dynamic.date_start and Dynamic.date_end:
+            stmt = stmt.where(
+                Thumbs.day.between(
+                    Days.from_date(Dynamic.date_start),
+                    Days.from_date(Dynamic.date_end)
+                )
             )
-            stmt = stmt.where(Thumbs.mod > start, Thumbs.mod < end)
 
         if Dynamic.thumb_path_set:
             stmt = stmt.where(Thumbs.rel_thumb_path.in_(Dynamic.thumb_path_set))
 
         return stmt
 
-    def combine_dates(
-            self,
-            date_start: datetime,
-            date_end: datetime
-        ):
+
+class DaysLoader(URunnable):
+
+    class Sigs(QObject):
+        finished_ = pyqtSignal(dict)
+
+    def __init__(self, mf_alias: str, year: int, month: int):
         """
-        Преобразует даты в timestamp для фильтрации:
-        - date_start → 00:00:00
-        - date_end → 23:59:59
-        Возвращает кортеж (start_timestamp, end_timestamp).
+        Загружает количество изображений по дням месяца для календаря.
+        Испускает {день месяца: количество}.
         """
-        start = datetime.combine(
-            date_start,
-            datetime.min.time()
-        )
-        end = datetime.combine(
-            date_end,
-            datetime.max.time().replace(microsecond=0)
-        )
-        return datetime.timestamp(start), datetime.timestamp(end)
+        super().__init__()
+        self.sigs = DaysLoader.Sigs()
+        self.mf_alias = mf_alias
+        self.year = year
+        self.month = month
+
+    def task(self):
+        stmt = Days.month_stmt(self.mf_alias, self.year, self.month)
+        try:
+            with Dbase.main_engine.connect() as conn:
+                res = {day % 100: count for day, count in conn.execute(stmt)}
+        except Exception as e:
+            print("tasks, DaysLoader error", e)
+            res = {}
+        self.sigs.finished_.emit(res)
 
 
 class MfDataCleaner(URunnable):
@@ -238,6 +303,7 @@ class MfDataCleaner(URunnable):
     
     - Удаляет записи из THUMBS, если файл миниатюры отсутствует.
     - Удаляет запись о папке `mf` из DIRS.
+    - Удаляет записи из FAILED, чтобы повторить неудачные файлы сразу.
     """
 
     def __init__(self, mf_name: str):
@@ -274,12 +340,18 @@ class MfDataCleaner(URunnable):
             )
             conn.execute(stmt)
 
-            non_exist_thumbs = []
+            stmt = (
+                sqlalchemy.delete(Failed.table)
+                .where(Failed.mf_alias == self.mf_alias)
+            )
+            conn.execute(stmt)
 
-            for i in rel_thumb_paths:
-                abs_thumb_path = Utils.get_abs_thumb_path(i)
-                if not os.path.exists(abs_thumb_path):
-                    non_exist_thumbs.append(i)
+            exist_thumbs = ThumbStore.get_sizes(rel_thumb_paths)
+            non_exist_thumbs = [
+                i
+                for i in rel_thumb_paths
+                if i not in exist_thumbs
+            ]
             
             stmt = (
                 sqlalchemy.delete(Thumbs.table)
@@ -362,11 +434,7 @@ class HashDirSize(URunnable):
                     .where(Thumbs.mf_alias == mf.mf_alias)
                 )
                 rel_thumb_paths = conn.execute(stmt).scalars().all()
-                size = sum([
-                    os.path.getsize(Utils.get_abs_thumb_path(x))
-                    for x in rel_thumb_paths
-                    if os.path.exists(Utils.get_abs_thumb_path(x))
-                ])
+                size = sum(ThumbStore.get_sizes(rel_thumb_paths).values())
                 item = HashDirSizeItem(
                     mf=mf,
                     size=size,
@@ -376,6 +444,121 @@ class HashDirSize(URunnable):
         return items
     
 
+@dataclass(slots=True)
+class FailedItem:
+    mf_alias: str
+    rel_img_path: str
+    attempts: int
+    last_try: int
+    next_try: int
+
+
+class FailedLoader(URunnable):
+    """
+    Загружает список файлов из FAILED, для которых не удалось
+    создать миниатюру, начиная с последних.
+    """
+
+    class Sigs(QObject):
+        finished_ = pyqtSignal(list)
+
+    def __init__(self):
+        super().__init__()
+        self.sigs = FailedLoader.Sigs()
+
+    def task(self):
+        try:
+            self.sigs.finished_.emit(
+                self._task()
+            )
+        except Exception as e:
+            print("FailedLoader error", e)
+
+    def _task(self):
+        stmt = (
+            sqlalchemy.select(
+                Failed.mf_alias,
+                Failed.rel_img_path,
+                Failed.attempts,
+                Failed.last_try,
+                Failed.next_try
+            )
+            .order_by(Failed.last_try.desc())
+        )
+        with Dbase.main_engine.connect() as conn:
+            return [FailedItem(*row) for row in conn.execute(stmt)]
+
+
+@dataclass(slots=True)
+class MfSearchItem:
+    mf_alias: str
+    rel_img_path: str
+
+
+class MfSearcher(URunnable):
+    """
+    Ищет изображения по пути сразу во всех Mf через индекс `ThumbsFts`,
+    новые первыми, не больше `limit`.
+    """
+    limit = 1000
+
+    class Sigs(QObject):
+        finished_ = pyqtSignal(list)
+
+    def __init__(self, text: str):
+        super().__init__()
+        self.sigs = MfSearcher.Sigs()
+        self.text = text
+
+    def task(self):
+        try:
+            self.sigs.finished_.emit(
+                self._task()
+            )
+        except Exception as e:
+            print("MfSearcher error", e)
+
+    def _task(self):
+        mf_aliases = [i.mf_alias for i in Mf.items]
+        stmt = ThumbsFts.search_stmt(self.text, mf_aliases).limit(self.limit)
+        with Dbase.main_engine.connect() as conn:
+            return [MfSearchItem(*row) for row in conn.execute(stmt)]
+
+
+class ImgSizeLoader(URunnable):
+    """
+    Размер изображения из THUMBS.width и THUMBS.height для окна
+    информации, чтобы не декодировать файл.
+    Сигнал finished_ возвращает (ширина, высота) или None, если
+    изображения нет в БД или размер еще не записан сканером.
+    """
+
+    class Sigs(QObject):
+        finished_ = pyqtSignal(object)
+
+    def __init__(self, rel_img_path: str):
+        super().__init__()
+        self.sigs = ImgSizeLoader.Sigs()
+        self.rel_img_path = rel_img_path
+
+    def task(self):
+        stmt = (
+            sqlalchemy.select(Thumbs.width, Thumbs.height)
+            .where(Thumbs.mf_alias == Mf.current_mf.mf_alias)
+            .where(Thumbs.rel_img_path == self.rel_img_path)
+        )
+        try:
+            with Dbase.main_engine.connect() as conn:
+                row = conn.execute(stmt).first()
+        except Exception as e:
+            print("ImgSizeLoader error", e)
+            row = None
+        if row is None or None in row:
+            self.sigs.finished_.emit(None)
+        else:
+            self.sigs.finished_.emit(tuple(row))
+
+
 class ImgArrayQImage(URunnable):
     
     class Sigs(QObject):
@@ -458,8 +641,9 @@ class ImageSearcher(URunnable):
                 print("индексация гистограмм остановлена")
                 return
             self.current_count += 1
-            abs_thumb_path = Utils.get_abs_thumb_path(rel_thumb_path)
-            hist = self.calc_hist(abs_thumb_path)
+            hist = self.calc_hist(rel_thumb_path)
+            if hist is None:
+                continue
             bytes_hist = hist.tobytes()
             self.thumbs_with_hist.append((id_, rel_thumb_path, hist))
             db_data.append((id_, rel_thumb_path, bytes_hist))
@@ -470,8 +654,10 @@ class ImageSearcher(URunnable):
             self.write_to_db(db_data)
             db_data.clear()
 
-    def calc_hist(self, abs_thumb_path: str):
-        img = ImgUtils.read_img(abs_thumb_path)
+    def calc_hist(self, rel_thumb_path: str):
+        img = ThumbStore.read_array(rel_thumb_path)
+        if img is None:
+            return None
         hsv2 = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)        
         hist2 = cv2.calcHist([hsv2], [0, 1], None, [50, 60], [0, 180, 0, 256])
         cv2.normalize(hist2, hist2, alpha=0, beta=1, norm_type=cv2.NORM_MINMAX)
@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtGui import QImage
+
+
+class ThumbCache:
+    """
+    Общий для всего приложения LRU кэш миниатюр, прочитанных из `hashdir`.
+
+    Ключ — rel_thumb_path, вместе с QImage хранится mod изображения:
+    если файл изменился и сканер обновил mod, запись считается промахом.
+    Пустой QImage означает, что миниатюры нет в `ThumbStore`.
+    Объем ограничен `max_bytes`, при превышении удаляются записи,
+    которые дольше всего не запрашивались.
+
+    Сетка, коллаж и просмотрщик получают один и тот же QImage
+    через DataItem, поэтому повторная загрузка сетки того же каталога
+    не читает файлы с диска.
+    """
+    max_bytes = 256 * 1024 * 1024
+
+    _items: OrderedDict[str, tuple[int, QImage]] = OrderedDict()
+    _lock = threading.Lock()
+    current_bytes = 0
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def set_max_mb(cls, value: int):
+        with cls._lock:
+            cls.max_bytes = value * 1024 * 1024
+            cls._evict()
+
+    @classmethod
+    def get(cls, rel_thumb_path: str, mod: int) -> QImage | None:
+        with cls._lock:
+            item = cls._items.get(rel_thumb_path)
+            if item is None or item[0] != mod:
+                cls.misses += 1
+                return None
+            cls._items.move_to_end(rel_thumb_path)
+            cls.hits += 1
+            return item[1]
+
+    @classmethod
+    def put(cls, rel_thumb_path: str, mod: int, qimage: QImage):
+        with cls._lock:
+            cls._pop(rel_thumb_path)
+            cls._items[rel_thumb_path] = (mod, qimage)
+            cls.current_bytes += qimage.sizeInBytes()
+            cls._evict()
+
+    @classmethod
+    def remove(cls, rel_thumb_path: str):
+        with cls._lock:
+            cls._pop(rel_thumb_path)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._items.clear()
+            cls.current_bytes = 0
+
+    @classmethod
+    def get_stats(cls) -> dict[str, int]:
+        with cls._lock:
+            return {
+                "items": len(cls._items),
+                "bytes": cls.current_bytes,
+                "max_bytes": cls.max_bytes,
+                "hits": cls.hits,
+                "misses": cls.misses,
+            }
+
+    @classmethod
+    def _pop(cls, rel_thumb_path: str):
+        item = cls._items.pop(rel_thumb_path, None)
+        if item:
+            cls.current_bytes -= item[1].sizeInBytes()
+
+    @classmethod
+    def _evict(cls):
+        while cls._items and cls.current_bytes > cls.max_bytes:
+            _, (_, qimage) = cls._items.popitem(last=False)
+            cls.current_bytes -= qimage.sizeInBytes()
@@ -0,0 +1,425 @@
+import itertools
+import os
+import signal
+import sys
+import threading
+from collections import deque
+from dataclasses import dataclass
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection, wait
+from time import monotonic, sleep
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from cfg import Static
+from system.file_reader import FilePrefetcher
+from system.shared_utils import ImgUtils
+from system.thumb_store import PackWriter, ThumbStore
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+@dataclass(slots=True)
+class ThumbTask:
+    """
+    Параметры:
+    - abs_img_path: полный путь до изображения
+    - abs_thumb_path: полный путь до миниатюры в `hashdir`
+    - data: любой объект, который вернется вместе с результатом,
+      например ImgItem или rel_img_path
+    - width, height: размер изображения из заголовка файла,
+      заполняется пулом вместе с результатом, None — если неизвестен,
+      см. `ImgUtils.get_img_size`
+    - transient: результат None не из-за файла: превышено время,
+      не хватило памяти или процесс убит извне. Такой файл стоит
+      повторить при следующем сканировании без отсрочки
+    """
+    abs_img_path: str
+    abs_thumb_path: str
+    data: object = None
+    width: int | None = None
+    height: int | None = None
+    transient: bool = False
+
+
+class _Worker:
+    """
+    Процесс пула `ThumbEngine` с собственным каналом.
+    Обрабатывает одну задачу за раз, следующие ждут в канале,
+    поэтому можно точно знать, какой файл он читает и сколько времени.
+    - seqs: номера отправленных задач, первая выполняется сейчас
+    - started: время начала первой задачи
+    """
+
+    def __init__(self, memory_mb: int):
+        super().__init__()
+        self.conn, child_conn = Pipe()
+        self.process = Process(
+            target=ThumbEngine.worker_loop,
+            args=(child_conn, memory_mb, os.getpid()),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.seqs: deque[int] = deque()
+        self.started = 0.0
+
+    def send(self, seq: int, task: "ThumbTask", return_array: bool):
+        if not self.seqs:
+            self.started = monotonic()
+        self.seqs.append(seq)
+        self.conn.send((seq, task.abs_img_path, task.abs_thumb_path, return_array))
+
+    def done(self):
+        """
+        Первая задача выполнена, процесс перешел к следующей.
+        """
+        self.seqs.popleft()
+        self.started = monotonic()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+
+    def kill_group(self):
+        """
+        Убивает процесс вместе с его дочерними процессами, например qlmanage:
+        процесс пула запускается в своей группе, см. `ThumbEngine.worker_loop`.
+        """
+        if not self.process.is_alive():
+            return
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except OSError:
+            self.process.kill()
+
+    def kill(self):
+        self.kill_group()
+        self.process.join()
+        self.conn.close()
+
+
+class ThumbEngine:
+    """
+    Пул процессов для создания миниатюр: чтение изображения, уменьшение
+    до `Static.THUMB_MAX_SIZE` и уровней `Static.THUMB_LEVELS`
+    и запись в `ThumbStore`. Изображение читается один раз,
+    уровни уменьшаются из готовой миниатюры.
+
+    Параметры:
+    - workers: количество процессов, 0 — число ядер минус одно
+    - max_in_flight: сколько задач одновременно находится в пуле,
+      0 — `workers * 4`
+
+    Пул следит за каждым процессом: если файл читается дольше
+    `timeout_sec` или процесс упал, процесс убивается и заменяется новым,
+    файл попадает в `failed`, а результат для него — None.
+    Таймаут, нехватка памяти и SIGKILL отмечаются в `ThumbTask.transient`:
+    они не говорят о том, что файл поврежден.
+    После каждой задачи проверяется пик резидентной памяти (RSS) процесса:
+    процесс, превысивший `memory_mb`, завершается и заменяется новым.
+    RLIMIT_AS не используется: он ограничивает адресное пространство,
+    которое потоки OpenCV, libheif и numpy резервируют с большим запасом,
+    и здоровые процессы получали бы ложный MemoryError.
+
+    Каждому процессу отправляется до `tasks_per_worker` задач:
+    пока декодируется текущий файл, следующий читается в память
+    через `FilePrefetcher`. Задачи, ждавшие в канале убитого процесса,
+    отправляются другим процессам.
+
+    Использовать через `with`, чтобы пул гарантированно закрылся.
+    Процессы пула живут в своих сессиях и не получают сигналов родителя,
+    поэтому на время `with` пул перехватывает SIGTERM (им GUI завершает
+    сканер, см. `BaseProcessWorker.terminate_join`), а каждый процесс
+    пула сам завершается, если родителя не стало, см. `watch_parent`.
+    Результаты `imap` возвращаются строго в порядке подачи задач.
+
+    Если миниатюры хранятся в пакете, процессы пула возвращают готовые
+    JPEG, а пишет их пул через `PackWriter`. Записи THUMBS с этими
+    миниатюрами пишутся после `flush_store`, см. `BulkUpsert.thumbs`.
+    """
+    timeout_sec = 60
+    # пик RSS, после которого процесс пула заменяется
+    memory_mb = 4096
+    poll_sec = 0.5
+    tasks_per_worker = 3
+
+    def __init__(self, workers: int = 0, max_in_flight: int = 0):
+        super().__init__()
+        self.workers = workers if workers > 0 else self.default_workers()
+        if max_in_flight > 0:
+            self.max_in_flight = max_in_flight
+        else:
+            self.max_in_flight = self.workers * 4
+        self.pool: list[_Worker] = []
+        self.failed: list[tuple[str, str]] = []
+        self.pack_writer = PackWriter()
+        self.prev_sigterm = None
+
+    def __enter__(self):
+        # обработчик сигнала можно установить только из главного потока
+        if threading.current_thread() is threading.main_thread():
+            self.prev_sigterm = signal.signal(signal.SIGTERM, self.on_sigterm)
+        self.pool = [_Worker(self.memory_mb) for _ in range(self.workers)]
+        return self
+
+    def __exit__(self, *args):
+        if self.prev_sigterm is not None:
+            signal.signal(signal.SIGTERM, self.prev_sigterm)
+            self.prev_sigterm = None
+        self.flush_store()
+        for worker in self.pool:
+            if not worker.seqs:
+                worker.stop()
+        for worker in self.pool:
+            if not worker.seqs:
+                worker.process.join(timeout=self.poll_sec)
+            worker.kill()
+        self.pool = []
+
+    def flush_store(self):
+        """
+        Записывает в пакет `ThumbStore` миниатюры уже полученных результатов.
+        """
+        self.pack_writer.flush()
+
+    def on_sigterm(self, signum, frame):
+        """
+        Процесс завершают через terminate, и `__exit__` не выполнится:
+        убивает процессы пула и передает сигнал прежнему обработчику.
+        """
+        for worker in self.pool:
+            worker.kill_group()
+        signal.signal(signal.SIGTERM, self.prev_sigterm or signal.SIG_DFL)
+        self.prev_sigterm = None
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    @staticmethod
+    def default_workers():
+        return max(1, (os.cpu_count() or 2) - 1)
+
+    @staticmethod
+    def worker_loop(conn: Connection, memory_mb: int, parent_pid: int):
+        """
+        Выполняется в процессе пула: получает задачи из conn,
+        выполняет по одной и отправляет (seq, результат `create_thumb`,
+        размер изображения из заголовка, миниатюры для пакета,
+        transient — см. `ThumbTask`).
+        Пока выполняется задача, файл следующей задачи из канала
+        читается в фоновом потоке.
+        """
+        if hasattr(os, "setsid"):
+            os.setsid()
+        threading.Thread(
+            target=ThumbEngine.watch_parent,
+            args=(parent_pid, ),
+            daemon=True
+        ).start()
+        prefetcher = FilePrefetcher(ImgUtils.read_file)
+        pending: deque[tuple | None] = deque()
+        while True:
+            try:
+                if not pending:
+                    pending.append(conn.recv())
+                while conn.poll():
+                    pending.append(conn.recv())
+            except EOFError:
+                break
+            msg = pending.popleft()
+            if msg is None:
+                break
+            seq, abs_img_path, abs_thumb_path, return_array = msg
+            data = prefetcher.take(abs_img_path)
+            if pending and pending[0] is not None:
+                prefetcher.prefetch(pending[0][1])
+            result, img_size, thumbs, transient = None, None, None, False
+            try:
+                created = ThumbEngine.create_thumb(abs_img_path, abs_thumb_path, return_array, data)
+            except MemoryError:
+                print("ThumbEngine: не хватило памяти", abs_img_path)
+                created, transient = None, True
+            if created is not None:
+                result, thumbs = created
+                img_size = ImgUtils.get_img_size(abs_img_path, data)
+            conn.send((seq, result, img_size, thumbs, transient))
+            if ThumbEngine.get_peak_memory_mb() > memory_mb:
+                # освобождаем память: пул заменит процесс новым
+                break
+        prefetcher.close()
+
+    @staticmethod
+    def watch_parent(parent_pid: int):
+        """
+        Выполняется в потоке процесса пула. Если родитель завершился,
+        в том числе через SIGKILL, таймаут задачи больше никто не проверит:
+        убивает группу процесса вместе с qlmanage, не дожидаясь
+        конца декодирования.
+        """
+        while os.getppid() == parent_pid:
+            sleep(ThumbEngine.poll_sec)
+        # группа своя, только если процесс стал лидером сессии
+        if hasattr(os, "killpg") and os.getpgrp() == os.getpid():
+            os.killpg(0, signal.SIGKILL)
+        os._exit(1)
+
+    @staticmethod
+    def get_peak_memory_mb() -> float:
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS возвращает байты, Linux — килобайты
+        if sys.platform == "darwin":
+            return peak / 1024 / 1024
+        return peak / 1024
+
+    @staticmethod
+    def create_thumb(
+            abs_img_path: str,
+            abs_thumb_path: str,
+            return_array: bool,
+            data: bytes | None = None
+        ):
+        """
+        Выполняется в процессе пула.
+        data — содержимое файла, если оно уже прочитано в память.
+        Возвращает (результат, миниатюры):
+        - результат: BGR массив миниатюры, если return_array, иначе True
+        - миниатюры: {ключ: JPEG} миниатюры и ее уровней, если хранилище —
+          пакет: их пишет родительский процесс, см. `PackWriter`.
+          Файлы процесс пула пишет сам, тогда здесь None
+        Если изображение не удалось прочитать или уменьшить, возвращает
+        None и ничего не записывает. MemoryError передается дальше.
+        """
+        try:
+            decoded = ImgUtils.decode_native(abs_img_path, Static.THUMB_MAX_SIZE, data)
+            if decoded is None:
+                return None
+            img, bgr = decoded
+            img = ImgUtils.fit_to_thumb(img, Static.THUMB_MAX_SIZE)
+            if img is None:
+                return None
+            # каналы RGB декодеров переставляются уже в уменьшенной копии
+            img = ImgUtils.to_bgr(img, bgr)
+            rel_thumb_path = ThumbStore.get_rel_path(abs_thumb_path)
+            thumb_data = ImgUtils.encode_thumb(img)
+            if thumb_data is None:
+                return None
+            thumbs = {rel_thumb_path: thumb_data}
+            for size in Static.THUMB_LEVELS:
+                level = ImgUtils.fit_to_thumb(img, size)
+                level_data = None if level is None else ImgUtils.encode_thumb(level)
+                if level_data is not None:
+                    level_path = ThumbStore.get_level_path(rel_thumb_path, size)
+                    thumbs[level_path] = level_data
+            result = img if return_array else True
+            if ThumbStore.is_packed():
+                return result, thumbs
+            if not ThumbStore.write_many(thumbs):
+                return None
+            return result, None
+        except MemoryError:
+            raise
+        except Exception as e:
+            print("ThumbEngine create_thumb error", abs_img_path, e)
+        return None
+
+    def imap(
+            self,
+            tasks: Iterable[ThumbTask],
+            return_array: bool = False
+        ) -> Iterator[tuple[ThumbTask, np.ndarray | bool | None]]:
+        """
+        Подает задачи в пул, не превышая `max_in_flight`, и возвращает
+        пары (ThumbTask, результат) в порядке подачи.
+        `tasks` читается лениво, по мере освобождения места в пуле.
+        """
+        tasks = iter(tasks)
+        counter = itertools.count()
+        order: deque[tuple[int, ThumbTask]] = deque()
+        queued: deque[tuple[int, ThumbTask]] = deque()
+        results: dict[int, np.ndarray | bool | None] = {}
+        exhausted = False
+        while True:
+            while not exhausted and len(order) < self.max_in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                item = (next(counter), task)
+                order.append(item)
+                queued.append(item)
+            while order and order[0][0] in results:
+                seq, task = order.popleft()
+                yield task, results.pop(seq)
+            if not order:
+                if exhausted:
+                    return
+                continue
+            # сначала по одной задаче каждому процессу, затем в очередь
+            for depth in range(1, self.tasks_per_worker + 1):
+                for worker in self.pool:
+                    if len(worker.seqs) < depth and queued:
+                        seq, task = queued.popleft()
+                        worker.send(seq, task, return_array)
+            self._poll(results, {seq: task for seq, task in order}, queued)
+
+    def _poll(
+            self,
+            results: dict,
+            tasks: dict[int, ThumbTask],
+            queued: deque[tuple[int, ThumbTask]]
+        ):
+        """
+        Ждет результатов не дольше `poll_sec`, затем проверяет таймауты
+        и заменяет упавшие и зависшие процессы.
+        """
+        busy = [i for i in self.pool if i.seqs]
+        ready = wait(
+            [i.conn for i in busy] + [i.process.sentinel for i in self.pool],
+            timeout=self.poll_sec
+        )
+        for index, worker in enumerate(self.pool):
+            alive = worker.process.is_alive()
+            if worker.seqs and (worker.conn in ready or not alive):
+                try:
+                    while worker.seqs and worker.conn.poll():
+                        seq, result, img_size, thumbs, transient = worker.conn.recv()
+                        results[seq] = result
+                        tasks[seq].transient = transient
+                        if thumbs:
+                            self.pack_writer.add(thumbs)
+                        if img_size is not None:
+                            tasks[seq].width, tasks[seq].height = img_size
+                        worker.done()
+                except (EOFError, OSError):
+                    pass
+            reason, transient = None, False
+            if not alive:
+                reason = "процесс завершился"
+                # SIGKILL посылает не файл, а система, например при нехватке памяти
+                transient = worker.process.exitcode == -signal.SIGKILL
+            elif worker.seqs and monotonic() - worker.started > self.timeout_sec:
+                reason = f"превышено время {self.timeout_sec} с"
+                transient = True
+            if reason is None:
+                continue
+            # процесс, сам вышедший после задачи, текущей задачи не имеет
+            if worker.seqs and (alive or worker.process.exitcode != 0):
+                seq = worker.seqs.popleft()
+                task = tasks[seq]
+                task.transient = transient
+                results[seq] = None
+                self.failed.append((task.abs_img_path, reason))
+                print("ThumbEngine:", reason, task.abs_img_path)
+            queued.extendleft(reversed([(i, tasks[i]) for i in worker.seqs]))
+            worker.kill()
+            self.pool[index] = _Worker(self.memory_mb)
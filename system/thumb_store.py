@@ -0,0 +1,420 @@
+import os
+import shutil
+import threading
+import traceback
+from pathlib import Path
+from time import monotonic
+from typing import Iterable
+
+import numpy as np
+import sqlalchemy
+
+from cfg import Static
+from system.shared_utils import ImgUtils
+
+PACK_METADATA = sqlalchemy.MetaData()
+
+
+_table_packed_thumbs = sqlalchemy.Table(
+    "packed_thumbs", PACK_METADATA,
+    sqlalchemy.Column("rel_thumb_path", sqlalchemy.Text, primary_key=True),
+    sqlalchemy.Column("data", sqlalchemy.BLOB, nullable=False),
+)
+
+
+class PackedThumbs:
+    table = _table_packed_thumbs
+    rel_thumb_path = _table_packed_thumbs.c.rel_thumb_path
+    data = _table_packed_thumbs.c.data
+
+
+class ThumbStore:
+    """
+    Хранилище миниатюр. Ключ — rel_thumb_path из THUMBS,
+    например /hashdir/mf-ab/<md5>.jpg, он не зависит от способа хранения.
+
+    Способы хранения:
+    - файлы: один JPEG на изображение в `Static.HASHDIR`
+    - пакет: JPEG как BLOB в отдельной SQLite БД `Static.THUMBS_PACK_FILE`,
+      один файл вместо миллиона, чтение через mmap
+
+    Способ определяется один раз на процесс по наличию файла пакета,
+    поэтому его не нужно передавать в процессы сканера и пул `ThumbEngine`:
+    они запускаются после `migrate`, которая выполняется при старте.
+    Переключение с переносом миниатюр — `migrate`.
+
+    В пакет процессы пула не пишут: готовые JPEG возвращаются
+    в родительский процесс и пишутся пакетами через `PackWriter`.
+    """
+    batch_size = 500
+    mmap_size = 1024 * 1024 * 1024
+    _timeout = 30
+
+    _packed: bool = None
+    _engine: sqlalchemy.Engine = None
+    _engine_pid: int = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def is_packed(cls):
+        if cls._packed is None:
+            cls._packed = Static.THUMBS_PACK_FILE.exists()
+        return cls._packed
+
+    @staticmethod
+    def get_abs_path(rel_thumb_path: str) -> str:
+        return str(Static.APP_DATA_DIR / rel_thumb_path.strip(os.sep))
+
+    @staticmethod
+    def get_rel_path(abs_thumb_path: str) -> str:
+        return os.sep + os.path.relpath(abs_thumb_path, Static.APP_DATA_DIR)
+
+    @staticmethod
+    def get_level_path(rel_thumb_path: str, size: int) -> str:
+        """
+        Ключ уменьшенной копии миниатюры из `Static.THUMB_LEVELS`:
+        /hashdir/mf-ab/<md5>.jpg → /hashdir/mf-ab/<md5>_130.jpg
+        """
+        root, ext = os.path.splitext(rel_thumb_path)
+        return f"{root}_{size}{ext}"
+
+    @classmethod
+    def _with_levels(cls, rel_thumb_paths: list[str]) -> dict[str, str]:
+        """
+        Возвращает {ключ: rel_thumb_path} для миниатюр и всех их уровней.
+        """
+        keys: dict[str, str] = {}
+        for rel_thumb_path in rel_thumb_paths:
+            keys[rel_thumb_path] = rel_thumb_path
+            for size in Static.THUMB_LEVELS:
+                keys[cls.get_level_path(rel_thumb_path, size)] = rel_thumb_path
+        return keys
+
+    @classmethod
+    def write_many(cls, thumbs: dict[str, bytes]) -> bool:
+        """
+        Записывает {ключ: JPEG}. В пакет — одной транзакцией.
+        """
+        try:
+            if cls.is_packed():
+                rows = [
+                    {
+                        PackedThumbs.rel_thumb_path.name: rel_thumb_path,
+                        PackedThumbs.data.name: data
+                    }
+                    for rel_thumb_path, data in thumbs.items()
+                ]
+                stmt = sqlalchemy.insert(PackedThumbs.table).prefix_with("OR REPLACE")
+                with cls._get_engine().begin() as conn:
+                    conn.execute(stmt, rows)
+                return True
+            for rel_thumb_path, data in thumbs.items():
+                abs_thumb_path = cls.get_abs_path(rel_thumb_path)
+                os.makedirs(os.path.dirname(abs_thumb_path), exist_ok=True)
+                with open(abs_thumb_path, "wb") as file:
+                    file.write(data)
+            return True
+        except Exception as e:
+            print("ThumbStore write error", list(thumbs)[:1], e)
+            return False
+
+    @classmethod
+    def read(cls, rel_thumb_path: str) -> bytes | None:
+        """
+        Возвращает JPEG миниатюры или None, если ее нет.
+        """
+        try:
+            if cls.is_packed():
+                stmt = (
+                    sqlalchemy.select(PackedThumbs.data)
+                    .where(PackedThumbs.rel_thumb_path == rel_thumb_path)
+                )
+                with cls._get_engine().connect() as conn:
+                    return conn.execute(stmt).scalar()
+            with open(cls.get_abs_path(rel_thumb_path), "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print("ThumbStore read error", rel_thumb_path, e)
+            return None
+
+    @classmethod
+    def read_many(cls, rel_thumb_paths: Iterable[str]) -> dict[str, bytes]:
+        """
+        Возвращает {rel_thumb_path: JPEG} для существующих миниатюр.
+        В пакете читает одним запросом на `batch_size` путей,
+        поэтому страница сетки загружается за один проход по индексу.
+        """
+        rel_thumb_paths = list(rel_thumb_paths)
+        if not cls.is_packed():
+            result = {i: cls.read(i) for i in rel_thumb_paths}
+            return {k: v for k, v in result.items() if v is not None}
+        result: dict[str, bytes] = {}
+        try:
+            with cls._get_engine().connect() as conn:
+                for chunk in cls._chunks(rel_thumb_paths):
+                    stmt = (
+                        sqlalchemy.select(PackedThumbs.rel_thumb_path, PackedThumbs.data)
+                        .where(PackedThumbs.rel_thumb_path.in_(chunk))
+                    )
+                    result.update(conn.execute(stmt).all())
+        except Exception as e:
+            print("ThumbStore read_many error", e)
+        return result
+
+    @classmethod
+    def read_array(cls, rel_thumb_path: str) -> np.ndarray | None:
+        data = cls.read(rel_thumb_path)
+        if data is None:
+            return None
+        return ImgUtils.decode_thumb(data)
+
+    @classmethod
+    def get_sizes(cls, rel_thumb_paths: Iterable[str]) -> dict[str, int]:
+        """
+        Возвращает {rel_thumb_path: размер в байтах} для существующих миниатюр.
+        В размер входят уровни из `Static.THUMB_LEVELS`.
+        """
+        keys = cls._with_levels(list(rel_thumb_paths))
+        sizes: dict[str, int] = {}
+        key_sizes = cls._get_key_sizes(list(keys))
+        for key, size in key_sizes.items():
+            rel_thumb_path = keys[key]
+            if rel_thumb_path in key_sizes:
+                sizes[rel_thumb_path] = sizes.get(rel_thumb_path, 0) + size
+        return sizes
+
+    @classmethod
+    def _get_key_sizes(cls, rel_thumb_paths: list[str]) -> dict[str, int]:
+        sizes: dict[str, int] = {}
+        if cls.is_packed():
+            with cls._get_engine().connect() as conn:
+                for chunk in cls._chunks(rel_thumb_paths):
+                    stmt = (
+                        sqlalchemy.select(
+                            PackedThumbs.rel_thumb_path,
+                            sqlalchemy.func.length(PackedThumbs.data)
+                        )
+                        .where(PackedThumbs.rel_thumb_path.in_(chunk))
+                    )
+                    sizes.update(conn.execute(stmt).all())
+            return sizes
+        for rel_thumb_path in rel_thumb_paths:
+            try:
+                sizes[rel_thumb_path] = os.path.getsize(
+                    cls.get_abs_path(rel_thumb_path)
+                )
+            except OSError:
+                continue
+        return sizes
+
+    @classmethod
+    def remove(cls, rel_thumb_paths: Iterable[str]):
+        """
+        Удаляет миниатюры вместе с их уровнями из `Static.THUMB_LEVELS`.
+        """
+        rel_thumb_paths = list(cls._with_levels(list(rel_thumb_paths)))
+        if cls.is_packed():
+            with cls._get_engine().begin() as conn:
+                for chunk in cls._chunks(rel_thumb_paths):
+                    stmt = (
+                        sqlalchemy.delete(PackedThumbs.table)
+                        .where(PackedThumbs.rel_thumb_path.in_(chunk))
+                    )
+                    conn.execute(stmt)
+            return
+        for rel_thumb_path in rel_thumb_paths:
+            abs_thumb_path = cls.get_abs_path(rel_thumb_path)
+            try:
+                os.remove(abs_thumb_path)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                print("ThumbStore remove error", abs_thumb_path, e)
+                continue
+            try:
+                os.rmdir(os.path.dirname(abs_thumb_path))
+            except OSError:
+                pass
+
+    @classmethod
+    def migrate(cls, packed: bool):
+        """
+        Переносит все миниатюры в пакет (packed=True) или обратно в файлы.
+        Источник удаляется только после проверки, что в приемнике
+        столько же миниатюр, сколько было в источнике. Пакет собирается
+        во временном файле, поэтому прерванная миграция ничего не ломает.
+        Способ хранения для этого процесса фиксируется здесь, см. `is_packed`.
+        """
+        cls._packed = None
+        if packed == cls.is_packed():
+            return
+        try:
+            if packed:
+                cls._files_to_pack()
+            else:
+                cls._pack_to_files()
+        except Exception as e:
+            print(traceback.format_exc())
+        cls._packed = None
+        cls.is_packed()
+
+    @classmethod
+    def _files_to_pack(cls):
+        tmp_file = Static.THUMBS_PACK_FILE.with_suffix(".tmp")
+        tmp_file.unlink(missing_ok=True)
+        engine = sqlalchemy.create_engine(f"sqlite:///{tmp_file}")
+        PACK_METADATA.create_all(engine)
+        rows: list[dict] = []
+        count = 0
+        with engine.begin() as conn:
+            for abs_thumb_path in cls._iter_hashdir():
+                with open(abs_thumb_path, "rb") as file:
+                    rows.append({
+                        PackedThumbs.rel_thumb_path.name: cls.get_rel_path(abs_thumb_path),
+                        PackedThumbs.data.name: file.read()
+                    })
+                if len(rows) >= cls.batch_size:
+                    conn.execute(sqlalchemy.insert(PackedThumbs.table), rows)
+                    count += len(rows)
+                    rows.clear()
+                    print("ThumbStore: перенесено в пакет", count)
+            if rows:
+                conn.execute(sqlalchemy.insert(PackedThumbs.table), rows)
+                count += len(rows)
+        with engine.connect() as conn:
+            stmt = sqlalchemy.select(sqlalchemy.func.count()).select_from(PackedThumbs.table)
+            packed_count = conn.execute(stmt).scalar()
+        engine.dispose()
+        files_count = sum(1 for _ in cls._iter_hashdir())
+        if not packed_count == count == files_count:
+            # hashdir остается как есть, пакет не подключается
+            print(
+                "ThumbStore: пакет не совпадает с hashdir, миграция отменена",
+                packed_count, count, files_count
+            )
+            tmp_file.unlink(missing_ok=True)
+            return
+        os.replace(tmp_file, Static.THUMBS_PACK_FILE)
+        shutil.rmtree(Static.HASHDIR, ignore_errors=True)
+        Static.HASHDIR.mkdir(parents=True, exist_ok=True)
+        print("ThumbStore: миниатюры перенесены в пакет", count)
+
+    @classmethod
+    def _pack_to_files(cls):
+        count = 0
+        rel_thumb_paths: list[str] = []
+        engine = cls._get_engine()
+        stmt = sqlalchemy.select(PackedThumbs.rel_thumb_path, PackedThumbs.data)
+        with engine.connect() as conn:
+            result = conn.execution_options(yield_per=cls.batch_size).execute(stmt)
+            for rel_thumb_path, data in result:
+                abs_thumb_path = cls.get_abs_path(rel_thumb_path)
+                os.makedirs(os.path.dirname(abs_thumb_path), exist_ok=True)
+                with open(abs_thumb_path, "wb") as file:
+                    file.write(data)
+                rel_thumb_paths.append(rel_thumb_path)
+                count += 1
+            stmt = sqlalchemy.select(sqlalchemy.func.count()).select_from(PackedThumbs.table)
+            packed_count = conn.execute(stmt).scalar()
+        missing = [
+            i for i in rel_thumb_paths
+            if not os.path.isfile(cls.get_abs_path(i))
+        ]
+        if packed_count != count or missing:
+            # пакет остается основным хранилищем
+            print(
+                "ThumbStore: hashdir не совпадает с пакетом, миграция отменена",
+                packed_count, count, len(missing)
+            )
+            return
+        engine.dispose()
+        cls._engine = None
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{Static.THUMBS_PACK_FILE}{suffix}").unlink(missing_ok=True)
+        print("ThumbStore: миниатюры перенесены в hashdir", count)
+
+    @classmethod
+    def _iter_hashdir(cls):
+        for folder in os.scandir(Static.HASHDIR):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.is_file():
+                    yield entry.path
+
+    @classmethod
+    def _chunks(cls, items: list[str]):
+        for i in range(0, len(items), cls.batch_size):
+            yield items[i:i + cls.batch_size]
+
+    @classmethod
+    def _get_engine(cls) -> sqlalchemy.Engine:
+        """
+        Движок создается отдельно в каждом процессе: соединения SQLite
+        нельзя передавать через fork.
+        """
+        with cls._lock:
+            if cls._engine is None or cls._engine_pid != os.getpid():
+                cls._engine = sqlalchemy.create_engine(
+                    f"sqlite:///{Static.THUMBS_PACK_FILE}",
+                    connect_args={
+                        "check_same_thread": False,
+                        "timeout": cls._timeout
+                    }
+                )
+                sqlalchemy.event.listen(cls._engine, "connect", cls._on_connect)
+                cls._engine_pid = os.getpid()
+            return cls._engine
+
+    @classmethod
+    def _on_connect(cls, dbapi_connection, connection_record):
+        # WAL позволяет писать из процессов пула, не блокируя чтение сетки
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA mmap_size={cls.mmap_size}")
+        cursor.close()
+
+
+class PackWriter:
+    """
+    Пакетная запись миниатюр в пакет `ThumbStore` в родительском процессе.
+
+    Процессы пула `ThumbEngine` отдают готовые JPEG, а не пишут сами:
+    SQLite допускает одного писателя, и транзакция на каждую миниатюру
+    из нескольких процессов упирается в блокировку БД.
+    Миниатюры копятся и пишутся одной транзакцией, когда набралось
+    `max_rows` строк или с первой строки пакета прошло `max_seconds`
+    секунд, как в `BulkUpsert`. Использовать через `with`.
+    """
+    max_rows = 500
+    max_seconds = 2.0
+
+    def __init__(self):
+        super().__init__()
+        self.thumbs: dict[str, bytes] = {}
+        self.first_row_time = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def add(self, thumbs: dict[str, bytes]):
+        if not self.thumbs:
+            self.first_row_time = monotonic()
+        self.thumbs.update(thumbs)
+        stmt = (
+            len(self.thumbs) >= self.max_rows,
+            monotonic() - self.first_row_time >= self.max_seconds
+        )
+        if any(stmt):
+            self.flush()
+
+    def flush(self):
+        if not self.thumbs:
+            return
+        ThumbStore.write_many(self.thumbs)
+        self.thumbs = {}
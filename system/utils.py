@@ -15,7 +15,11 @@ from cfg import Static
 class Utils:
 
     @classmethod
-    def pyqt_qimage_from_array(cls, image: np.ndarray) -> QImage | None:
+    def pyqt_qimage_from_array(cls, image: np.ndarray, bgr: bool = False) -> QImage | None:
+        """
+        bgr: трехканальный массив в порядке BGR, например миниатюра
+        из `ThumbEngine.create_thumb`; каналы не переставляются.
+        """
         try:
             image = np.ascontiguousarray(image)
             if image.ndim == 2:  # grayscale
@@ -25,7 +29,12 @@ class Utils:
             elif image.ndim == 3 and image.shape[2] in (3, 4):
                 height, width, channels = image.shape
                 bytes_per_line = channels * width
-                fmt = QImage.Format.Format_RGB888 if channels == 3 else QImage.Format.Format_RGBA8888
+                if channels == 4:
+                    fmt = QImage.Format.Format_RGBA8888
+                elif bgr:
+                    fmt = QImage.Format.Format_BGR888
+                else:
+                    fmt = QImage.Format.Format_RGB888
                 qimage = QImage(image.data, width, height, bytes_per_line, fmt)
             else:
                 print(f"qimage_from_array: channels trouble {image.shape}")
@@ -73,6 +82,26 @@ class Utils:
         scaled.setDevicePixelRatio(dpr)
         return scaled
 
+    @classmethod
+    def pyqt_qimage_scaled(cls, qimage: QImage, max_side: int, ratio: float) -> QImage:
+        """
+        Вписывает QImage в квадрат max_side логических пикселей
+        с учетом devicePixelRatio экрана. Не увеличивает изображение:
+        если оно меньше, меняется только devicePixelRatio.
+        """
+        side = round(max_side * ratio)
+        if max(qimage.width(), qimage.height()) > side:
+            qimage = qimage.scaled(
+                side,
+                side,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+        else:
+            qimage = qimage.copy()
+        qimage.setDevicePixelRatio(max(qimage.width(), qimage.height()) / max_side)
+        return qimage
+
     @classmethod
     def pyqt_qiconed_resize(cls, pixmap: QPixmap, max_side: int) -> QPixmap:
         return QIcon(pixmap).pixmap(QSize(max_side, max_side))
@@ -83,13 +112,12 @@ class Utils:
         encoded = clean_rel_path.encode('utf-8')
         filename = hashlib.md5(encoded).hexdigest() + ".jpg"
         folder_name = f"{mf_alias}-{filename[:2]}"
-        new_folder = Static.HASHDIR / folder_name
-        new_folder.mkdir(parents=True, exist_ok=True)
-        return str(new_folder / filename)
+        # папку создает ThumbStore при записи файла
+        return str(Static.HASHDIR / folder_name / filename)
 
     @classmethod
     def get_rel_thumb_path(cls, abs_thumb_path: str, app_data_dir = Static.APP_DATA_DIR):
-        p_base = Path(app_data_dir.strip(os.sep))
+        p_base = Path(str(app_data_dir).strip(os.sep))
         p_abs = Path(abs_thumb_path.strip(os.sep))
         if p_abs.is_relative_to(p_base):
             return os.sep + str(p_abs.relative_to(p_base))
@@ -0,0 +1,122 @@
+import io
+import time
+
+import cv2
+import numpy as np
+
+
+class _BudgetReader(io.BufferedIOBase):
+    """
+    Файл для `cv2.VideoCapture` с ограничением на объем прочитанных
+    байт и на время. После превышения любого из лимитов чтение
+    возвращает b"" (конец файла), и декодер останавливается.
+    """
+
+    def __init__(self, path: str, max_bytes: int, timeout_sec: float):
+        super().__init__()
+        self.file = open(path, "rb")
+        self.max_bytes = max_bytes
+        self.deadline = time.monotonic() + timeout_sec
+        self.bytes_read = 0
+
+    def is_exhausted(self):
+        return (
+            self.bytes_read >= self.max_bytes
+            or time.monotonic() >= self.deadline
+        )
+
+    def read(self, size: int = -1) -> bytes:
+        if self.is_exhausted():
+            return b""
+        left = self.max_bytes - self.bytes_read
+        size = left if size is None or size < 0 else min(size, left)
+        data = self.file.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        # перемотка не читает данные и в лимит не входит
+        return self.file.seek(offset, whence)
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+class VideoReader:
+    """
+    Кадр-обложка видео для миниатюры.
+
+    Видео открывается через `_BudgetReader`, поэтому на сетевых дисках
+    чтение одного файла ограничено `max_bytes` и `timeout_sec`,
+    даже если индекс (moov) лежит в конце многогигабайтного файла.
+    Перемотка идет к ближайшему предшествующему ключевому кадру,
+    после чего декодируется не больше одной группы кадров (GOP).
+    Кадр уменьшается до size сразу после декодирования.
+    """
+    max_bytes = 32 * 1024 * 1024
+    timeout_sec = 10
+    time_sec = 1
+
+    @classmethod
+    def read(cls, path: str, size: int = 0) -> np.ndarray | None:
+        """
+        Возвращает RGB кадр или None, если кадр прочитать не удалось.
+        - size: нужный размер большей стороны, 0 — полный размер
+        """
+        reader = _BudgetReader(path, cls.max_bytes, cls.timeout_sec)
+        try:
+            cap = cls._open(path, reader)
+            try:
+                frame = cls._read_poster(cap)
+            finally:
+                cap.release()
+        finally:
+            reader.close()
+        if frame is None:
+            return None
+        if size > 0 and max(frame.shape[:2]) > size:
+            h, w = frame.shape[:2]
+            scale = size / max(h, w)
+            frame = cv2.resize(
+                frame,
+                (max(1, round(w * scale)), max(1, round(h * scale))),
+                interpolation=cv2.INTER_AREA
+            )
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    @classmethod
+    def _open(cls, path: str, reader: _BudgetReader) -> cv2.VideoCapture:
+        timeout_msec = int(cls.timeout_sec * 1000)
+        params = [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_msec,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_msec,
+        ]
+        try:
+            return cv2.VideoCapture(reader, cv2.CAP_FFMPEG, params)
+        except (cv2.error, TypeError) as e:
+            # OpenCV без поддержки чтения из потока: остаются только таймауты
+            print("VideoReader stream error", path, e)
+            return cv2.VideoCapture(path, cv2.CAP_FFMPEG, params)
+
+    @classmethod
+    def _read_poster(cls, cap: cv2.VideoCapture) -> np.ndarray | None:
+        """
+        Кадр на `time_sec`, но не дальше середины ролика.
+        Если перемотка не удалась, берется первый кадр.
+        """
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        msec = cls.time_sec * 1000
+        if fps > 0 and frames > 0:
+            msec = min(msec, frames / fps * 1000 / 2)
+        if msec > 0:
+            cap.set(cv2.CAP_PROP_POS_MSEC, msec)
+            success, frame = cap.read()
+            if success:
+                return frame
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        success, frame = cap.read()
+        return frame if success else None
@@ -0,0 +1,48 @@
+"""
+Время декодирования по форматам `DecoderRegistry`.
+
+Декодирует каждый файл из папки repeat раз и печатает статистику
+`DecoderRegistry.get_stats` по декодерам. Корпус — папка с образцами
+всех поддерживаемых форматов, одна и та же между замерами.
+- --size 0: полное декодирование, > 0: как для миниатюр
+
+Запуск из корня репозитория:
+    python tools/bench/bench_decoders.py /path/to/corpus --size 270
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# декодеры регистрируются при импорте shared_utils
+import system.shared_utils
+from system.decoders import DecoderRegistry
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--size", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    DecoderRegistry.reset_stats()
+    for entry in sorted(os.scandir(args.corpus), key=lambda i: i.name):
+        if not entry.is_file():
+            continue
+        decoder = DecoderRegistry.get(entry.path)
+        if decoder is None:
+            print("нет декодера", entry.name)
+            continue
+        for _ in range(args.repeat):
+            try:
+                DecoderRegistry.decode(decoder, entry.path, args.size)
+            except Exception as e:
+                print("ошибка", entry.name, e)
+    for name, row in DecoderRegistry.get_stats().items():
+        print(f"{name:<10}", row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Время чтения PSD / PSB: `PsdReader` и qlmanage, которым PSD
+читался раньше (только macOS, на других системах qlmanage пропускается).
+
+Создает во временной папке RGB 8 бит PSD со сжатием RLE, как их
+сохраняет Photoshop по умолчанию, и читает каждый файл repeat раз:
+полностью и для миниатюры `Static.THUMB_MAX_SIZE`.
+Можно передать папку с настоящими файлами: --corpus /path/to/psd
+
+Запуск из корня репозитория:
+    python tools/bench/bench_psd.py
+"""
+import argparse
+import os
+import shutil
+import struct
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import cv2
+import numpy as np
+
+from cfg import Static
+from system.psd_reader import PsdReader
+from system.shared_utils import ImgUtils
+
+SIZES = ((1500, 1000), (3000, 2000), (6000, 4000))
+
+
+def packbits(row: bytes) -> bytes:
+    out = bytearray()
+    i = 0
+    while i < len(row):
+        j = i
+        while j < len(row) and j - i < 128 and row[j] == row[i]:
+            j += 1
+        if j - i >= 3:
+            out += bytes([(257 - (j - i)) & 0xFF, row[i]])
+            i = j
+        else:
+            j = min(i + 128, len(row))
+            out += bytes([j - i - 1]) + row[i:j]
+            i = j
+    return bytes(out)
+
+
+def write_psd(path: str, img: np.ndarray):
+    """
+    RGB 8 бит, RLE, без слоев и ресурсов.
+    """
+    h, w = img.shape[:2]
+    header = b"8BPS" + struct.pack(">H", 1) + b"\0" * 6
+    header += struct.pack(">HIIHH", 3, h, w, 8, 3)
+    # color mode data, image resources, layer and mask info
+    header += struct.pack(">III", 0, 0, 0)
+    packed = [
+        packbits(row.tobytes())
+        for channel in range(3)
+        for row in img[:, :, channel]
+    ]
+    with open(path, "wb") as file:
+        file.write(header)
+        file.write(struct.pack(">H", 1))
+        file.write(b"".join(struct.pack(">H", len(i)) for i in packed))
+        file.write(b"".join(packed))
+
+
+def create_corpus(folder: str) -> list[str]:
+    rng = np.random.default_rng(0)
+    paths = []
+    for w, h in SIZES:
+        # плавные области сжимаются RLE, как на фотографии
+        img = rng.integers(0, 255, (h // 50, w // 50, 3), np.uint8)
+        img = cv2.resize(img, (w, h), interpolation=cv2.INTER_CUBIC)
+        path = os.path.join(folder, f"{w}x{h}.psd")
+        write_psd(path, img)
+        paths.append(path)
+    return paths
+
+
+def measure(fn, path: str, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        img = fn(path)
+    if img is None:
+        return float("nan")
+    return (perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default="")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = [
+                entry.path
+                for entry in sorted(os.scandir(args.corpus), key=lambda i: i.name)
+                if entry.name.lower().endswith((".psd", ".psb"))
+            ]
+        else:
+            paths = create_corpus(tmp)
+        size = Static.THUMB_MAX_SIZE
+        readers = {
+            "PsdReader": lambda path: PsdReader.read(path),
+            f"PsdReader {size}": lambda path: PsdReader.read(path, size),
+        }
+        if shutil.which("qlmanage"):
+            readers["qlmanage"] = lambda path: ImgUtils._read_quicklook(path)
+            readers[f"qlmanage {size}"] = lambda path: ImgUtils._read_quicklook(path, size)
+        print(f"{'файл':<16}" + "".join(f"{name:>18}" for name in readers))
+        for path in paths:
+            row = [measure(fn, path, args.repeat) for fn in readers.values()]
+            print(f"{os.path.basename(path):<16}" + "".join(f"{ms:15.0f} ms" for ms in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Память и время сравнения Finder и БД в сканере.
+
+Создает временную БД с images изображениями в dirs директориях
+(без файлов на диске, Finder имитируется теми же записями) и
+проходит все директории так же, как `DirImagesUpdater.iter_new_images`:
+`ImgLoader.iter_db_images` + `ImgComparator` на каждую директорию.
+Пиковая память (tracemalloc) не должна расти вместе с размером БД.
+
+Для сравнения `--old` выполняет прежнюю схему: все записи Mf
+в список и sorted() обеих сторон перед слиянием.
+
+Запуск из корня репозитория:
+    python tools/bench/bench_scan_compare.py --dirs 1000000 --images 5000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import sqlalchemy
+
+from system.database import METADATA, Migrations, Thumbs
+from system.main_folder import Mf
+from system.scaner import (BaseScanerItem, DirItem, DirsComparator,
+                           ImgComparator, ImgItem, ImgLoader, Tools)
+
+MF_PATH = "/Volumes/bench"
+
+
+def create_db(path: str, dirs: int, images: int) -> sqlalchemy.Engine:
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    METADATA.create_all(engine)
+    Migrations.apply(engine)
+    per_dir = max(1, images // dirs)
+    rows: list[dict] = []
+    with engine.begin() as conn:
+        for rel_img_path, root in iter_paths(dirs, per_dir):
+            rows.append({
+                Thumbs.rel_img_path.name: rel_img_path,
+                Thumbs.rel_thumb_path.name: rel_img_path,
+                Thumbs.size.name: 1,
+                Thumbs.mod.name: 1,
+                Thumbs.root.name: root,
+                Thumbs.mf_alias.name: "bench",
+            })
+            if len(rows) >= 10000:
+                conn.execute(sqlalchemy.insert(Thumbs.table), rows)
+                rows.clear()
+        if rows:
+            conn.execute(sqlalchemy.insert(Thumbs.table), rows)
+    return engine
+
+
+def iter_paths(dirs: int, per_dir: int):
+    for i in range(dirs):
+        root = f"/{i % 1000:03d}/{i:07d}"
+        for j in range(per_dir):
+            yield f"{root}/{j:04d}.jpg", root
+
+
+def get_dir_items(dirs: int) -> list[DirItem]:
+    return [
+        DirItem(f"{MF_PATH}/{i % 1000:03d}/{i:07d}", f"/{i % 1000:03d}/{i:07d}", 1)
+        for i in range(dirs)
+    ]
+
+
+def get_finder_images(dir_item: DirItem, per_dir: int) -> list[ImgItem]:
+    # обратный порядок, как у scandir без сортировки
+    return [
+        ImgItem(f"{dir_item.abs_path}/{j:04d}.jpg", 1, 1)
+        for j in reversed(range(per_dir))
+    ]
+
+
+def run_stream(scaner: BaseScanerItem, dir_items: list[DirItem], per_dir: int):
+    changed = 0
+    for dir_item in dir_items:
+        db_images = ImgLoader(scaner, [dir_item]).iter_db_images()
+        finder_images = get_finder_images(dir_item, per_dir)
+        removed, new = ImgComparator(scaner, finder_images, db_images).start()
+        changed += len(removed) + len(new)
+    return changed
+
+
+def run_old(scaner: BaseScanerItem, dir_items: list[DirItem], per_dir: int):
+    db_images = list(ImgLoader(scaner, dir_items).iter_db_images())
+    finder_images = [
+        i for dir_item in dir_items
+        for i in get_finder_images(dir_item, per_dir)
+    ]
+    key = lambda img_item: img_item.abs_img_path
+    joined = Tools.merge_join(
+        sorted(finder_images, key=key),
+        sorted(db_images, key=key),
+        key
+    )
+    return sum(1 for finder_items, db_items in joined if not finder_items or not db_items)
+
+
+def measure(name: str, func, *args):
+    tracemalloc.start()
+    start = perf_counter()
+    result = func(*args)
+    seconds = perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<24} {seconds:8.1f} s  peak {peak / 1024 / 1024:8.1f} MB  changed {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dirs", type=int, default=100000)
+    parser.add_argument("--images", type=int, default=500000)
+    parser.add_argument("--old", action="store_true")
+    args = parser.parse_args()
+    per_dir = max(1, args.images // args.dirs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = perf_counter()
+        engine = create_db(os.path.join(tmp, "db.db"), args.dirs, args.images)
+        print(f"БД: {args.dirs} директорий, {args.dirs * per_dir} изображений, "
+              f"{perf_counter() - start:.1f} s")
+        mf = Mf("bench", [MF_PATH], [], MF_PATH)
+        scaner = BaseScanerItem(mf, engine, None, None, 0, 0, 0, "base", 1)
+
+        finder_dirs = get_dir_items(args.dirs)
+        db_dirs = sorted(get_dir_items(args.dirs), key=lambda i: i.rel_path)
+        measure("DirsComparator", lambda: len(DirsComparator(scaner, finder_dirs, db_dirs).start()[1]))
+        measure("ImgComparator поток", run_stream, scaner, finder_dirs, per_dir)
+        if args.old:
+            measure("ImgComparator списки", run_old, scaner, finder_dirs, per_dir)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Сравнение способов хранения `ThumbStore`: файлы в hashdir и пакет SQLite.
+
+Во временной папке создается count миниатюр (JPEG THUMB_MAX_SIZE
+и уровни `Static.THUMB_LEVELS`) и замеряется:
+- загрузка страницы сетки: `read_many` для THUMBS_LOAD_LIMIT случайных
+  миниатюр, медиана и 95-й перцентиль по pages страницам,
+  первая страница — после сброса кеша ОС, если есть права root
+- перенос в пакет и обратно (`migrate`)
+- запись в пакет: транзакция на каждую миниатюру и `PackWriter`
+
+Запуск из корня репозитория:
+    python tools/bench/bench_thumb_store.py --count 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import cv2
+import numpy as np
+
+from cfg import Static
+from system.shared_utils import ImgUtils
+from system.thumb_store import PackWriter, ThumbStore
+
+
+def drop_caches():
+    os.system("sync; echo 3 > /proc/sys/vm/drop_caches 2>/dev/null")
+
+
+def create_thumbs(count: int) -> list[str]:
+    rng = np.random.default_rng(0)
+    # шум сжимается хуже фотографии, поэтому размер JPEG берется
+    # из сглаженного шума, около 15 КБ на миниатюру 270 px
+    img = rng.integers(0, 255, (180, 270, 3), np.uint8)
+    img = cv2.GaussianBlur(img, (5, 5), 0)
+    thumb = ImgUtils.encode_thumb(img)
+    levels = {
+        size: ImgUtils.encode_thumb(ImgUtils.fit_to_thumb(img, size))
+        for size in Static.THUMB_LEVELS
+    }
+    rel_thumb_paths = []
+    batch: dict[str, bytes] = {}
+    for i in range(count):
+        rel_thumb_path = f"/hashdir/mf-{i % 256:02x}/{i:032x}.jpg"
+        rel_thumb_paths.append(rel_thumb_path)
+        batch[rel_thumb_path] = thumb
+        for size, data in levels.items():
+            batch[ThumbStore.get_level_path(rel_thumb_path, size)] = data
+        if len(batch) >= 5000:
+            ThumbStore.write_many(batch)
+            batch.clear()
+    ThumbStore.write_many(batch)
+    return rel_thumb_paths
+
+
+def page_latency(rel_thumb_paths: list[str], pages: int) -> str:
+    rng = random.Random(1)
+    limit = Static.THUMBS_LOAD_LIMIT
+    times = []
+    drop_caches()
+    for _ in range(pages):
+        start = rng.randrange(0, max(1, len(rel_thumb_paths) - limit))
+        page = rel_thumb_paths[start:start + limit]
+        t = perf_counter()
+        result = ThumbStore.read_many(page)
+        times.append((perf_counter() - t) * 1000)
+        assert len(result) == len(page)
+    first = times[0]
+    times.sort()
+    p95 = times[int(len(times) * 0.95) - 1]
+    return (
+        f"первая {first:7.1f} ms  медиана {statistics.median(times):6.2f} ms  "
+        f"p95 {p95:6.2f} ms"
+    )
+
+
+def write_speed(count: int) -> str:
+    thumb = ImgUtils.encode_thumb(np.zeros((180, 270, 3), np.uint8))
+    keys = [f"/hashdir/bench/{i:032x}.jpg" for i in range(count)]
+    t = perf_counter()
+    for key in keys[:count // 2]:
+        ThumbStore.write_many({key: thumb})
+    single = count // 2 / (perf_counter() - t)
+    t = perf_counter()
+    with PackWriter() as writer:
+        for key in keys[count // 2:]:
+            writer.add({key: thumb})
+    batched = count // 2 / (perf_counter() - t)
+    return f"транзакция на миниатюру {single:8.0f}/s  PackWriter {batched:8.0f}/s"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Static.APP_DATA_DIR = Path(tmp)
+        Static.HASHDIR = Path(tmp) / "hashdir"
+        Static.THUMBS_PACK_FILE = Path(tmp) / "thumbs.db"
+        ThumbStore.migrate(False)
+
+        t = perf_counter()
+        rel_thumb_paths = create_thumbs(args.count)
+        print(f"{args.count} миниатюр в файлах: {perf_counter() - t:.1f} s")
+        print("страница, файлы:", page_latency(rel_thumb_paths, args.pages))
+
+        t = perf_counter()
+        ThumbStore.migrate(True)
+        print(f"перенос в пакет: {perf_counter() - t:.1f} s, пакет "
+              f"{Static.THUMBS_PACK_FILE.stat().st_size / 1024 / 1024:.0f} MB")
+        print("страница, пакет:", page_latency(rel_thumb_paths, args.pages))
+        print("запись в пакет:", write_speed(2000))
+
+        t = perf_counter()
+        ThumbStore.migrate(False)
+        print(f"перенос в файлы: {perf_counter() - t:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Скорость и качество миниатюр: `ImgUtils.decode_native` +
+`ImgUtils.fit_to_thumb` + `ImgUtils.encode_thumb` против прежнего пути
+(RGB массив из декодера, один проход INTER_LANCZOS4, перевод в BGR
+и качество JPEG cv2 по умолчанию, 95).
+
+Файлы из папки читаются в память заранее, в замер входят декодирование,
+уменьшение и кодирование. Печатает миниатюр в секунду и средний размер
+JPEG для обоих путей и SSIM новых миниатюр относительно прежних
+(1.0 — совпадают).
+
+Запуск из корня репозитория:
+    python tools/bench/bench_thumbs.py /path/to/corpus
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", ".."))
+
+import cv2
+import numpy as np
+
+from cfg import Static
+from system.shared_utils import ImgUtils
+
+SIZE = Static.THUMB_MAX_SIZE
+
+
+def old_path(path: str, data: bytes) -> bytes:
+    img = ImgUtils.decode_img(path, SIZE, data)
+    h, w = img.shape[:2]
+    scale = SIZE / max(h, w)
+    thumb = cv2.resize(
+        img,
+        (max(1, int(w * scale)), max(1, int(h * scale))),
+        interpolation=cv2.INTER_LANCZOS4
+    )
+    ok, buffer = cv2.imencode(".jpg", cv2.cvtColor(thumb, cv2.COLOR_RGB2BGR))
+    return buffer.tobytes()
+
+
+def new_path(path: str, data: bytes) -> bytes:
+    img, bgr = ImgUtils.decode_native(path, SIZE, data)
+    thumb = ImgUtils.to_bgr(ImgUtils.fit_to_thumb(img, SIZE), bgr)
+    return ImgUtils.encode_thumb(thumb)
+
+
+def ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """
+    SSIM по яркости с гауссовым окном 11x11, sigma 1.5.
+    """
+    h = min(a.shape[0], b.shape[0])
+    w = min(a.shape[1], b.shape[1])
+    a = cv2.cvtColor(a[:h, :w], cv2.COLOR_RGB2GRAY).astype(np.float64)
+    b = cv2.cvtColor(b[:h, :w], cv2.COLOR_RGB2GRAY).astype(np.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    blur = lambda x: cv2.GaussianBlur(x, (11, 11), 1.5)
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a ** 2
+    var_b = blur(b * b) - mu_b ** 2
+    cov = blur(a * b) - mu_a * mu_b
+    result = (
+        (2 * mu_a * mu_b + c1) * (2 * cov + c2)
+        / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    )
+    return float(result.mean())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("corpus")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    images: list[tuple[str, bytes]] = []
+    for entry in sorted(os.scandir(args.corpus), key=lambda i: i.name):
+        if entry.is_file() and entry.name.endswith(ImgUtils.ext_all):
+            with open(entry.path, "rb") as file:
+                images.append((entry.path, file.read()))
+    if not images:
+        print("нет изображений")
+        return
+
+    outputs: dict[str, list[bytes]] = {}
+    for name, fn in (("old", old_path), ("new", new_path)):
+        start = perf_counter()
+        for _ in range(args.repeat):
+            outputs[name] = [fn(path, data) for path, data in images]
+        per_sec = len(images) * args.repeat / (perf_counter() - start)
+        avg_kb = sum(len(i) for i in outputs[name]) / len(images) / 1024
+        print(f"{name}: {per_sec:6.1f}/s  {avg_kb:5.1f} KB")
+    values = [
+        ssim(ImgUtils.decode_thumb(a), ImgUtils.decode_thumb(b))
+        for a, b in zip(outputs["old"], outputs["new"])
+    ]
+    print(f"SSIM: среднее {np.mean(values):.4f}  минимум {np.min(values):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -59,9 +59,7 @@ class ULineEdit(QLineEdit):
         text = Utils.pyqt_paste_text()
         self.insert(text)
 
-    def contextMenuEvent(self, a0: QContextMenuEvent | None) -> None:
-        self.menu_ = UMenu(event=a0)
-
+    def add_edit_actions(self, menu: UMenu):
         actions = [
             (Lng.cut[JsonData.lng_index], self.cut_selection),
             (Lng.copy[JsonData.lng_index], lambda: Utils.pyqt_copy_text(self.selectedText())),
@@ -69,10 +67,13 @@ class ULineEdit(QLineEdit):
         ]
 
         for text, slot in actions:
-            act = QAction(text=text, parent=self.menu_)
+            act = QAction(text=text, parent=menu)
             act.triggered.connect(slot)
-            self.menu_.addAction(act)
+            menu.addAction(act)
 
+    def contextMenuEvent(self, a0: QContextMenuEvent | None) -> None:
+        self.menu_ = UMenu(event=a0)
+        self.add_edit_actions(self.menu_)
         self.menu_.show_menu()
 
 
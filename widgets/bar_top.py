@@ -41,6 +41,7 @@ class ClearBtn(QSvgWidget):
 class WidSearch(ULineEditLight):
     reload_thumbnails = pyqtSignal()
     open_img_search = pyqtSignal()
+    search_all_mf = pyqtSignal(str)
     ww = 162
 
     def __init__(self):
@@ -57,19 +58,34 @@ class WidSearch(ULineEditLight):
 
     def create_search(self, new_text):
         if len(new_text) > 0:
-            Dynamic.search_widget_text = new_text
+            # поиск во всех Mf не фильтрует сетку текущего каталога
+            if not Dynamic.search_all_mf:
+                Dynamic.search_widget_text = new_text
             self.clear_btn.enable()
         else:
             Dynamic.search_widget_text = None
             self.clear_btn.disable()
 
     def delayed_search(self):
-        self.reload_thumbnails.emit()
+        if not Dynamic.search_all_mf:
+            self.reload_thumbnails.emit()
+        elif self.text().strip():
+            self.search_all_mf.emit(self.text().strip())
+
+    def toggle_search_all_mf(self, value: bool):
+        Dynamic.search_all_mf = value
+        if value:
+            self.setPlaceholderText(Lng.search_all_mf[JsonData.lng_index])
+        else:
+            self.setPlaceholderText(Lng.search[JsonData.lng_index])
+        if Dynamic.search_widget_text:
+            self.clear_search()
+        else:
+            self.clear()
 
     def clear_search(self):
         self.clear()
         Dynamic.search_widget_text = None
-        Dynamic.loaded_thumbs = 0
         Dynamic.thumb_path_set.clear()
         self.reload_thumbnails.emit()
 
@@ -84,6 +100,17 @@ class WidSearch(ULineEditLight):
         self.open_img_search.emit()
         return super().mouseDoubleClickEvent(a0)
 
+    def contextMenuEvent(self, a0):
+        self.menu_ = UMenu(event=a0)
+        self.add_edit_actions(self.menu_)
+        self.menu_.addSeparator()
+        act = QAction(text=Lng.search_all_mf[JsonData.lng_index], parent=self.menu_)
+        act.setCheckable(True)
+        act.setChecked(Dynamic.search_all_mf)
+        act.triggered.connect(self.toggle_search_all_mf)
+        self.menu_.addAction(act)
+        self.menu_.show_menu()
+
 
 class BarTopBtn(QWidget):
     clicked_ = pyqtSignal()
@@ -220,6 +247,7 @@ class BarTop(QWidget):
     reload_thumbnails = pyqtSignal()
     open_img_search_win = pyqtSignal()
     start_text_search = pyqtSignal()
+    start_mf_search = pyqtSignal(str)
     hh = 60
 
     def __init__(self):
@@ -263,6 +291,7 @@ class BarTop(QWidget):
         # --- Виджет поиска ---
         self.search_wid = WidSearch()
         self.search_wid.reload_thumbnails.connect(self.start_text_search.emit)
+        self.search_wid.search_all_mf.connect(self.start_mf_search.emit)
         right_layout.addWidget(self.search_wid, alignment=Qt.AlignmentFlag.AlignRight)
 
     def mouseReleaseEvent(self, a0):
@@ -10,6 +10,8 @@ from PyQt6.QtWidgets import (QGridLayout, QGroupBox, QHBoxLayout, QLabel,
 
 from cfg import JsonData, Static
 from system.lang import Lng
+from system.main_folder import Mf
+from system.tasks import DaysLoader, UThreadPool
 
 from ._base_widgets import HSep, UMainWidget, UPushButton
 
@@ -70,6 +72,14 @@ class CalendarDaySelected(CalendarDayBase):
         super().__init__(text, day)
 
 
+class CalendarDayFilled(CalendarDayBase):
+    """
+    День, за который в текущем Mf есть изображения.
+    """
+    def __init__(self, text: str, day: int):
+        super().__init__(text, day)
+
+
 class CalendarWeek(QLabel):
     def __init__(self, text: str):
         super().__init__(text)
@@ -114,6 +124,8 @@ class Calendar(UMainWidget):
         self.q_locale = QLocale(lng, country)
         self.current_date = date
         self.date_now = QDate.currentDate()
+        # (год, месяц): {день: количество изображений}
+        self.day_counts: dict[tuple[int, int], dict[int, int]] = {}
         
         self.setWindowTitle(Lng.calendar[JsonData.lng_index])
         self.set_close_only()
@@ -290,11 +302,32 @@ class Calendar(UMainWidget):
                 widget.setParent(None)
                 widget.deleteLater()
 
+    def load_day_counts(self, year: int, month: int):
+        """
+        Загружает из DAYS количество изображений по дням месяца
+        и перерисовывает календарь, если месяц еще открыт.
+        """
+        def finished(day_counts: dict[int, int]):
+            self.day_counts[(year, month)] = day_counts
+            if (self.current_date.year(), self.current_date.month()) == (year, month):
+                self.update_calendar()
+
+        # пустой словарь, чтобы не запускать загрузку повторно
+        self.day_counts[(year, month)] = {}
+        if Mf.current_mf is None:
+            return
+        self.days_task = DaysLoader(Mf.current_mf.mf_alias, year, month)
+        self.days_task.sigs.finished_.connect(finished)
+        UThreadPool.start(self.days_task)
+
     def update_calendar(self):
         self.update_dynamic_label()
         current_year = self.current_date.year()
         current_month = self.current_date.month()
         current_day_val = self.current_date.day()
+        if (current_year, current_month) not in self.day_counts:
+            self.load_day_counts(current_year, current_month)
+        day_counts = self.day_counts[(current_year, current_month)]
         month = self.q_locale.standaloneMonthName(
             current_month,
             QLocale.FormatType.LongFormat
@@ -322,8 +355,12 @@ class Calendar(UMainWidget):
         for day in range(1, days_in_month + 1):
             if day == current_day_val:
                 btn_day = CalendarDaySelected(str(day), day)
+            elif day in day_counts:
+                btn_day = CalendarDayFilled(str(day), day)
             else:
                 btn_day = CalendarDay(str(day), day)
+            if day in day_counts:
+                btn_day.setToolTip(str(day_counts[day]))
             btn_day.setFixedSize(*self.cell_size)
             btn_day.clicked.connect(self.day_selected)
             # divmod вычисляет номер строки и колонки на основе сквозного индекса ячейки
@@ -4,7 +4,7 @@ import re
 from PyQt6.QtCore import (QMimeData, QPoint, QRect, QSize, Qt, QTimer, QUrl,
                           pyqtSignal)
 from PyQt6.QtGui import (QAction, QColor, QContextMenuEvent, QCursor, QDrag,
-                         QFontMetrics, QKeyEvent, QMouseEvent, QPixmap,
+                         QFontMetrics, QImage, QKeyEvent, QMouseEvent, QPixmap,
                          QResizeEvent)
 from PyQt6.QtSvgWidgets import QSvgWidget
 from PyQt6.QtWidgets import (QApplication, QFrame, QGraphicsOpacityEffect,
@@ -202,8 +202,27 @@ class Thumb(QFrame):
         if Static.MIUZ_ZIP.exists():
             Thumb.blue_text_class = MiuzBlueTextWidget
 
+    def get_level(self, side: int) -> QImage:
+        """
+        Наименьший уровень миниатюры не меньше side пикселей.
+        Если уровень совпадает с side, уменьшать его не нужно.
+        """
+        for size in sorted(self.data_item.levels):
+            if size >= side:
+                return self.data_item.levels[size]
+        return self.data_item.qimage
+
     def set_pixmap_with_actual_size(self):
-        qimage = self.data_item.qimages[Dynamic.current_pixmap_size_index]
+        size = Static.THUMB_WID_PIXMAP_SIZE[Dynamic.current_pixmap_size_index]
+        qimage = self.data_item.scaled_qimages.get(size)
+        if qimage is None:
+            ratio = self.devicePixelRatioF()
+            qimage = Utils.pyqt_qimage_scaled(
+                qimage=self.get_level(round(size * ratio)),
+                max_side=size,
+                ratio=ratio
+            )
+            self.data_item.scaled_qimages[size] = qimage
         pixmap = QPixmap.fromImage(qimage)
         self.img_wid.clear()
         self.img_wid.setPixmap(pixmap)
@@ -814,23 +833,34 @@ class GridStandart(Grid):
     def __init__(self):
         super().__init__()
         self.setAcceptDrops(True)
+        # (mod, id) последней загруженной строки для DbImagesLoader
+        self.cursor: tuple[int, int] | None = None
+        self.is_loading = False
+        self.is_last_page = False
         self.load_db_images_task()
 
     def load_more_thumbnails(self):
-        Dynamic.loaded_thumbs += Static.THUMBS_LOAD_LIMIT
+        if self.is_loading or self.is_last_page:
+            return
         self.load_db_images_task()
 
     def load_db_images_task(self):
-        self.task_ = DbImagesLoader()
+        self.is_loading = True
+        self.task_ = DbImagesLoader(self.cursor)
         self.task_.sigs.finished_.connect(self.create_thumbnails)
         UThreadPool.start(self.task_)
 
-    def create_thumbnails(self, db_images: list[DbImagesLoaderItem]):
+    def create_thumbnails(self, db_images: list[DbImagesLoaderItem], cursor: tuple | None):
+        self.is_loading = False
+        self.cursor = cursor
+        self.is_last_page = cursor is None
         Thumb.calculate_size()
         for image_item in db_images:
             data_item = DataItem(
-                qimages=image_item.qimages,
+                qimage=image_item.qimage,
+                levels=image_item.levels,
                 rel_path=image_item.rel_img_path,
+                rel_thumb_path=image_item.rel_thumb_path,
                 fav=image_item.fav,
                 month_year=image_item.month_year,
                 day_month_year=image_item.day_month_year,
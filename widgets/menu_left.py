@@ -249,6 +249,12 @@ class MfList(VListWidget):
             item.mf = i
             self.addItem(item)
 
+    def select_mf(self, mf: Mf):
+        for row in range(self.count()):
+            if self.item(row).mf is mf:
+                self.setCurrentRow(row)
+                return
+
     def mouseReleaseEvent(self, e):
         item: MfListItem = self.itemAt(e.pos())
         if not item:
@@ -5,9 +5,10 @@ from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QPixmap
 from PyQt6.QtWidgets import QGridLayout, QLabel, QScrollArea, QWidget
 
-from cfg import JsonData, Static
+from cfg import JsonData
 from system.items import DataItem
 from system.lang import Lng
+from system.utils import Utils
 
 from ._base_widgets import UMainWidget
 
@@ -19,6 +20,7 @@ from PyQt6.QtCore import QBuffer, QIODevice  # QBuffer импортируетс
 
 class WinCollage(UMainWidget):
     ww, hh = 700, 700
+    cell_size = 210
 
     def __init__(self, data_items: list[DataItem]):
         super().__init__()
@@ -29,7 +31,13 @@ class WinCollage(UMainWidget):
         self.central_layout.setContentsMargins(0, 0, 0, 0)
 
         self.pixmaps: list[QPixmap] = [
-            QPixmap.fromImage(i.qimages[-1])
+            QPixmap.fromImage(
+                Utils.pyqt_qimage_scaled(
+                    qimage=i.qimage,
+                    max_side=self.cell_size,
+                    ratio=self.devicePixelRatioF()
+                )
+            )
             for i in data_items
         ]
         self.image_labels: list[QLabel] = []
@@ -70,14 +78,14 @@ class WinCollage(UMainWidget):
             widget.deleteLater()
         self.image_labels.clear()
 
-        columns = self.width() // Static.THUMB_MAX_SIZE
+        columns = self.width() // self.cell_size
 
         for index, orig_pixmap in enumerate(self.pixmaps):
             row, col = divmod(index, columns)
             label = QLabel()
             label.setAlignment(Qt.AlignmentFlag.AlignCenter)
             label.setPixmap(orig_pixmap)
-            label.setFixedSize(Static.THUMB_MAX_SIZE, Static.THUMB_MAX_SIZE)
+            label.setFixedSize(self.cell_size, self.cell_size)
             self.grid_layout.addWidget(label, row, col)
             self.image_labels.append(label)
 
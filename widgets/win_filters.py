@@ -136,7 +136,7 @@ class DatesWidget(UGroupBox):
         # self.update_readable_date_label()
 
     def show_calendar_win(self):
-        self.calendar_win = Calendar()
+        self.calendar_win = Calendar(QDate.currentDate())
         self.calendar_win.center_to_parent(self.window())
         self.calendar_win.show()
 
@@ -215,7 +215,6 @@ class DatesWidget(UGroupBox):
         self.reload_thumbnails.emit()
 
     def clear_btn_cmd(self, *args):
-        Dynamic.loaded_thumbs = 0
         Dynamic.date_start = None
         Dynamic.date_end = None
         Dynamic.date_index = 0
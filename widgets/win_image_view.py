@@ -295,7 +295,7 @@ class WinImageView(UMainWidget):
             i.raise_()
 
     def load_thumb(self):
-        qimage = self.current_data_item.qimages[-1]
+        qimage = self.current_data_item.qimage
         pixmap = QPixmap.fromImage(qimage)
         self.restart_img_wid(pixmap)
 
@@ -8,6 +8,7 @@ from PyQt6.QtWidgets import (QGraphicsOpacityEffect, QGridLayout, QLabel,
 from cfg import JsonData
 from system.lang import Lng
 from system.multiprocess import OneFileInfo, OneFileInfoItem, ProcessWorker
+from system.tasks import ImgSizeLoader, UThreadPool
 
 from ._base_widgets import SelectableLabel, UMainWidget
 
@@ -43,12 +44,18 @@ class Selectable(SelectableLabel):
 class WinInfo(UMainWidget):
     finished_ = pyqtSignal()
 
-    def __init__(self, paths: list[str]):
+    def __init__(self, paths: list[str], rel_img_path: str = ""):
+        """
+        - rel_img_path: путь относительно Mf для поиска разрешения в БД,
+          пустая строка — разрешение читается из файла
+        """
         super().__init__()
         self.set_always_on_top()
         self.set_close_only()
         self.setWindowTitle(Lng.info[JsonData.lng_index])
         self.path = paths[0]
+        self.rel_img_path = rel_img_path
+        self.task_: ProcessWorker = None
 
         wid = QWidget()
         self.central_layout.addWidget(wid)
@@ -88,6 +95,20 @@ class WinInfo(UMainWidget):
         self.setFixedSize(self.width(), self.height())
 
     def load_info(self):
+        if not self.rel_img_path:
+            self.start_process(None)
+            return
+        self.size_task = ImgSizeLoader(self.rel_img_path)
+        self.size_task.sigs.finished_.connect(self.start_process)
+        UThreadPool.start(self.size_task)
+
+    def start_process(self, img_size: tuple[int, int] | None):
+        """
+        Разрешение из БД показывается сразу, тогда процессу остается
+        только os.stat. Если в БД его нет, процесс читает файл.
+        """
+        if img_size is not None:
+            self.res_label.setText(f"{img_size[0]}x{img_size[1]}")
 
         def poll():
             self.task_timer.stop()
@@ -101,7 +122,10 @@ class WinInfo(UMainWidget):
             else:
                 self.task_timer.start(500)
 
-        self.task_ = ProcessWorker(target=OneFileInfo.start, args=(self.path, ))
+        self.task_ = ProcessWorker(
+            target=OneFileInfo.start,
+            args=(self.path, img_size is None)
+        )
         self.task_timer = QTimer(self)
         self.task_timer.setSingleShot(True)
         self.task_timer.timeout.connect(poll)
@@ -131,13 +155,13 @@ class WinInfo(UMainWidget):
         return super().keyPressEvent(a0)
   
     def deleteLater(self):
-        if self.task_.is_alive():
+        if self.task_ and self.task_.is_alive():
             self.task_timer.stop()
             self.task_.terminate_join()
         return super().deleteLater()
 
     def closeEvent(self, a0):
-        if self.task_.is_alive():
+        if self.task_ and self.task_.is_alive():
             self.task_timer.stop()
             self.task_.terminate_join()
         return super().closeEvent(a0)
\ No newline at end of file
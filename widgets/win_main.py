@@ -3,8 +3,7 @@ import subprocess
 from collections import defaultdict
 
 from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import (QCloseEvent, QGuiApplication, QIcon, QImage,
-                         QKeyEvent, QPixmap)
+from PyQt6.QtGui import QCloseEvent, QGuiApplication, QIcon, QKeyEvent
 from PyQt6.QtWidgets import (QFileDialog, QFrame, QHBoxLayout, QLabel,
                              QSplitter, QVBoxLayout, QWidget)
 
@@ -19,7 +18,9 @@ from system.scaner import (BaseScaner, ForcedScaner, ForcedScanerItem,
                            ScanerWorker)
 from system.scaner_new import NewScanerProcess, NewScanerWorker
 from system.shared_utils import ImgUtils
-from system.tasks import SetFav, UThreadPool, Utils
+from system.tasks import MfSearcher, SetFav, UThreadPool, Utils
+from system.thumb_cache import ThumbCache
+from system.thumb_store import ThumbStore
 
 from ._base_widgets import (ConfirmWindow, HSep, UMainWindow, UPushButton,
                             WarningWindow)
@@ -35,6 +36,7 @@ from .win_filters import WinFilters
 from .win_image_view import ImgViewItem, WinImageView
 from .win_img_search import WinImgSearch
 from .win_info import WinInfo
+from .win_search_results import WinSearchResults
 from .win_servers import ServersWin
 from .win_settings import WinSettings
 from .win_smb import WinSmb
@@ -176,6 +178,9 @@ class WinMain(UMainWindow):
         self.bar_top.start_text_search.connect(
             lambda: self.base_search_start()
         )
+        self.bar_top.start_mf_search.connect(
+            lambda text: self.start_mf_search(text)
+        )
         self.right_layout.addWidget(self.bar_top)
 
         sep_upper = HSep()
@@ -266,6 +271,41 @@ class WinMain(UMainWindow):
 
         self.load_st_grid()
 
+    def start_mf_search(self, text: str):
+
+        def on_finish(items: list):
+            self.win_search_results = WinSearchResults(text, items)
+            self.win_search_results.open_path.connect(self.show_in_mf)
+            self.win_search_results.center_to_parent(self)
+            self.win_search_results.show()
+
+        self.mf_searcher = MfSearcher(text)
+        self.mf_searcher.sigs.finished_.connect(on_finish)
+        UThreadPool.start(self.mf_searcher)
+
+    def show_in_mf(self, mf_alias: str, rel_path: str):
+        """
+        Переходит в Mf изображения, если он другой, и выделяет изображение
+        в его каталоге, см. `show_in_app`.
+        """
+        mf = next((i for i in Mf.items if i.mf_alias == mf_alias), None)
+        if mf is None:
+            return
+        if mf is not Mf.current_mf:
+            self.set_no_img_search()
+            Mf.current_mf = mf
+            self.left_menu.mf_list_widget.select_mf(mf)
+            # дерево строится в фоне и раскроется до этого каталога
+            self.left_menu.tree_wid.abs_selected_path = os.path.dirname(rel_path)
+            self.left_menu.tree_wid.init_ui()
+        mf_path = mf.get_avaiable_mf_path()
+        if not mf_path:
+            self.open_win_smb(mf)
+            return
+        mf.set_mf_current_path(mf_path)
+        self.show_in_app(rel_path)
+        self.path_bar_update(Dynamic.current_dir)
+
     def open_img_search_win(self):
 
         def reset_all_filters():
@@ -388,13 +428,17 @@ class WinMain(UMainWindow):
                 for i in update_thumb_items:
                     wid = self.grid.url_to_wid.get(i.rel_img_path)
                     if wid:
-                        qimages = []
-                        for x in Static.THUMB_WID_PIXMAP_SIZE:
-                            resized = ImgUtils.fit_to_thumb(i.array, x * 2)
-                            qimage = Utils.pyqt_qimage_from_array(resized)
-                            pixmap = Utils.pyqt_qiconed_resize(QPixmap.fromImage(qimage), x)
-                            qimages.append(QImage(pixmap))
-                        wid.data_item.qimages = qimages
+                        # copy, чтобы QImage не ссылался на память массива
+                        qimage = Utils.pyqt_qimage_from_array(i.array, bgr=True).copy()
+                        wid.data_item.qimage = qimage
+                        wid.data_item.levels.clear()
+                        wid.data_item.scaled_qimages.clear()
+                        rel_thumb_path = wid.data_item.rel_thumb_path
+                        ThumbCache.remove(rel_thumb_path)
+                        for size in Static.THUMB_LEVELS:
+                            ThumbCache.remove(
+                                ThumbStore.get_level_path(rel_thumb_path, size)
+                            )
                         wid.set_pixmap_with_actual_size()
                         wid.img_wid.set_opacity(100)
                         wid.white_text_wid.set_opacity(100)
@@ -410,7 +454,7 @@ class WinMain(UMainWindow):
 
         self.update_thumb_task = ProcessWorker(
             target=UpdateThumb.start,
-            args=(Mf.current_mf, rel_paths, )
+            args=(Mf.current_mf, rel_paths, JsonData.thumb_workers, )
         )
         self.update_thumb_task.start()
         QTimer.singleShot(300, poll_task)
@@ -555,7 +599,7 @@ class WinMain(UMainWindow):
             Utils.add_mf_path(Mf.current_mf.mf_current_path, i)
             for i in rel_paths
         ]
-        self.info_win = WinInfo(abs_paths)
+        self.info_win = WinInfo(abs_paths, rel_paths[0])
         self.info_win.center_to_parent(UMainWindow.win_list[-2])
         self.info_win.show()
 
@@ -583,7 +627,6 @@ class WinMain(UMainWindow):
                 )
                 self.go_to_url = str()
 
-        Dynamic.loaded_thumbs = 0
         self.grid.deleteLater()
         self.grid = GridStandart()
         self.grid.files_to_copy = self.files_to_copy
@@ -774,7 +817,8 @@ class WinMain(UMainWindow):
                 forced_scaner_item = ForcedScanerItem(
                     mf=Mf.current_mf,
                     dirs_to_scan=self.forced_scaner_dirs.copy(),
-                    lng_index=JsonData.lng_index
+                    lng_index=JsonData.lng_index,
+                    thumb_workers=JsonData.thumb_workers
                 )
                 self.scaner_task = ScanerWorker(
                     target=ForcedScaner.start,
@@ -784,7 +828,7 @@ class WinMain(UMainWindow):
                 # print("штатно запускаю ОБЩИЙ сканер")
                 self.scaner_task = ScanerWorker(
                     target=BaseScaner.start,
-                    args=(Mf.items, JsonData.lng_index, )
+                    args=(Mf.items, JsonData.lng_index, JsonData.thumb_workers, )
                 )
             self.forced_scaner_dirs.clear()
             self.db_mtime = int(os.stat(Static.DB_FILE).st_mtime)
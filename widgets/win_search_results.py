@@ -0,0 +1,72 @@
+from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import QLabel, QTableWidget, QTableWidgetItem
+
+from cfg import JsonData
+from system.lang import Lng
+from system.tasks import MfSearchItem
+
+from ._base_widgets import UMainWidget
+
+
+class WinSearchResults(UMainWidget):
+    """
+    Результаты поиска по всем Mf, см. `MfSearcher`.
+    Двойной клик открывает изображение в его Mf и каталоге.
+    """
+    open_path = pyqtSignal(str, str)
+    ww = 600
+    hh = 330
+
+    def __init__(self, text: str, items: list[MfSearchItem], parent=None):
+        super().__init__(parent)
+        self.set_always_on_top()
+        self.set_close_only()
+        self.setWindowTitle(f"{Lng.search_results[JsonData.lng_index]}: {text}")
+        self.resize(self.ww, self.hh)
+        self.central_layout.setSpacing(10)
+
+        first_row = QLabel(f"{Lng.images[JsonData.lng_index]}: {len(items)}")
+        self.central_layout.addWidget(first_row)
+
+        headers = [
+            Lng.folder[JsonData.lng_index],
+            Lng.location[JsonData.lng_index]
+        ]
+        self.table = QTableWidget()
+        self.table.setSortingEnabled(True)
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(items))
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignVCenter)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setColumnWidth(0, self.width() // 4)
+        self.table.cellDoubleClicked.connect(self.on_double_click)
+
+        self.central_layout.addWidget(self.table)
+
+        self.populate_table(items)
+        self.setFocus()
+
+    def populate_table(self, items: list[MfSearchItem]):
+        item_flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        left_center = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+
+        for row, item in enumerate(items):
+            for col, text in enumerate((item.mf_alias, item.rel_img_path)):
+                table_item = QTableWidgetItem(text)
+                table_item.setFlags(item_flags)
+                table_item.setTextAlignment(left_center)
+                self.table.setItem(row, col, table_item)
+
+    def on_double_click(self, row: int, col: int):
+        # строки могли пересортироваться, поэтому читаем из таблицы
+        mf_alias = self.table.item(row, 0).text()
+        rel_img_path = self.table.item(row, 1).text()
+        self.open_path.emit(mf_alias, rel_img_path)
+
+    def keyPressEvent(self, a0):
+        if a0.key() == Qt.Key.Key_Escape:
+            self.deleteLater()
+        return super().keyPressEvent(a0)
@@ -20,8 +20,9 @@ from system.main_folder import Mf
 from system.multiprocess import MfRemover, ProcessWorker
 from system.paletes import ThemeChanger
 from system.shared_utils import SharedUtils
-from system.tasks import (HashDirSize, HashDirSizeItem, MfDataCleaner,
-                          UThreadPool)
+from system.tasks import (FailedItem, FailedLoader, HashDirSize,
+                          HashDirSizeItem, MfDataCleaner, UThreadPool)
+from system.thumb_cache import ThumbCache
 from system.utils import Utils
 
 from ._base_widgets import (ConfirmWindow, HSep, MfAliasWidget, MfPathWidget,
@@ -167,6 +168,19 @@ class SizesWin(UMainWidget):
         sec_row = QLabel(f"{Lng.images[JsonData.lng_index]}: {total}")
         self.central_layout.addWidget(sec_row)
 
+        # кэш живет в этом же процессе, счетчики с момента запуска
+        stats = ThumbCache.get_stats()
+        requests = stats["hits"] + stats["misses"]
+        hit_rate = round(stats["hits"] * 100 / requests) if requests else 0
+        cache_row = QLabel(Lng.thumb_cache_stats[JsonData.lng_index].format(
+            SharedUtils.get_f_size(stats["bytes"]),
+            SharedUtils.get_f_size(stats["max_bytes"]),
+            stats["hits"],
+            hit_rate,
+            stats["misses"]
+        ))
+        self.central_layout.addWidget(cache_row)
+
         headers = [
             Lng.folder[JsonData.lng_index],
             Lng.file_size[JsonData.lng_index],
@@ -229,9 +243,69 @@ class SizesWin(UMainWidget):
         return super().keyPressEvent(a0)
 
 
+class FailedWin(UMainWidget):
+    ww = 600
+    hh = 330
+
+    def __init__(self, failed_items: list[FailedItem], parent=None):
+        super().__init__(parent)
+        self.set_always_on_top()
+        self.set_close_only()
+        self.setWindowTitle(Lng.failed_files[JsonData.lng_index])
+        self.resize(self.ww, self.hh)
+        self.central_layout.setSpacing(10)
+
+        first_row = QLabel(f"{Lng.images[JsonData.lng_index]}: {len(failed_items)}")
+        self.central_layout.addWidget(first_row)
+
+        headers = [
+            Lng.folder[JsonData.lng_index],
+            Lng.location[JsonData.lng_index],
+            Lng.attempts[JsonData.lng_index],
+            Lng.next_try[JsonData.lng_index]
+        ]
+        self.table = QTableWidget()
+        self.table.setSortingEnabled(True)
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setRowCount(len(failed_items))
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setDefaultAlignment(Qt.AlignmentFlag.AlignVCenter)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+
+        self.table.setColumnWidth(0, self.width() // 5)
+        self.table.setColumnWidth(1, self.width() // 2)
+        self.table.setColumnWidth(2, self.width() // 10)
+
+        self.central_layout.addWidget(self.table)
+
+        self.populate_table(failed_items)
+        self.setFocus()
+
+    def populate_table(self, failed_items: list[FailedItem]):
+        item_flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        left_center = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+
+        for row, item in enumerate(failed_items):
+            next_try = SharedUtils.get_f_date(item.next_try)
+            texts = (item.mf_alias, item.rel_img_path, str(item.attempts), next_try)
+            for col, text in enumerate(texts):
+                table_item = QTableWidgetItem(text)
+                table_item.setFlags(item_flags)
+                table_item.setTextAlignment(left_center)
+                self.table.setItem(row, col, table_item)
+
+    def keyPressEvent(self, a0):
+        if a0.key() == Qt.Key.Key_Escape:
+            self.deleteLater()
+        return super().keyPressEvent(a0)
+
+
 class NonRebootableSettings(UGroupBox):
     finder_svg = Static.COMMON_ICONS / "finder.svg"
     hdd_svg = Static.COMMON_ICONS / "hdd.svg"
+    warning_svg = Static.COMMON_ICONS / "red_warning.svg"
 
     def __init__(self):
         super().__init__()
@@ -253,6 +327,13 @@ class NonRebootableSettings(UGroupBox):
         show_files_wid.clicked.connect(self.show_files_cmd)
         main_layout.addWidget(show_files_wid)
 
+        main_layout.addWidget(HSep())
+
+        failed_wid = RowArrowWidget(Lng.failed_files[JsonData.lng_index])
+        failed_wid.set_left_icon(self.warning_svg)
+        failed_wid.clicked.connect(self.show_failed_win)
+        main_layout.addWidget(failed_wid)
+
         self.get_sizes()
 
     def show_sizes_win(self, *args):
@@ -267,6 +348,15 @@ class NonRebootableSettings(UGroupBox):
         self.hashdir_size.sigs.finished_.connect(on_finish)
         UThreadPool.start(self.hashdir_size)
 
+    def show_failed_win(self, *args):
+        def on_finish(items: list[FailedItem]):
+            self.failed_win = FailedWin(items)
+            self.failed_win.center_to_parent(self.window())
+            self.failed_win.show()
+        self.failed_loader = FailedLoader()
+        self.failed_loader.sigs.finished_.connect(on_finish)
+        UThreadPool.start(self.failed_loader)
+
     def show_files_cmd(self, *args):
         try:
             subprocess.Popen(["open", Static.APP_DATA_DIR])